@@ -1,11 +1,10 @@
 """
     Author: André Bento
-    Date last modified: 26-02-2019
+    Date last modified: 18-10-2026
 """
-import multiprocessing
-
 from graphy.controller.controller import Controller
 from graphy.utils import config
+from graphy.utils import trace_files as my_trace_files
 from graphy.view.console_view import ConsoleView
 
 
@@ -20,13 +19,12 @@ class Graphy(object):
         view = ConsoleView()
         controller = Controller(view)
 
-        processes = []
-        for trace_file in trace_files:
-            p = multiprocessing.Process(target=controller.setup_zipkin, args=(trace_file,))
-            processes.append(p)
-            p.start()
-
-        for process in processes:
-            process.join()
+        if graphy_config.get('DATA_SOURCE', 'zipkin') == 'files':
+            # The trace files are read directly, the index is built once before the windows are analysed.
+            my_trace_files.get_source()
+        else:
+            # Each file is posted in concurrent batches, see zipkin.post_spans.
+            for trace_file in trace_files:
+                controller.setup_zipkin(trace_file)
 
         controller.start()
@@ -1,19 +1,24 @@
 """
     Author: André Bento
-    Date last modified: 08-04-2019
+    Date last modified: 18-10-2026
 """
+import functools
 import os
 import sys
 import time
 
 from graphy.controller import controller_logic as cl
-from graphy.models import trace as my_trace
+from graphy.controller.window_scheduler import WindowScheduler
+from graphy.graph.graph_processor import GraphProcessor
+from graphy.graph.graph_timeline import GraphTimeline
+from graphy.models.window import WindowSnapshot
 from graphy.utils import config, files
 from graphy.utils import json as my_json
 from graphy.utils import list as my_list
 from graphy.utils import logger as my_logger
 from graphy.utils import time as my_time
 from graphy.utils import zipkin
+from graphy.utils.zipkin import ZipkinError
 
 logger = my_logger.setup_logging(__name__)
 
@@ -28,7 +33,20 @@ class Controller(object):
         self.__start_date_time_str = graphy_config.get('DEFAULT_START_TIME')
         self.__end_date_time_str = graphy_config.get('DEFAULT_END_TIME')
 
-        self.__is_zipkin = graphy_config.get('ACTIVATE_ZIPKIN')
+        self.__is_zipkin = graphy_config.get('ACTIVATE_ZIPKIN') or cl.data_source() is not zipkin
+
+        self.__scheduler = WindowScheduler()
+
+    def __graph_processor(self):
+        """
+        Gets the GraphProcessor shared by the windows of an analysis in time.
+
+        :return: An incremental GraphProcessor when the windows run one at a time and in order, otherwise None, so
+        every window builds its own graph.
+        """
+        if self.__scheduler.workers == 1:
+            return GraphProcessor(incremental=True)
+        return None
 
     def start(self):
         """ Starts the controller. """
@@ -82,6 +100,9 @@ class Controller(object):
                 try:
                     execute_selected = list(switcher.items())[int(user_input) - 1]
                     execute_selected[1]()
+                except ZipkinError as e:
+                    logger.error(e)
+                    self.view.display_message('Zipkin error', e)
                 except Exception as e:
                     exc_type, exc_obj, exc_tb = sys.exc_info()
                     file_name = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
@@ -135,9 +156,12 @@ class Controller(object):
             self.view.display_time('end_time', my_time.from_str_to_datetime(self.__end_date_time_str),
                                    end_timestamp)
 
-            dependencies = zipkin.get_dependencies(end_ts=end_timestamp, lookback=end_timestamp - start_timestamp)
+            dependencies = cl.data_source().get_dependencies(end_ts=end_timestamp,
+                                                             lookback=end_timestamp - start_timestamp)
 
-            message = cl.service_neighbours(dependencies, start_timestamp, end_timestamp)
+            snapshot = WindowSnapshot(start_timestamp, end_timestamp, dependencies)
+
+            message = cl.service_neighbours(snapshot)
             self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -157,10 +181,9 @@ class Controller(object):
             timestamps = my_time.timestamp_millis_split(start_timestamp, end_timestamp)
             timestamps = my_list.tuple_list(timestamps)
 
-            for timestamp_1, timestamp_2 in timestamps:
-                dependencies = zipkin.get_dependencies(end_ts=timestamp_2)
-
-                message = cl.service_neighbours(dependencies, timestamp_1, timestamp_2)
+            window_metric = functools.partial(cl.window_metric, cl.service_neighbours,
+                                              graph_processor=self.__graph_processor())
+            for message in self.__scheduler.map(window_metric, timestamps):
                 self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -176,9 +199,12 @@ class Controller(object):
                                    start_timestamp)
             self.view.display_time('end_time:', my_time.from_timestamp_to_datetime(end_timestamp), end_timestamp)
 
-            dependencies = zipkin.get_dependencies(end_ts=end_timestamp, lookback=end_timestamp - start_timestamp)
+            dependencies = cl.data_source().get_dependencies(end_ts=end_timestamp,
+                                                             lookback=end_timestamp - start_timestamp)
+
+            snapshot = WindowSnapshot(start_timestamp, end_timestamp, dependencies)
 
-            message = cl.service_degree(dependencies, start_timestamp, end_timestamp)
+            message = cl.service_degree(snapshot)
             self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -197,10 +223,9 @@ class Controller(object):
             timestamps = my_time.timestamp_millis_split(start_timestamp, end_timestamp)
             timestamps = my_list.tuple_list(timestamps)
 
-            for timestamp_1, timestamp_2 in timestamps:
-                dependencies = zipkin.get_dependencies(end_ts=timestamp_2, lookback=timestamp_2 - timestamp_1)
-
-                message = cl.service_degree(dependencies, timestamp_1, timestamp_2)
+            window_metric = functools.partial(cl.window_metric, cl.service_degree,
+                                              graph_processor=self.__graph_processor())
+            for message in self.__scheduler.map(window_metric, timestamps):
                 self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -216,9 +241,12 @@ class Controller(object):
                                    start_timestamp)
             self.view.display_time('end_time:', my_time.from_timestamp_to_datetime(end_timestamp), end_timestamp)
 
-            dependencies = zipkin.get_dependencies(end_ts=end_timestamp, lookback=end_timestamp - start_timestamp)
+            dependencies = cl.data_source().get_dependencies(end_ts=end_timestamp,
+                                                             lookback=end_timestamp - start_timestamp)
+
+            snapshot = WindowSnapshot(start_timestamp, end_timestamp, dependencies)
 
-            message = cl.service_call_count(dependencies, start_timestamp, end_timestamp)
+            message = cl.service_call_count(snapshot)
             self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -239,10 +267,9 @@ class Controller(object):
 
             print(len(timestamps))
 
-            for timestamp_1, timestamp_2 in timestamps:
-                dependencies = zipkin.get_dependencies(end_ts=timestamp_2, lookback=timestamp_2 - timestamp_1)
-
-                message = cl.service_call_count(dependencies, timestamp_1, timestamp_2)
+            window_metric = functools.partial(cl.window_metric, cl.service_call_count,
+                                              graph_processor=self.__graph_processor())
+            for message in self.__scheduler.map(window_metric, timestamps):
                 self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -258,13 +285,11 @@ class Controller(object):
                                    start_timestamp)
             self.view.display_time('end_time:', my_time.from_timestamp_to_datetime(end_timestamp), end_timestamp)
 
-            service_names = zipkin.get_services()
+            service_names = cl.data_source().get_services()
+            snapshot = WindowSnapshot.fetch(start_timestamp, end_timestamp, service_names, cl.data_source())
 
             for service_name in service_names:
-                traces = zipkin.get_traces(service_name=service_name, end_ts=end_timestamp,
-                                           lookback=end_timestamp - start_timestamp)
-
-                message = cl.service_status_codes(service_name, traces, start_timestamp, end_timestamp)
+                message = cl.service_status_codes(snapshot, service_name)
                 self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -280,17 +305,14 @@ class Controller(object):
                                    start_timestamp)
             self.view.display_time('end_time:', my_time.from_timestamp_to_datetime(end_timestamp), end_timestamp)
 
-            service_names = zipkin.get_services()
+            service_names = cl.data_source().get_services()
 
             timestamps = my_time.timestamp_millis_split(start_timestamp, end_timestamp)
             timestamps = my_list.tuple_list(timestamps)
 
-            for timestamp_1, timestamp_2 in timestamps:
-                for service_name in service_names:
-                    traces = zipkin.get_traces(service_name=service_name, end_ts=end_timestamp,
-                                               lookback=end_timestamp - start_timestamp)
-
-                    message = cl.service_status_codes(service_name, traces, timestamp_1, timestamp_2)
+            window_metrics = functools.partial(cl.window_service_metrics, [cl.service_status_codes], service_names)
+            for messages in self.__scheduler.map(window_metrics, timestamps):
+                for message in messages:
                     self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -302,13 +324,11 @@ class Controller(object):
             start_timestamp = my_time.to_unix_time_millis(self.__start_date_time_str)
             end_timestamp = my_time.to_unix_time_millis(self.__end_date_time_str)
 
-            service_names = zipkin.get_services()
+            service_names = cl.data_source().get_services()
+            snapshot = WindowSnapshot.fetch(start_timestamp, end_timestamp, service_names, cl.data_source())
 
             for service_name in service_names:
-                traces = zipkin.get_traces(service_name=service_name, end_ts=end_timestamp,
-                                           lookback=end_timestamp - start_timestamp)
-
-                message = cl.trace_quality_analysis(traces, service_name, start_timestamp, end_timestamp)
+                message = cl.trace_quality_analysis(snapshot, service_name)
                 self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -320,22 +340,15 @@ class Controller(object):
             start_timestamp = my_time.to_unix_time_millis(self.__start_date_time_str)
             end_timestamp = my_time.to_unix_time_millis(self.__end_date_time_str)
 
-            service_names = zipkin.get_services()
+            service_names = cl.data_source().get_services()
 
             timestamps = my_time.timestamp_millis_split(start_timestamp, end_timestamp)
             timestamps = my_list.tuple_list(timestamps)
 
-            for timestamp_1, timestamp_2 in timestamps:
-                # TODO: IMPROVE DATA USAGE.
-                for service_name in service_names:
-                    traces = zipkin.get_traces(service_name=service_name, end_ts=end_timestamp,
-                                               lookback=end_timestamp - start_timestamp)
-
-                    span_trees = my_trace.generate_span_trees(traces)
-                    trace_metrics_data = my_trace.extract_metrics(span_trees)
-
-                    message = cl.service_response_time_analysis(service_name, trace_metrics_data, timestamp_1,
-                                                                timestamp_2)
+            window_metrics = functools.partial(cl.window_service_metrics, [cl.service_response_time_analysis],
+                                               service_names)
+            for messages in self.__scheduler.map(window_metrics, timestamps):
+                for message in messages:
                     self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -354,10 +367,17 @@ class Controller(object):
             timestamps = my_time.timestamp_millis_split(start_timestamp, end_timestamp)
             timestamps = my_list.tuple_list(timestamps)
 
-            for timestamp_1, timestamp_2 in timestamps:
-                dependencies = zipkin.get_dependencies(end_ts=timestamp_2, lookback=timestamp_2 - timestamp_1)
-
-                message = cl.service_morphology(dependencies, timestamp_1, timestamp_2)
+            # The graphs are built in parallel, or in place one after the other with a single worker, each one is then
+            # compared with the previous one in order.
+            window_graph = functools.partial(cl.window_graph, graph_processor=self.__graph_processor())
+            timeline = GraphTimeline()
+            for (timestamp_1, timestamp_2), graph in zip(timestamps, self.__scheduler.map(window_graph, timestamps)):
+                if graph is None:
+                    self.view.display_message('No data fetched from {} to {}'.format(
+                        my_time.from_timestamp_to_datetime(timestamp_1),
+                        my_time.from_timestamp_to_datetime(timestamp_2)), 'Can\'t perform morphology analysis')
+                    continue
+                message = cl.service_morphology(timestamp_1, timestamp_2, graph, timeline)
                 self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
@@ -388,13 +408,23 @@ class Controller(object):
 
             timestamps = my_time.timestamp_millis_split(start_timestamp, end_timestamp)
 
-            service_names = zipkin.get_services()
+            service_names = cl.data_source().get_services()
 
             timestamps = my_list.tuple_list(timestamps)
 
             print(len(timestamps))
 
-            for timestamp_tuple in timestamps:
-                cl.process_all_metrics_in_time(service_names, timestamp_tuple[0], timestamp_tuple[1])
+            window_metrics = functools.partial(cl.process_all_metrics_in_time, service_names,
+                                               graph_processor=self.__graph_processor())
+
+            # The windows are processed in parallel, the morphology analysis then compares them in order.
+            timeline = GraphTimeline()
+            for (timestamp_1, timestamp_2), (messages, graph) in zip(timestamps,
+                                                                     self.__scheduler.map(window_metrics, timestamps)):
+                if graph:
+                    messages.append(cl.service_morphology(timestamp_1, timestamp_2, graph, timeline))
+
+                for message in messages:
+                    self.view.display_message(message[0], message[1])
 
             self.view.display_message('Time processing', 'finish in {} seconds'.format(time.time() - start_time))
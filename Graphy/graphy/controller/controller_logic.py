@@ -1,93 +1,132 @@
 """
     Author: André Bento
-    Date last modified: 05/04/19
+    Date last modified: 18-10-2026
 """
 import os
 
+from graphy.controller.window_pipeline import WindowPipeline
 from graphy.db import opentsdb
 from graphy.db.arangodb import ArangoDB
 from graphy.graph.graph_processor import GraphProcessor
-from graphy.models import trace as my_trace
+from graphy.graph.graph_timeline import GraphTimeline
+from graphy.models.window import WindowSnapshot
+from graphy.utils import config
 from graphy.utils import dict as my_dict, zipkin
 from graphy.utils import files as my_files
+from graphy.utils import logger as my_logger
 from graphy.utils import time as my_time
+from graphy.utils import trace_files
+from graphy.utils.zipkin import ZipkinError
+
+logger = my_logger.setup_logging(__name__)
 
-graph_processor = GraphProcessor()
 graph_db = ArangoDB()
 time_series_db = opentsdb
 
+graphy_config = config.get('GRAPHY')
+
+pipeline = WindowPipeline()
+
+
+def data_source():
+    """
+    Gets the data source of the analyses, set by the DATA_SOURCE configuration.
+
+    :return: The graphy.utils.zipkin module, or the graphy.utils.trace_files module to read the trace files directly.
+    """
+    if graphy_config.get('DATA_SOURCE', 'zipkin') == 'files':
+        return trace_files
+    return zipkin
+
 
-def service_neighbours(dependencies, start_timestamp, end_timestamp):
-    graph_processor.generate_graph_from_zipkin(dependencies, start_timestamp, end_timestamp)
-    return ['All service neighbors from {} to {}'.format(my_time.from_timestamp_to_datetime(start_timestamp),
-                                                         my_time.from_timestamp_to_datetime(end_timestamp)),
-            graph_processor.neighbors()]
+@pipeline.register_window_metric
+def service_neighbours(snapshot: WindowSnapshot):
+    return ['All service neighbors from {} to {}'.format(my_time.from_timestamp_to_datetime(snapshot.start_timestamp),
+                                                         my_time.from_timestamp_to_datetime(snapshot.end_timestamp)),
+            snapshot.graph_processor.neighbors()]
 
 
-def service_degree(dependencies, start_timestamp, end_timestamp):
-    graph_processor.generate_graph_from_zipkin(dependencies, start_timestamp, end_timestamp)
+@pipeline.register_window_metric
+def service_degree(snapshot: WindowSnapshot):
+    graph_processor = snapshot.graph_processor
     service_degrees = graph_processor.degrees()
     service_in_degrees = graph_processor.degrees('in')
     service_out_degrees = graph_processor.degrees('out')
 
-    time_series_db.send_numeric_metrics('degree', service_degrees,
-                                        int((start_timestamp + end_timestamp) / 2))
-    time_series_db.send_numeric_metrics('degree_in', service_in_degrees,
-                                        int((start_timestamp + end_timestamp) / 2))
-    time_series_db.send_numeric_metrics('degree_out', service_out_degrees,
-                                        int((start_timestamp + end_timestamp) / 2))
+    time_series_db.send_numeric_metrics('degree', service_degrees, snapshot.metric_timestamp)
+    time_series_db.send_numeric_metrics('degree_in', service_in_degrees, snapshot.metric_timestamp)
+    time_series_db.send_numeric_metrics('degree_out', service_out_degrees, snapshot.metric_timestamp)
 
     most_popular_service = service_degrees[0]
     return [
-        'Most popular service from {} to {} (Degrees)'.format(my_time.from_timestamp_to_datetime(start_timestamp),
-                                                              my_time.from_timestamp_to_datetime(end_timestamp)),
+        'Most popular service from {} to {} (Degrees)'.format(
+            my_time.from_timestamp_to_datetime(snapshot.start_timestamp),
+            my_time.from_timestamp_to_datetime(snapshot.end_timestamp)),
         most_popular_service]
 
 
-def service_call_count(dependencies, start_timestamp, end_timestamp):
-    graph_processor.generate_graph_from_zipkin(dependencies, start_timestamp, end_timestamp)
+@pipeline.register_window_metric
+def service_call_count(snapshot: WindowSnapshot):
+    graph_processor = snapshot.graph_processor
     service_in_edge_call_count = graph_processor.in_edges_call_count()
 
-    time_series_db.send_numeric_metrics('call_count_in', service_in_edge_call_count,
-                                        int((start_timestamp + end_timestamp) / 2))
+    time_series_db.send_numeric_metrics('call_count_in', service_in_edge_call_count, snapshot.metric_timestamp)
 
     service_out_edge_call_count = graph_processor.out_edges_call_count()
 
-    time_series_db.send_numeric_metrics('call_count_out', service_out_edge_call_count,
-                                        int((start_timestamp + end_timestamp) / 2))
+    time_series_db.send_numeric_metrics('call_count_out', service_out_edge_call_count, snapshot.metric_timestamp)
 
     service_edge_call_count = my_dict.merge_dicts(service_in_edge_call_count, service_out_edge_call_count)
 
-    time_series_db.send_numeric_metrics('call_count', service_edge_call_count,
-                                        int((start_timestamp + end_timestamp) / 2))
+    time_series_db.send_numeric_metrics('call_count', service_edge_call_count, snapshot.metric_timestamp)
 
     sorted_service_edge_call_count = my_dict.sort(service_edge_call_count)
     most_popular_service = list(sorted_service_edge_call_count.keys())[0]
     return ['Most popular service from {} to {} (Call Count)'.format(
-        my_time.from_timestamp_to_datetime(start_timestamp),
-        my_time.from_timestamp_to_datetime(end_timestamp)),
+        my_time.from_timestamp_to_datetime(snapshot.start_timestamp),
+        my_time.from_timestamp_to_datetime(snapshot.end_timestamp)),
         most_popular_service]
 
 
-def service_status_codes(service_name, traces, start_timestamp, end_timestamp):
-    status_codes = my_trace.get_status_codes(traces)
-    status_codes_percentage = my_dict.calc_percentage(status_codes)
+@pipeline.register_window_metric
+def service_critical_path(snapshot: WindowSnapshot):
+    service_aggregates = snapshot.trace_analysis().service_aggregates()
 
-    time_series_db.send_numeric_metrics('status_code.{}'.format(service_name),
-                                        status_codes_percentage,
-                                        int((start_timestamp + end_timestamp) / 2))
+    self_time_avg = {service_name: aggregates['self_time'] / aggregates['spans']
+                     for service_name, aggregates in service_aggregates.items()}
+    critical_time = my_dict.filter(service_aggregates, 'critical_time')
+    child_coverage_avg = {service_name: aggregates['child_coverage_avg']
+                          for service_name, aggregates in service_aggregates.items()
+                          if aggregates['child_coverage_avg'] != -1}
 
-    return ['Status Codes from {} to {}'.format(my_time.from_timestamp_to_datetime(start_timestamp),
-                                                my_time.from_timestamp_to_datetime(end_timestamp)),
+    time_series_db.send_numeric_metrics('self_time_avg', self_time_avg, snapshot.metric_timestamp)
+    time_series_db.send_numeric_metrics('critical_time', critical_time, snapshot.metric_timestamp)
+    time_series_db.send_numeric_metrics('child_coverage_avg', child_coverage_avg, snapshot.metric_timestamp)
+
+    return ['Critical path time by service from {} to {}'.format(
+        my_time.from_timestamp_to_datetime(snapshot.start_timestamp),
+        my_time.from_timestamp_to_datetime(snapshot.end_timestamp)),
+        my_dict.sort(critical_time)]
+
+
+@pipeline.register_service_metric
+def service_status_codes(snapshot: WindowSnapshot, service_name):
+    status_codes = snapshot.status_codes().counts(service_name)
+    status_codes_percentage = snapshot.status_codes().percentages(service_name)
+
+    time_series_db.send_numeric_metrics('status_code.{}'.format(service_name), status_codes_percentage,
+                                        snapshot.metric_timestamp)
+
+    return ['Status Codes from {} to {}'.format(my_time.from_timestamp_to_datetime(snapshot.start_timestamp),
+                                                my_time.from_timestamp_to_datetime(snapshot.end_timestamp)),
             '\nservice_name: {}'
             '\nstatus_codes: {}'
             '\nstatus_codes_percentage: {}'.format(service_name, my_dict.sort(status_codes),
                                                    my_dict.sort(status_codes_percentage))]
 
 
-def trace_quality_analysis(traces, service_name: str, timestamp_1, timestamp_2):
-    span_trees = my_trace.generate_span_trees(traces)
-    trace_metrics_data = my_trace.extract_metrics(span_trees)
+def trace_quality_analysis(snapshot: WindowSnapshot, service_name: str):
+    trace_metrics_data = snapshot.trace_metrics_data(service_name)
 
     x_values = list(trace_metrics_data.coverability_count.keys())
     y_values = my_dict.filter(trace_metrics_data.coverability_count, 'value').values()
@@ -97,23 +136,40 @@ def trace_quality_analysis(traces, service_name: str, timestamp_1, timestamp_2):
 
     return [
         'Trace quality analysis from {} to {} for service {} completed.'.format(
-            my_time.from_timestamp_to_datetime(timestamp_1), my_time.from_timestamp_to_datetime(timestamp_2),
+            my_time.from_timestamp_to_datetime(snapshot.start_timestamp),
+            my_time.from_timestamp_to_datetime(snapshot.end_timestamp),
             service_name),
         'OK!']
 
 
-def service_response_time_analysis(service_name: str, trace_metrics_data, start_timestamp, end_timestamp):
-    if trace_metrics_data.response_time_avg is not -1:
+@pipeline.register_service_metric
+def service_response_time_analysis(snapshot: WindowSnapshot, service_name: str):
+    start_timestamp = snapshot.start_timestamp
+    end_timestamp = snapshot.end_timestamp
+
+    trace_metrics_data = snapshot.trace_metrics_data(service_name)
+    if trace_metrics_data.response_time_avg != -1:
         response_time_avg = trace_metrics_data.response_time_avg
+        response_time_quantiles = trace_metrics_data.response_time_quantiles
 
         time_series_db.send_numeric_metric(['response_time_avg', service_name], response_time_avg,
-                                           int((start_timestamp + end_timestamp) / 2))
-
-        return ['Response time analysis from {} to {} for service {}\nAVG: {}'.format(
+                                           snapshot.metric_timestamp)
+        time_series_db.send_numeric_metrics('response_time.{}'.format(service_name), response_time_quantiles,
+                                            snapshot.metric_timestamp)
+
+        latency_sketches = snapshot.latency_sketches()
+        for endpoint in latency_sketches.endpoints(service_name):
+            time_series_db.send_numeric_metrics('span_duration.{}'.format(service_name),
+                                                latency_sketches.sketch(service_name, endpoint).quantiles(),
+                                                snapshot.metric_timestamp,
+                                                {'endpoint': time_series_db.format_tag_value(endpoint)})
+
+        return ['Response time analysis from {} to {} for service {}\nAVG: {}\nQUANTILES: {}'.format(
             my_time.from_timestamp_to_datetime(start_timestamp),
             my_time.from_timestamp_to_datetime(end_timestamp),
             service_name,
-            response_time_avg),
+            response_time_avg,
+            response_time_quantiles),
             'Analysis completed!']
     else:
         return ['No data found from {} to {} for service {}'.format(my_time.from_timestamp_to_datetime(start_timestamp),
@@ -122,27 +178,41 @@ def service_response_time_analysis(service_name: str, trace_metrics_data, start_
                 '\nCan\'t perform response time analysis']
 
 
-def service_morphology(dependencies, start_timestamp, end_timestamp, previous_graph):
-    current_graph = graph_processor.generate_graph_from_zipkin(dependencies, start_timestamp, end_timestamp)
+def service_morphology(start_timestamp, end_timestamp, current_graph, timeline: GraphTimeline):
+    """
+    Compares the graph of a window with the graph of the previous window in the timeline, if it ends where the window
+    starts.
+
+    :param start_timestamp: Start unix timestamp of the window.
+    :param end_timestamp: End unix timestamp of the window.
+    :param current_graph: The graph of the window.
+    :param timeline: The GraphTimeline the window is added to, after the previous windows.
+    :return: The message.
+    """
+    metric_timestamp = int((start_timestamp + end_timestamp) / 2)
+
     current_graph.name = '{}_{}'.format(start_timestamp, end_timestamp)
 
-    graph_db.insert_graph(start_timestamp, end_timestamp, list(current_graph.edges(data=True)), graph_db.graph_db)
+    graph_db.save_graph(start_timestamp, end_timestamp, list(current_graph.edges(data=True)), graph_db.graph_db)
 
-    if previous_graph:
-        graph_diff = graph_processor.graphs_difference(previous_graph, current_graph)
+    timeline.append(start_timestamp, end_timestamp, current_graph)
+    previous_window = timeline.previous(start_timestamp, end_timestamp)
 
-        graph_db.insert_graph(start_timestamp, end_timestamp, list(graph_diff.edges(data=True)),
-                              graph_db.graph_diff_db)
+    if previous_window and previous_window[1] == start_timestamp:
+        previous_graph = timeline.graph(*previous_window)
+        graph_diff = timeline.diff(previous_window, (start_timestamp, end_timestamp))
 
-        graph_variance = graph_processor.graphs_variance(previous_graph, current_graph)
+        graph_db.save_graph(start_timestamp, end_timestamp, graph_diff, graph_db.graph_diff_db)
+
+        graph_variance = GraphProcessor.graphs_variance(previous_graph, current_graph)
 
         time_series_db.send_numeric_metric(['graph_gain_variance'], graph_variance.get('gain'),
-                                           int((start_timestamp + end_timestamp) / 2))
+                                           metric_timestamp)
         time_series_db.send_numeric_metric(['graph_loss_variance'], graph_variance.get('loss'),
-                                           int((start_timestamp + end_timestamp) / 2))
+                                           metric_timestamp)
         time_series_db.send_numeric_metric(['graph_variance'],
                                            graph_variance.get('gain') - graph_variance.get('loss'),
-                                           int((start_timestamp + end_timestamp) / 2))
+                                           metric_timestamp)
 
         message = ['System Morphology from {} to {}'.format(my_time.from_timestamp_to_datetime(start_timestamp),
                                                             my_time.from_timestamp_to_datetime(end_timestamp)),
@@ -160,53 +230,123 @@ def service_morphology(dependencies, start_timestamp, end_timestamp, previous_gr
                                                                              len(current_graph.nodes),
                                                                              len(current_graph.edges),
                                                                              graph_diff.nodes,
-                                                                             graph_diff.edges(data=True),
+                                                                             graph_diff.edges(),
                                                                              len(graph_diff.nodes),
-                                                                             len(graph_diff.edges))]
+                                                                             len(graph_diff))]
     else:
-        previous_graph = current_graph.copy()
         message = ['NO PREVIOUS GRAPH!', '']
 
-    return message, previous_graph
-
-
-g_previous_graph = None
-
-
-def process_all_metrics_in_time(service_names, timestamp_1, timestamp_2):
-    global g_previous_graph
+    return message
+
+
+def window_error(timestamp_1, timestamp_2, error: Exception) -> list:
+    """
+    Reports a window whose data could not be fetched, so the other windows of an analysis still run.
+
+    :param timestamp_1: Start unix timestamp of the window.
+    :param timestamp_2: End unix timestamp of the window.
+    :param error: The error.
+    :return: The message.
+    """
+    logger.error(error)
+    return ['No data fetched from {} to {}'.format(my_time.from_timestamp_to_datetime(timestamp_1),
+                                                   my_time.from_timestamp_to_datetime(timestamp_2)),
+            '{}: {}'.format(type(error).__name__, error)]
+
+
+def window_snapshot_graph(snapshot: WindowSnapshot, graph_processor: GraphProcessor = None):
+    """
+    Gets the graph of a window to keep, e.g. in a GraphTimeline.
+
+    :param snapshot: The WindowSnapshot.
+    :param graph_processor: The GraphProcessor shared by consecutive windows, if any.
+    :return: The graph, a copy if it is the graph of the shared GraphProcessor, which is updated in place.
+    """
+    if graph_processor is None:
+        return snapshot.graph
+    return snapshot.graph.copy()
+
+
+def window_graph(timestamp_1, timestamp_2, graph_processor: GraphProcessor = None):
+    """
+    Fetches the dependencies of a window and builds its graph.
+
+    :param timestamp_1: Start unix timestamp of the window.
+    :param timestamp_2: End unix timestamp of the window.
+    :param graph_processor: An incremental GraphProcessor shared by consecutive windows, a new one by default.
+    :return: The graph of the window, None if the dependencies could not be fetched.
+    """
+    try:
+        dependencies = data_source().get_dependencies(end_ts=timestamp_2, lookback=timestamp_2 - timestamp_1)
+    except ZipkinError as ex:
+        logger.error(ex)
+        return None
+    snapshot = WindowSnapshot(timestamp_1, timestamp_2, dependencies, graph_processor=graph_processor)
+    return window_snapshot_graph(snapshot, graph_processor)
+
+
+def window_metric(metric, timestamp_1, timestamp_2, graph_processor: GraphProcessor = None):
+    """
+    Calculates a window metric, fetching only the dependencies of the window.
+
+    :param metric: A window metric function.
+    :param timestamp_1: Start unix timestamp of the window.
+    :param timestamp_2: End unix timestamp of the window.
+    :param graph_processor: An incremental GraphProcessor shared by consecutive windows, a new one by default.
+    :return: The metric message.
+    """
+    try:
+        dependencies = data_source().get_dependencies(end_ts=timestamp_2, lookback=timestamp_2 - timestamp_1)
+    except ZipkinError as ex:
+        return window_error(timestamp_1, timestamp_2, ex)
+    message = metric(WindowSnapshot(timestamp_1, timestamp_2, dependencies, graph_processor=graph_processor))
+
+    time_series_db.flush_metrics()  # The window may run in a worker process, which exits without flushing.
+    return message
+
+
+def window_service_metrics(metrics, service_names, timestamp_1, timestamp_2):
+    """
+    Calculates service metrics for every service of a window.
+
+    :param metrics: The list of service metric functions.
+    :param service_names: The service names.
+    :param timestamp_1: Start unix timestamp of the window.
+    :param timestamp_2: End unix timestamp of the window.
+    :return: The list of metric messages.
+    """
+    try:
+        snapshot = WindowSnapshot.fetch(timestamp_1, timestamp_2, service_names, data_source())
+    except ZipkinError as ex:
+        return [window_error(timestamp_1, timestamp_2, ex)]
 
     message = list()
-
-    dependencies = zipkin.get_dependencies(end_ts=timestamp_2, lookback=timestamp_2 - timestamp_1)
-
-    if not dependencies:
-        message.append(['No services from {} to {}'.format(my_time.from_timestamp_to_datetime(timestamp_1),
-                                                           my_time.from_timestamp_to_datetime(timestamp_2)),
-                        'Can\'t perform calculation!'])
-    else:
-        message.append(service_neighbours(dependencies, timestamp_1, timestamp_2))
-        message.append(service_degree(dependencies, timestamp_1, timestamp_2))
-        message.append(service_call_count(dependencies, timestamp_1, timestamp_2))
-        message, g_previous_graph = service_morphology(dependencies, timestamp_1, timestamp_2, g_previous_graph)
-        message.append(message)
-
     for service_name in service_names:
-        traces = zipkin.get_traces(service_name=service_name, end_ts=timestamp_2,
-                                   lookback=timestamp_2 - timestamp_1)
-
-        if not traces:
-            message.append(['No traces found from {} to {} for service {}'.format(
-                my_time.from_timestamp_to_datetime(timestamp_1),
-                my_time.from_timestamp_to_datetime(timestamp_2),
-                service_name),
-                '\nCan\'t calculate service status codes'])
-        else:
-            span_trees = my_trace.generate_span_trees(traces)
-            trace_metrics_data = my_trace.extract_metrics(span_trees)
-
-            message.append(service_status_codes(service_name, traces, timestamp_1, timestamp_2))
-            # trace_quality_analysis(service_name, trace_metrics_data)
-            message.append(service_response_time_analysis(service_name, trace_metrics_data, timestamp_1, timestamp_2))
-
-    print(message)
+        for metric in metrics:
+            message.append(metric(snapshot, service_name))
+
+    time_series_db.flush_metrics()
+    return message
+
+
+def process_all_metrics_in_time(service_names, timestamp_1, timestamp_2, graph_processor: GraphProcessor = None):
+    """
+    Calculates all the pipeline metrics of a window.
+    The morphology analysis depends on the previous window, so it is left to the caller, see service_morphology.
+
+    :param service_names: The service names.
+    :param timestamp_1: Start unix timestamp of the window.
+    :param timestamp_2: End unix timestamp of the window.
+    :param graph_processor: An incremental GraphProcessor shared by consecutive windows, a new one by default.
+    :return: The list of metric messages and the graph of the window, None if its data could not be fetched.
+    """
+    try:
+        snapshot = WindowSnapshot.fetch(timestamp_1, timestamp_2, service_names, data_source(),
+                                        graph_processor=graph_processor)
+    except ZipkinError as ex:
+        return [window_error(timestamp_1, timestamp_2, ex)], None
+
+    message = pipeline.run(snapshot)
+
+    time_series_db.flush_metrics()
+    return message, window_snapshot_graph(snapshot, graph_processor)
@@ -0,0 +1,77 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from graphy.models.window import WindowSnapshot
+from graphy.utils import time as my_time
+
+
+class WindowPipeline(object):
+    """
+    WindowPipeline calculates a set of registered metrics over the same WindowSnapshot.
+    Window metrics take the snapshot, service metrics take the snapshot and a service name, both return a message.
+    """
+
+    def __init__(self):
+        """ Initiate a new WindowPipeline. """
+        self.__window_metrics = list()
+        self.__service_metrics = list()
+
+    @property
+    def window_metrics(self) -> list:
+        return self.__window_metrics
+
+    @property
+    def service_metrics(self) -> list:
+        return self.__service_metrics
+
+    def register_window_metric(self, metric):
+        """
+        Registers a metric calculated once per window.
+
+        :param metric: A function taking a WindowSnapshot and returning a message.
+        :return: The metric, so this method can be used as a decorator.
+        """
+        self.__window_metrics.append(metric)
+        return metric
+
+    def register_service_metric(self, metric):
+        """
+        Registers a metric calculated once per service with traces in the window.
+
+        :param metric: A function taking a WindowSnapshot and a service name and returning a message.
+        :return: The metric, so this method can be used as a decorator.
+        """
+        self.__service_metrics.append(metric)
+        return metric
+
+    def run(self, snapshot: WindowSnapshot) -> list:
+        """
+        Calculates every registered metric over a window.
+
+        :param snapshot: The WindowSnapshot.
+        :return: The list of messages.
+        """
+        start_datetime = my_time.from_timestamp_to_datetime(snapshot.start_timestamp)
+        end_datetime = my_time.from_timestamp_to_datetime(snapshot.end_timestamp)
+
+        messages = list()
+
+        if not snapshot.dependencies:
+            messages.append(['No services from {} to {}'.format(start_datetime, end_datetime),
+                             'Can\'t perform calculation!'])
+        else:
+            for metric in self.__window_metrics:
+                messages.append(metric(snapshot))
+
+        for service_name in snapshot.service_names:
+            if not snapshot.traces(service_name):
+                messages.append(['No traces found from {} to {} for service {}'.format(start_datetime, end_datetime,
+                                                                                       service_name),
+                                 '\nCan\'t calculate service metrics'])
+                continue
+
+            for metric in self.__service_metrics:
+                messages.append(metric(snapshot, service_name))
+
+        return messages
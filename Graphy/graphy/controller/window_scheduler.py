@@ -0,0 +1,53 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from graphy.utils import config
+
+graphy_config = config.get('GRAPHY')
+
+
+class WindowScheduler(object):
+    """
+    WindowScheduler runs a function over independent time windows on a thread or process pool.
+    Results are returned in the order of the windows, as soon as all the previous ones are available.
+    """
+
+    def __init__(self, workers: int = graphy_config.get('WINDOW_WORKERS', 1),
+                 executor: str = graphy_config.get('WINDOW_EXECUTOR', 'thread')):
+        """
+        Initiate a new WindowScheduler.
+
+        :param workers: The number of windows processed at the same time, 1 runs them sequentially.
+        :param executor: 'thread' to run the windows on a thread pool, 'process' to run them on a process pool.
+        """
+        if executor not in ('thread', 'process'):
+            raise ValueError('unknown window executor: {}'.format(executor))
+
+        self.__workers = max(workers, 1)
+        self.__executor = executor
+
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    def map(self, func, windows: list):
+        """
+        Applies a function to every window.
+        With a process pool the function and its results must be picklable, e.g. module functions or partials of them.
+
+        :param func: A function taking the start and end timestamps of a window.
+        :param windows: A list of (start, end) tuples.
+        :return: A generator of the results, in the same order as the windows.
+        """
+        if self.__workers == 1 or len(windows) <= 1:
+            for start, end in windows:
+                yield func(start, end)
+            return
+
+        pool_class = ProcessPoolExecutor if self.__executor == 'process' else ThreadPoolExecutor
+        with pool_class(max_workers=self.__workers) as pool:
+            starts, ends = zip(*windows)
+            yield from pool.map(func, starts, ends)
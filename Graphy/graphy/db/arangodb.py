@@ -1,13 +1,19 @@
 """
     Author: André Bento
-    Date last modified: 08-03-2019
+    Date last modified: 18-10-2026
 """
+import hashlib
+
 from arango import ArangoClient
 
 from graphy.utils import config
 
 arango_db_config = config.get('ARANGODB')
 
+# Collections of the timeline storage layout.
+TIMELINE_VERTEX_COLLECTION = 'Services'
+TIMELINE_EDGE_COLLECTION = 'ServiceLinks'
+
 
 class ArangoDB(object):
     def __init__(self, purge_database=False):
@@ -25,8 +31,17 @@ class ArangoDB(object):
         self.__graph_db = arango_db_config.get('GRAPH_DB_NAME')
         self.__graph_diff_db = arango_db_config.get('GRAPH_DIFF_DB_NAME')
 
+        self.__storage_layout = arango_db_config.get('STORAGE_LAYOUT', 'window')
+        self.__timeline_graph_name = arango_db_config.get('TIMELINE_GRAPH_NAME', 'service_timeline')
+
         self.__client = ArangoClient(host=self.__ip, port=self.__port)
 
+        # Database handles and graphs already known to exist, to avoid asking the server again.
+        self.__dbs = dict()
+        self.__graphs = dict()
+        self.__known_databases = set()
+        self.__indexed_databases = set()
+
         self.__db = self.__sys_db()
 
         if purge_database:
@@ -46,8 +61,11 @@ class ArangoDB(object):
         :param db_name: The name of the database.
         :return:
         """
+        if db_name in self.__known_databases:
+            return
         if not self.__sys_db().has_database(db_name):
             self.__sys_db().create_database(db_name)
+        self.__known_databases.add(db_name)
 
     def __delete_database(self, db_name=arango_db_config.get('DB_NAME')):
         """
@@ -56,6 +74,9 @@ class ArangoDB(object):
         :param db_name: The name of the database.
         :return: True if success, False otherwise.
         """
+        self.__known_databases.discard(db_name)
+        self.__indexed_databases.discard(db_name)
+        self.__graphs = {key: graph for key, graph in self.__graphs.items() if key[0] != db_name}
         if self.__sys_db().has_database(db_name):
             return self.__sys_db().delete_database(db_name)
         return False
@@ -66,7 +87,9 @@ class ArangoDB(object):
 
         :param name: The name of the database.
         """
-        self.__db = self.__client.db(name, self.__username, self.__password)
+        if name not in self.__dbs:
+            self.__dbs[name] = self.__client.db(name, self.__username, self.__password)
+        self.__db = self.__dbs[name]
 
     @property
     def graph_db(self):
@@ -76,6 +99,11 @@ class ArangoDB(object):
     def graph_diff_db(self):
         return self.__graph_diff_db
 
+    @property
+    def storage_layout(self):
+        """ 'window' for a graph and edge collection per window, 'timeline' for a single time-indexed graph. """
+        return self.__storage_layout
+
     def get_graph(self, name):
         """
         Gets a certain graph.
@@ -107,11 +135,14 @@ class ArangoDB(object):
          :param name: The graph name.
          :return: True if graph was deleted or false if not.
          """
+        self.__graphs = {key: graph for key, graph in self.__graphs.items() if key[1] != name}
         return self.__db.delete_graph(name)
 
     def insert_graph(self, timestamp_start, timestamp_end, node_links, db=arango_db_config.get('GRAPH_DB_NAME')):
         """
         Inserts a new graph.
+        All the vertices are upserted in one bulk import and all the edges in a second one, so the number of requests
+        does not depend on the size of the graph. Inserting the same window again replaces its edges.
 
         :param timestamp_end: The start timestamp, in unix timestamp format, of the graph.
         :param timestamp_start: The end timestamp, in unix timestamp format, of the graph.
@@ -123,33 +154,244 @@ class ArangoDB(object):
         self.__connect_database(db)
 
         graph_name = 'graph_{}_{}'.format(timestamp_start, timestamp_end)
+        vertex_collection_name = 'Services'  # TODO: Remove hard coded string
+        edge_collection_name = 'ServiceLinks_{}_{}'.format(timestamp_start, timestamp_end)
+
+        graph = self.__graph(db, graph_name, vertex_collection_name, edge_collection_name)
+
+        vertices, edges = self.__documents(vertex_collection_name, node_links)
+        if vertices:
+            self.__db.collection(vertex_collection_name).import_bulk(vertices, on_duplicate='ignore')
+        if edges:
+            self.__db.collection(edge_collection_name).import_bulk(edges, on_duplicate='replace')
+
+        return graph
+
+    def save_graph(self, timestamp_start, timestamp_end, node_links, db=arango_db_config.get('GRAPH_DB_NAME')):
+        """
+        Saves the graph of a window in the configured storage layout, see insert_graph and insert_timeline_graph.
+
+        :param timestamp_start: The start timestamp, in unix timestamp format, of the graph.
+        :param timestamp_end: The end timestamp, in unix timestamp format, of the graph.
+        :param node_links: The links in dict data format.
+        :param db: The database name.
+        :return: The graph.
+        """
+        if self.__storage_layout == 'timeline':
+            return self.insert_timeline_graph(timestamp_start, timestamp_end, node_links, db)
+        return self.insert_graph(timestamp_start, timestamp_end, node_links, db)
+
+    def insert_timeline_graph(self, timestamp_start, timestamp_end, node_links,
+                              db=arango_db_config.get('GRAPH_DB_NAME')):
+        """
+        Inserts the graph of a window in the timeline layout: a single graph with one Services vertex collection and
+        one ServiceLinks edge collection, where each edge is valid from its start to its end timestamp.
+        A link that continues from the previous window with the same weight extends the end of its edge.
+        Windows must be inserted in time order; a window already in the timeline is skipped.
+
+        :param timestamp_start: The start timestamp, in unix timestamp format, of the graph.
+        :param timestamp_end: The end timestamp, in unix timestamp format, of the graph.
+        :param node_links: The links in dict data format.
+        :param db: The database name.
+        :return: The timeline graph.
+        """
+        self.__create_database(db)
+        self.__connect_database(db)
+
+        graph = self.__graph(db, self.__timeline_graph_name, TIMELINE_VERTEX_COLLECTION, TIMELINE_EDGE_COLLECTION)
+        self.__timeline_indexes(db)
+
+        if self.__query('FOR link IN {} FILTER link.start <= @start AND link.end >= @end LIMIT 1 RETURN 1'
+                        .format(TIMELINE_EDGE_COLLECTION), start=timestamp_start, end=timestamp_end):
+            return graph
+
+        open_links = dict()
+        for link in self.__query('FOR link IN {} FILTER link.end == @start RETURN KEEP(link, "_key", "_from", "_to", '
+                                 '"links")'.format(TIMELINE_EDGE_COLLECTION), start=timestamp_start):
+            open_links[(link['_from'], link['_to'], link['links'])] = link['_key']
+
+        vertices, edges = self.__documents(TIMELINE_VERTEX_COLLECTION, node_links, timestamp_start)
+
+        extended_keys = list()
+        new_edges = list()
+        for edge in edges:
+            key = open_links.get((edge['_from'], edge['_to'], edge['links']))
+            if key is None:
+                edge['end'] = timestamp_end
+                new_edges.append(edge)
+            else:
+                extended_keys.append(key)
+
+        if vertices:
+            self.__db.collection(TIMELINE_VERTEX_COLLECTION).import_bulk(vertices, on_duplicate='ignore')
+        if extended_keys:
+            self.__query('FOR key IN @keys UPDATE key WITH {{end: @end}} IN {}'.format(TIMELINE_EDGE_COLLECTION),
+                         keys=extended_keys, end=timestamp_end)
+        if new_edges:
+            self.__db.collection(TIMELINE_EDGE_COLLECTION).import_bulk(new_edges, on_duplicate='replace')
+
+        return graph
+
+    def graph_at(self, timestamp, db=arango_db_config.get('GRAPH_DB_NAME')):
+        """
+        Gets the graph at a certain time, from the timeline layout.
+
+        :param timestamp: The unix timestamp.
+        :param db: The database name.
+        :return: The links in dict data format, with the weight, start and end of each edge.
+        """
+        self.__connect_database(db)
+        return [self.__node_link(link) for link in self.__query(
+            'FOR link IN {} FILTER link.start <= @timestamp AND link.end > @timestamp RETURN link'
+            .format(TIMELINE_EDGE_COLLECTION), timestamp=timestamp)]
+
+    def edges_changed(self, timestamp_1, timestamp_2, db=arango_db_config.get('GRAPH_DB_NAME')):
+        """
+        Gets the edges that appeared or disappeared between two times, from the timeline layout.
+        A changed weight shows up as an edge ending and another one starting.
+
+        :param timestamp_1: The first unix timestamp.
+        :param timestamp_2: The second unix timestamp.
+        :param db: The database name.
+        :return: The links in dict data format, with the weight, start and end of each edge.
+        """
+        self.__connect_database(db)
+        return [self.__node_link(link) for link in self.__query(
+            'FOR link IN {} FILTER (link.start > @timestamp_1 AND link.start <= @timestamp_2) OR '
+            '(link.end > @timestamp_1 AND link.end <= @timestamp_2) SORT link.start RETURN link'
+            .format(TIMELINE_EDGE_COLLECTION), timestamp_1=timestamp_1, timestamp_2=timestamp_2)]
+
+    def migrate_to_timeline(self, db=arango_db_config.get('GRAPH_DB_NAME'), delete_window_graphs=False):
+        """
+        Copies the graphs stored one per window (graph_<start>_<end>) into the timeline layout, in time order.
+
+        :param db: The database name.
+        :param delete_window_graphs: True to delete each window graph and its edge collection once copied.
+        :return: The number of migrated windows.
+        """
+        windows = list()
+        for graph_name in self.get_graphs(db):
+            name_parts = graph_name.split('_')
+            if len(name_parts) == 3 and name_parts[0] == 'graph' and name_parts[1].isdigit() and \
+                    name_parts[2].isdigit():
+                windows.append((int(name_parts[1]), int(name_parts[2]), graph_name))
+
+        for timestamp_start, timestamp_end, graph_name in sorted(windows):
+            self.__connect_database(db)
+            node_links = [(edge['_from'].split('/', 1)[1], edge['_to'].split('/', 1)[1], {'weight': edge.get('links')})
+                          for edge in self.iter_graph_edges(graph_name)]
+            self.insert_timeline_graph(timestamp_start, timestamp_end, node_links, db)
+
+            if delete_window_graphs:
+                # The Services vertex collection is shared with the timeline, only the edges are dropped.
+                self.delete_graph(graph_name)
+                self.__db.delete_collection('ServiceLinks_{}_{}'.format(timestamp_start, timestamp_end),
+                                            ignore_missing=True)
+
+        return len(windows)
+
+    def __query(self, query, **bind_vars):
+        """
+        Runs an AQL query on the connected database.
+
+        :param query: The AQL query.
+        :param bind_vars: The query bind variables.
+        :return: The list of results.
+        """
+        return list(self.__db.aql.execute(query, bind_vars=bind_vars))
+
+    def __timeline_indexes(self, db):
+        """
+        Creates the indexes of the timeline edge collection, once per database.
+
+        :param db: The database name.
+        """
+        if db in self.__indexed_databases:
+            return
+        edge_collection = self.__db.collection(TIMELINE_EDGE_COLLECTION)
+        edge_collection.add_persistent_index(['start', 'end'], name='start_end')
+        edge_collection.add_persistent_index(['end'], name='end')
+        self.__indexed_databases.add(db)
+
+    @staticmethod
+    def __node_link(link):
+        """
+        Converts a timeline edge document into a node link.
+
+        :param link: The edge document.
+        :return: The (from, to, data) node link.
+        """
+        return (link['_from'].split('/', 1)[1], link['_to'].split('/', 1)[1],
+                {'weight': link.get('links'), 'start': link.get('start'), 'end': link.get('end')})
+
+    def __graph(self, db, graph_name, vertex_collection_name, edge_collection_name):
+        """
+        Gets or creates a graph with a vertex collection and an edge collection, asking the server only once.
+
+        :param db: The database name.
+        :param graph_name: The graph name.
+        :param vertex_collection_name: The vertex collection name.
+        :param edge_collection_name: The edge collection name.
+        :return: The graph.
+        """
+        key = (db, graph_name)
+        if key in self.__graphs:
+            return self.__graphs[key]
+
         if self.__db.has_graph(graph_name):
             graph = self.__db.graph(graph_name)
         else:
             graph = self.__db.create_graph(graph_name)
 
-        vertex_collection_name = 'Services'  # TODO: Remove hard coded string
         if graph.has_vertex_collection(vertex_collection_name):
             vertex_collection = graph.vertex_collection(vertex_collection_name)
         else:
             vertex_collection = graph.create_vertex_collection(vertex_collection_name)
 
-        edge_collection = self.__edge_collection(graph, vertex_collection, timestamp_start, timestamp_end)
+        if not graph.has_edge_definition(edge_collection_name):
+            graph.create_edge_definition(
+                edge_collection=edge_collection_name,
+                from_vertex_collections=[vertex_collection.name],
+                to_vertex_collections=[vertex_collection.name]
+            )
+
+        self.__graphs[key] = graph
+        return graph
+
+    @staticmethod
+    def __documents(vertex_collection_name, node_links, start=None):
+        """
+        Converts node links into vertex and edge documents.
+        Edge keys are derived from their vertices, and start, so a link is stored once per edge collection and start.
+
+        :param vertex_collection_name: The vertex collection name.
+        :param node_links: The links in dict data format.
+        :param start: The start timestamp of the edges, for the timeline layout.
+        :return: The list of vertex documents and the list of edge documents.
+        """
+        vertices = dict()
+        edges = list()
 
         for node_link in node_links:
             node_from_name = node_link[0]
             node_to_name = node_link[1]
             links = node_link[2].get('weight')
 
-            vertex_1 = self.__vertex(vertex_collection, node_from_name, {'name': node_from_name})
-            vertex_2 = self.__vertex(vertex_collection, node_to_name, {'name': node_to_name})
+            for node_name in (node_from_name, node_to_name):
+                if node_name not in vertices:
+                    vertices[node_name] = {'_key': node_name, 'name': node_name}
 
-            collection_name = vertex_collection.name
-            edge_collection.insert({'_from': '{}/{}'.format(collection_name, vertex_1.get('_key')),
-                                    '_to': '{}/{}'.format(collection_name, vertex_2.get('_key')),
-                                    'links': links})
+            edge_key = '{}\n{}'.format(node_from_name, node_to_name)
+            edge = {'_from': '{}/{}'.format(vertex_collection_name, node_from_name),
+                    '_to': '{}/{}'.format(vertex_collection_name, node_to_name),
+                    'links': links}
+            if start is not None:
+                edge_key += '\n{}'.format(start)
+                edge['start'] = start
+            edge['_key'] = hashlib.md5(edge_key.encode('utf-8')).hexdigest()
+            edges.append(edge)
 
-        return graph
+        return list(vertices.values()), edges
 
     def get_graph_edges(self, graph_name):
         """
@@ -158,57 +400,30 @@ class ArangoDB(object):
         :param graph_name: The graph name.
         :return: A list of graph edges.
         """
-        edge_list = list()
-        graph = self.get_graph(graph_name)
+        return list(self.iter_graph_edges(graph_name))
 
-        graph_vertex_collections = graph.vertex_collections()
-        graph_vertex_collection_name = graph_vertex_collections[0]  # TODO: Try to remove hard coded integer.
-
-        graph_edge_collection = graph.edge_definitions()
-        graph_edge_collection_name = graph_edge_collection[0] \
-            .get('edge_collection')  # TODO: Try to remove hard coded string and integer.
-
-        for vertex_item in self.__db.collection(graph_vertex_collection_name):
-            if graph.has_vertex(vertex_item.get('_id')):
-                edges = graph.edges(graph_edge_collection_name, vertex_item.get('_id'), direction='out').get('edges')
-                edge_list.extend(edges)
-
-        return edge_list
-
-    @staticmethod
-    def __edge_collection(graph, vertex_collection, start_timestamp, end_timestamp):
+    def iter_graph_edges(self, graph_name, service_name=None,
+                         batch_size=arango_db_config.get('QUERY_BATCH_SIZE', 1000)):
         """
-        Gets or creates a edge collection.
+        Iterates over the graph edges with a streamed AQL cursor per edge collection of the graph.
+        The edges are fetched batch_size at a time, so the graph is never fully in memory.
 
-        :param graph: The graph where the edge collection might be or should be.
-        :param vertex_collection: The vertex collection
-        :param start_timestamp: The start timestamp of the collection, in unix timestamp format.
-        :param end_timestamp: The end timestamp of the collection, in unix timestamp format.
-        :return: The edge collection.
-        """
-        service_links_edge_collection_name = 'ServiceLinks_{}_{}'.format(start_timestamp, end_timestamp)
-        if graph.has_edge_collection(service_links_edge_collection_name):
-            return graph.edge_collection(service_links_edge_collection_name)
-        else:
-            return graph.create_edge_definition(
-                edge_collection=service_links_edge_collection_name,
-                from_vertex_collections=[vertex_collection.name],
-                to_vertex_collections=[vertex_collection.name]
-            )
-
-    @staticmethod
-    def __vertex(vertex_collection, vertex_key, vertex_attributes):
-        """
-        Gets or creates a vertex in a certain vertex collection.
-
-        :param vertex_collection: The vertex collection.
-        :param vertex_key: The vertex key identifier.
-        :param vertex_attributes: The vertex attributes.
-        :return:
+        :param graph_name: The graph name.
+        :param service_name: The service name to get only its out edges, all the edges by default.
+        :param batch_size: The number of edges fetched in each request.
+        :return: A generator of graph edges.
         """
-        if vertex_collection.has({'_key': vertex_key}):
-            return vertex_collection.get({'_key': vertex_key})
-        else:
-            vertex = {'_key': vertex_key}
-            vertex.update(vertex_attributes)
-            return vertex_collection.insert(vertex)
+        for edge_definition in self.get_graph(graph_name).edge_definitions():
+            bind_vars = {'@edge_collection': edge_definition.get('edge_collection')}
+            query = 'FOR link IN @@edge_collection'
+            if service_name is not None:
+                query += ' FILTER link._from IN @service_ids'
+                bind_vars['service_ids'] = ['{}/{}'.format(vertex_collection_name, service_name)
+                                            for vertex_collection_name in edge_definition.get('from_vertex_collections')]
+            query += ' RETURN link'
+
+            cursor = self.__db.aql.execute(query, bind_vars=bind_vars, batch_size=batch_size, stream=True)
+            try:
+                yield from cursor
+            finally:
+                cursor.close(ignore_missing=True)
@@ -1,10 +1,17 @@
 """
     Author: André Bento
-    Date last modified: 04-03-2019
+    Date last modified: 18-10-2026
 """
+import atexit
+import numbers
+import os
+import queue
+import re
+import socket
 import sys
+import threading
+import time
 
-import potsdb
 import requests
 
 from graphy.utils import config
@@ -21,6 +28,170 @@ opentsdb_config = config.get('OPENTSDB')
 
 opentsdb_address = '{}://{}:{}/'.format(opentsdb_config['PROTOCOL'], opentsdb_config['HOST'], opentsdb_config['PORT'])
 api_query = 'api/query'
+api_put = 'api/put'
+
+flush_size = opentsdb_config.get('FLUSH_SIZE', 500)
+flush_interval = opentsdb_config.get('FLUSH_INTERVAL', 1)
+buffer_size = opentsdb_config.get('BUFFER_SIZE', 50000)
+
+
+class MetricsWriter(object):
+    """
+    MetricsWriter buffers data points and sends them in batches to the OpenTSDB /api/put endpoint, from a background
+    thread, over a single keep-alive connection.
+    A batch is sent when it reaches flush_size points or when flush_interval seconds have passed since its first point.
+    When the buffer is full, put blocks until there is room for the new point.
+    """
+
+    __FLUSH = object()
+    __CLOSE = object()
+
+    def __init__(self, address: str = opentsdb_address, flush_size: int = flush_size,
+                 flush_interval: float = flush_interval, buffer_size: int = buffer_size, tags: dict = None,
+                 session: requests.Session = None):
+        """
+        Initiate a new MetricsWriter.
+
+        :param address: The OpenTSDB address.
+        :param flush_size: The maximum number of points sent in each request.
+        :param flush_interval: The maximum time, in seconds, a point waits in the buffer.
+        :param buffer_size: The maximum number of points waiting to be sent.
+        :param tags: The tags added to every point, the host name by default.
+        :param session: The HTTP session the points are posted with, a new one by default.
+        """
+        self.__url = address + api_put
+        self.__flush_size = flush_size
+        self.__flush_interval = flush_interval
+        self.__tags = {'host': socket.gethostname()} if tags is None else tags
+
+        self.__queue = queue.Queue(maxsize=buffer_size)
+        self.__session = requests.Session() if session is None else session
+        self.__sent_points = 0
+        self.__failed_points = 0
+
+        self.__thread = threading.Thread(target=self.__run, name='opentsdb-writer', daemon=True)
+        self.__thread.start()
+
+    @property
+    def sent_points(self):
+        return self.__sent_points
+
+    @property
+    def failed_points(self):
+        return self.__failed_points
+
+    def put(self, metric_name: str, metric_value, metric_timestamp: int, tags: dict = None) -> None:
+        """
+        Adds a data point to the buffer.
+
+        :param metric_name: The metric name.
+        :param metric_value: The metric value in float, integer, or string (convertible to float or integer) format.
+        :param metric_timestamp: The metric unix timestamp.
+        :param tags: The tags of the point, merged with the writer tags.
+        """
+        if not self.__thread.is_alive():
+            raise RuntimeError('metrics writer is closed')
+
+        point_tags = dict(self.__tags)
+        if tags:
+            point_tags.update(tags)
+
+        self.__queue.put({'metric': metric_name,
+                          'timestamp': int(metric_timestamp),
+                          'value': self.__numeric(metric_value),
+                          'tags': point_tags})
+
+    def flush(self) -> None:
+        """ Sends all buffered points and waits until they are sent, or until the writer thread stops. """
+        if not self.__thread.is_alive():
+            return
+        self.__queue.put(self.__FLUSH)
+        with self.__queue.all_tasks_done:
+            while self.__queue.unfinished_tasks and self.__thread.is_alive():
+                self.__queue.all_tasks_done.wait(timeout=0.1)
+
+    def close(self) -> None:
+        """ Sends all buffered points and stops the writer. """
+        if self.__thread.is_alive():
+            self.__queue.put(self.__CLOSE)
+            self.__thread.join()
+            self.__session.close()
+
+    def __run(self) -> None:
+        """ Collects the buffered points in batches and sends them, until the writer is closed. """
+        closed = False
+        while not closed:
+            batch = [self.__queue.get()]
+            deadline = time.time() + self.__flush_interval
+
+            while len(batch) < self.__flush_size and batch[-1] is not self.__FLUSH and batch[-1] is not self.__CLOSE:
+                try:
+                    batch.append(self.__queue.get(timeout=max(deadline - time.time(), 0)))
+                except queue.Empty:
+                    break
+
+            closed = batch[-1] is self.__CLOSE
+            points = [point for point in batch if point is not self.__FLUSH and point is not self.__CLOSE]
+            try:
+                if points:
+                    self.__send(points)
+            finally:
+                for _ in batch:
+                    self.__queue.task_done()
+
+    def __send(self, points: list) -> None:
+        """
+        Sends a batch of points to OpenTSDB.
+
+        :param points: The list of points in OpenTSDB JSON format.
+        """
+        try:
+            response = self.__session.post(self.__url, data=json.dumps(points),
+                                           headers={'content-type': 'application/json'})
+            if response.status_code in (200, 204):
+                self.__sent_points += len(points)
+                return
+            logger.error('{} metrics rejected with HTTP code {}: {}'.format(len(points), response.status_code,
+                                                                            response.text))
+        except Exception as ex:  # Any error would stop the writer thread, the points are dropped instead.
+            logger.error('{}: {}'.format(type(ex), ex))
+        self.__failed_points += len(points)
+
+    @staticmethod
+    def __numeric(value):
+        """
+        Converts a metric value to a JSON serializable number.
+
+        :param value: The metric value in float, integer, or string (convertible to float or integer) format.
+        :return: The value as an int or a float.
+        """
+        if isinstance(value, numbers.Integral):
+            return int(value)
+        if isinstance(value, numbers.Real):
+            return float(value)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return float(value)
+
+
+writer = None
+writer_pid = None
+
+
+def get_writer() -> MetricsWriter:
+    """
+    Gets the MetricsWriter shared by the module functions, it is flushed and closed when the interpreter exits.
+    A forked process, e.g. a window worker, gets its own writer, as the thread of the inherited one does not run in it.
+
+    :return: The default MetricsWriter.
+    """
+    global writer, writer_pid
+    if writer is None or writer_pid != os.getpid():
+        writer = MetricsWriter()
+        writer_pid = os.getpid()
+        atexit.register(writer.close)
+    return writer
 
 
 def format_metric_name(naming_list):
@@ -36,6 +207,16 @@ def format_metric_name(naming_list):
     return metric_name
 
 
+def format_tag_value(value) -> str:
+    """
+    Formats a tag value, replacing the characters OpenTSDB does not accept in tags with underscores.
+
+    :param value: The tag value, e.g. an endpoint name.
+    :return: The tag value.
+    """
+    return re.sub(r'[^\w\-./]', '_', str(value)) or '_'
+
+
 def erase_metrics(name: str, start_timestamp: int, end_timestamp: int) -> object:
     """
     Erases metrics from OpenTSDB.
@@ -92,41 +273,47 @@ def get_metrics(name: str, start_timestamp: int, end_timestamp: int) -> object:
         sys.exit(status=1)
 
 
-def send_numeric_metrics(label: str, metrics, metric_timestamp: int) -> list:
+def send_numeric_metrics(label: str, metrics, metric_timestamp: int, tags: dict = None) -> list:
     """
     Sends a collection of metrics to the Time-Series database.
 
     :param label: The pre label of the metric in string format. Ex.: degree or status_code
     :param metrics: The list of the metrics. Each metric must be a tuple. Ex.: service: value.
     :param metric_timestamp: The metric unix timestamp.
+    :param tags: The tags of the metrics, see format_tag_value.
     :return: Metric names if success, Empty list otherwise.
     """
     metric_names = []
     if isinstance(metrics, list):
         for tuple_item in metrics:
             x, y = tuple_item
-            send_numeric_metric([label, x], y, metric_timestamp)
+            send_numeric_metric([label, x], y, metric_timestamp, tags)
     elif isinstance(metrics, dict):
         for k, v in metrics.items():
-            send_numeric_metric([label, k], v, metric_timestamp)
+            send_numeric_metric([label, k], v, metric_timestamp, tags)
     return metric_names
 
 
-def send_numeric_metric(metric_naming_list: list, metric_value, metric_timestamp: int) -> bool:
+def send_numeric_metric(metric_naming_list: list, metric_value, metric_timestamp: int, tags: dict = None) -> bool:
     """
-    Sends a single metric to the Time-Series database.
+    Sends a single metric to the Time-Series database, through the buffered MetricsWriter.
 
     :param metric_naming_list: The metric naming list.
     :param metric_value: The metric value in float, integer, or string (convertible to float or integer) format.
     :param metric_timestamp: The metric unix timestamp.
+    :param tags: The tags of the metric, see format_tag_value.
     :return: True if success, False otherwise.
     """
     metric_name = format_metric_name(metric_naming_list)
     try:
-        client = potsdb.Client(host=opentsdb_config['HOST'], port=opentsdb_config['PORT'], check_host=True)
-        client.log(name=metric_name, val=metric_value, timestamp=metric_timestamp)
-        client.close()
+        get_writer().put(metric_name, metric_value, metric_timestamp, tags)
         return True
     except Exception as e:
         logger.error(e)
         return False
+
+
+def flush_metrics() -> None:
+    """ Sends all the metrics buffered by the module functions. """
+    if writer is not None and writer_pid == os.getpid():
+        writer.flush()
@@ -0,0 +1,118 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import networkx as nx
+
+
+def edge_weights(graph: nx.MultiDiGraph) -> dict:
+    """
+    Gets the weight of each edge of a graph. The weights of parallel edges are added up.
+
+    :param graph: The graph in NetworkX MultiDiGraph format.
+    :return: A dictionary with the weight of each (parent, child) edge.
+    """
+    weights = dict()
+    for parent, child, weight in graph.edges(data='weight', default=0):
+        edge = (parent, child)
+        weights[edge] = weights.get(edge, 0) + weight
+    return weights
+
+
+class GraphDiff(object):
+    """
+    GraphDiff is the difference between two graphs, as the edges added, removed and changed from the first to the
+    second. Weights are numeric: added edges map to their weight, removed edges to the weight they lost (negative)
+    and changed edges to the difference between their weights.
+
+    Iterating over a GraphDiff yields (parent, child, {'weight': delta}) tuples, the format of networkx
+    edges(data=True), so it can be stored as any graph.
+    """
+
+    def __init__(self, added: dict = None, removed: dict = None, changed: dict = None, name: str = None):
+        """
+        Initiate a new GraphDiff.
+
+        :param added: The weight of each added (parent, child) edge.
+        :param removed: The negative weight of each removed (parent, child) edge.
+        :param changed: The weight difference of each changed (parent, child) edge.
+        :param name: The name of the difference.
+        """
+        self.added = added if added is not None else dict()
+        self.removed = removed if removed is not None else dict()
+        self.changed = changed if changed is not None else dict()
+        self.name = name
+
+    @classmethod
+    def from_edge_weights(cls, first_edge_weights: dict, second_edge_weights: dict, name: str = None):
+        """
+        Performs the difference between two edge weight maps, in time linear in the number of edges.
+
+        :param first_edge_weights: The weight of each (parent, child) edge of the first graph.
+        :param second_edge_weights: The weight of each (parent, child) edge of the second graph.
+        :param name: The name of the difference.
+        :return: The GraphDiff.
+        """
+        added = dict()
+        removed = dict()
+        changed = dict()
+
+        for edge, weight in first_edge_weights.items():
+            second_weight = second_edge_weights.get(edge)
+            if second_weight is None:
+                removed[edge] = -weight
+            elif second_weight != weight:
+                changed[edge] = second_weight - weight
+
+        for edge, weight in second_edge_weights.items():
+            if edge not in first_edge_weights:
+                added[edge] = weight
+
+        return cls(added, removed, changed, name)
+
+    @classmethod
+    def from_graphs(cls, first_graph: nx.MultiDiGraph, second_graph: nx.MultiDiGraph, name: str = None):
+        """
+        Performs the difference between two graphs, without copying them.
+
+        :param first_graph: The first named Graph in NetworkX MultiDiGraph format.
+        :param second_graph: The second named Graph in NetworkX MultiDiGraph format.
+        :param name: The name of the difference, graph_<first end>_<second end> of the graph names by default.
+        :return: The GraphDiff.
+        """
+        if name is None:
+            name = 'graph_{}_{}'.format(first_graph.name.split('_')[1], second_graph.name.split('_')[-1])
+        return cls.from_edge_weights(edge_weights(first_graph), edge_weights(second_graph), name)
+
+    def __iter__(self):
+        for edges in (self.removed, self.changed, self.added):
+            for (parent, child), weight in edges.items():
+                yield parent, child, {'weight': weight}
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+    @property
+    def nodes(self) -> set:
+        """ The nodes of the changed edges. """
+        return {node for parent, child, _ in self for node in (parent, child)}
+
+    def edges(self) -> list:
+        """
+        Gets the changed edges.
+
+        :return: A list of (parent, child, {'weight': delta}) tuples.
+        """
+        return list(self)
+
+    def to_graph(self) -> nx.MultiDiGraph:
+        """
+        Converts the difference into a graph with an edge for each changed edge.
+
+        :return: The graph in NetworkX MultiDiGraph format.
+        """
+        graph = nx.MultiDiGraph()
+        graph.add_edges_from(self)
+        if self.name is not None:
+            graph.name = self.name
+        return graph
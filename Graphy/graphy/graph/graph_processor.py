@@ -1,11 +1,12 @@
 """
     Author: André Bento
-    Date last modified: 08-04-2019
+    Date last modified: 18-10-2026
 """
 from collections import defaultdict
 
 import networkx as nx
 
+from graphy.graph.graph_diff import GraphDiff
 from graphy.utils import dict as my_dict
 from graphy.utils import list as my_list
 from graphy.utils import logger as my_logger
@@ -16,12 +17,23 @@ logger = my_logger.setup_logging(__name__)
 class GraphProcessor:
     """ GraphProcessor contains a collection of methods to handle Graphs. """
 
-    def __init__(self):
-        """ Initiate a new GraphProcessor. """
+    def __init__(self, incremental: bool = False):
+        """
+        Initiate a new GraphProcessor.
+
+        :param incremental: Update the graph in place with the changes between consecutive windows, instead of
+        rebuilding it. The graph object is then shared by all the windows, copy it to keep the graph of a window. The
+        controller shares one incremental GraphProcessor between the windows of an analysis in time when they run one
+        at a time.
+        """
         self.__graph = nx.MultiDiGraph()
+        self.__incremental = incremental
 
+        # Memo of the last generated window.
         self.__start_timestamp = None
         self.__end_timestamp = None
+        self.__edge_weights = None
+        self.__last_delta = None
 
         self.span_tree = None
 
@@ -29,6 +41,20 @@ class GraphProcessor:
     def graph(self):
         return self.__graph
 
+    @property
+    def incremental(self) -> bool:
+        return self.__incremental
+
+    @property
+    def edge_weights(self) -> dict:
+        """ The weight of each (parent, child) edge of the last generated window. """
+        return self.__edge_weights if self.__edge_weights is not None else dict()
+
+    @property
+    def last_delta(self) -> GraphDiff:
+        """ The GraphDiff applied by the last incremental update, None after a full build. """
+        return self.__last_delta
+
     def generate_graph(self, tuple_list):
         """
         Generates the graph using the tuple list.
@@ -42,62 +68,72 @@ class GraphProcessor:
     def generate_graph_from_zipkin(self, dependencies, start_timestamp, end_timestamp):
         """
         Generates the graph using the Dependencies from Zipkin.
+        Generating the same window twice returns the memoized graph. In incremental mode only the edges that
+        changed since the last window are added, removed or reweighted.
 
         :param dependencies: Graph dependencies data in Zipkin format.
         :param start_timestamp: Start unix timestamp of the graph.
         :param end_timestamp: End unix timestamp of the graph.
         :return: Generated graph.
         """
-        if start_timestamp == self.__start_timestamp and end_timestamp == self.__end_timestamp:
+        if self.__edge_weights is not None and start_timestamp == self.__start_timestamp and \
+                end_timestamp == self.__end_timestamp:
             return self.__graph
 
-        self.__graph.clear()
+        edge_weights = dict()
         for dependency in dependencies:
-            self.__graph.add_edge(dependency['parent'],
-                                  dependency['child'],
-                                  weight=dependency['callCount'])
+            edge = (dependency['parent'], dependency['child'])
+            edge_weights[edge] = edge_weights.get(edge, 0) + dependency['callCount']
+
+        if self.__incremental and self.__edge_weights is not None:
+            self.__last_delta = self.__apply_delta(edge_weights)
+        else:
+            # One edge per (parent, child), with the summed call count, as the incremental updates keep it.
+            self.__graph.clear()
+            for (parent, child), weight in edge_weights.items():
+                self.__graph.add_edge(parent, child, weight=weight)
+            self.__last_delta = None
+
+        self.__start_timestamp = start_timestamp
+        self.__end_timestamp = end_timestamp
+        self.__edge_weights = edge_weights
         return self.__graph
 
+    def __apply_delta(self, edge_weights: dict) -> GraphDiff:
+        """
+        Updates the graph in place from the edges of the last window to new ones.
+
+        :param edge_weights: The weight of each (parent, child) edge of the new window.
+        :return: The applied GraphDiff.
+        """
+        delta = GraphDiff.from_edge_weights(self.__edge_weights, edge_weights)
+
+        for (parent, child) in delta.removed:
+            self.__graph.remove_edge(parent, child)
+            # A full build only has nodes with edges.
+            for node in {parent, child}:
+                if self.__graph.degree(node) == 0:
+                    self.__graph.remove_node(node)
+        for (parent, child), weight in delta.added.items():
+            self.__graph.add_edge(parent, child, weight=weight)
+        for (parent, child) in delta.changed:
+            self.__graph[parent][child][0]['weight'] = edge_weights[(parent, child)]
+
+        logger.debug('graph delta: {} added, {} removed, {} changed edges'.format(
+            len(delta.added), len(delta.removed), len(delta.changed)))
+        return delta
+
     @staticmethod
     def graphs_difference(first_graph: nx.MultiDiGraph, second_graph: nx.MultiDiGraph, graph_name: str = None):
         """
-        Performs the difference between two graphs.
+        Performs the difference between two graphs, see GraphDiff.
 
         :param first_graph: The first named Graph in NetworkX MultiDiGraph format.
         :param second_graph: The second named Graph in NetworkX MultiDiGraph format.
         :param graph_name: The name of the resulting graph.
         :return: The resulting difference between the graphs.
         """
-        g_diff = nx.MultiDiGraph()
-        graph_1 = first_graph.copy()  # Copy to preserve values.
-        graph_2 = second_graph.copy()
-
-        # Cycle through all edges in the first graph.
-        for n in graph_1.edges:
-            if n not in graph_2.edges:
-                edge_weight = graph_1.get_edge_data(n[0], n[1])[0].get('weight')
-                edge_weight = str(int(edge_weight) * -1)  # Lost node.
-                g_diff.add_edge(n[0], n[1], weight=edge_weight)
-            else:
-                first_edge_weight = graph_1.get_edge_data(n[0], n[1])[0].get('weight')
-                second_edge_weight = graph_2.get_edge_data(n[0], n[1])[0].get('weight')
-                if first_edge_weight != second_edge_weight:
-                    g_diff.add_edge(n[0], n[1], weight=second_edge_weight - first_edge_weight)
-                graph_2.remove_edge(n[0], n[1])  # Remove edge to reduce size.
-
-        # Cycle through all remaining edges in second_graph.
-        for n in graph_2.edges:
-            if n not in graph_1.edges:
-                edge_weight = graph_2.get_edge_data(n[0], n[1])[0].get('weight')
-                g_diff.add_edge(n[0], n[1], weight=edge_weight)
-
-        if graph_name is None:
-            start_timestamp = graph_1.name.split('_')[1]
-            end_timestamp = graph_2.name.split('_')[-1]
-            graph_name = 'graph_{}_{}'.format(start_timestamp, end_timestamp)
-        g_diff.name = graph_name
-
-        return g_diff
+        return GraphDiff.from_graphs(first_graph, second_graph, graph_name).to_graph()
 
     @staticmethod
     def graphs_variance(previous_graph: nx.MultiDiGraph, current_graph: nx.MultiDiGraph) -> dict:
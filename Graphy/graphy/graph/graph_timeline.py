@@ -0,0 +1,206 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from collections import OrderedDict
+
+import networkx as nx
+
+from graphy.graph.graph_diff import GraphDiff, edge_weights as graph_edge_weights
+from graphy.utils import config
+from graphy.utils import logger as my_logger
+
+logger = my_logger.setup_logging(__name__)
+
+graphy_config = config.get('GRAPHY')
+
+
+class GraphTimeline(object):
+    """
+    GraphTimeline keeps the graphs of consecutive time windows in memory.
+
+    Every checkpoint_interval windows the full edge weights of a window are stored as a checkpoint, the other windows
+    are stored as the GraphDiff from the previous one. A window is rebuilt from the closest checkpoint, or materialized
+    window, before it; the last cache_size materialized windows are kept in a LRU cache. Only the last retention
+    windows are kept, the oldest window left is compacted into a checkpoint.
+    """
+
+    def __init__(self, checkpoint_interval: int = graphy_config.get('TIMELINE_CHECKPOINT_INTERVAL', 24),
+                 cache_size: int = graphy_config.get('TIMELINE_CACHE_SIZE', 16),
+                 retention: int = graphy_config.get('TIMELINE_RETENTION', 10080)):
+        """
+        Initiate a new GraphTimeline.
+
+        :param checkpoint_interval: The number of windows between checkpoints.
+        :param cache_size: The number of materialized windows kept in memory.
+        :param retention: The number of windows kept in the timeline.
+        """
+        self.__checkpoint_interval = max(checkpoint_interval, 1)
+        self.__cache_size = max(cache_size, 1)
+        self.__retention = max(retention, 1)
+
+        self.__sequences = dict()  # (start, end) -> sequence number.
+        self.__windows = dict()  # sequence number -> (start, end).
+        self.__entries = dict()  # sequence number -> checkpoint edge weights or GraphDiff.
+        self.__first_sequence = 0
+        self.__next_sequence = 0
+        self.__last_checkpoint = None
+
+        self.__last_edge_weights = None
+        self.__cache = OrderedDict()
+
+    def __len__(self):
+        return len(self.__windows)
+
+    def __contains__(self, window: tuple):
+        return window in self.__sequences
+
+    @property
+    def windows(self) -> list:
+        """ The (start, end) windows in the timeline, oldest first. """
+        return [self.__windows[sequence] for sequence in range(self.__first_sequence, self.__next_sequence)]
+
+    @property
+    def checkpoint_count(self) -> int:
+        return sum(1 for entry in self.__entries.values() if isinstance(entry, dict))
+
+    @property
+    def cached_count(self) -> int:
+        return len(self.__cache)
+
+    def append(self, start_timestamp: int, end_timestamp: int, graph) -> bool:
+        """
+        Adds the graph of the window after the last one.
+
+        :param start_timestamp: Start unix timestamp of the window.
+        :param end_timestamp: End unix timestamp of the window.
+        :param graph: The graph in NetworkX MultiDiGraph format, or the weight of each (parent, child) edge.
+        :return: True if the window was added, False if it was already in the timeline.
+        """
+        window = (start_timestamp, end_timestamp)
+        if window in self.__sequences:
+            return False
+        if self.__windows and start_timestamp < self.__windows[self.__next_sequence - 1][0]:
+            raise ValueError('window {} is older than the last window of the timeline'.format(window))
+
+        edge_weights = graph_edge_weights(graph) if isinstance(graph, nx.Graph) else dict(graph)
+
+        sequence = self.__next_sequence
+        if self.__last_checkpoint is None or sequence - self.__last_checkpoint >= self.__checkpoint_interval:
+            self.__entries[sequence] = edge_weights
+            self.__last_checkpoint = sequence
+        else:
+            self.__entries[sequence] = GraphDiff.from_edge_weights(self.__last_edge_weights, edge_weights)
+
+        self.__sequences[window] = sequence
+        self.__windows[sequence] = window
+        self.__next_sequence += 1
+        self.__last_edge_weights = edge_weights
+        self.__cache_put(sequence, edge_weights)
+
+        while len(self.__windows) > self.__retention:
+            self.__drop_first()
+
+        return True
+
+    def previous(self, start_timestamp: int, end_timestamp: int) -> tuple:
+        """
+        Gets the window before a window.
+
+        :param start_timestamp: Start unix timestamp of the window.
+        :param end_timestamp: End unix timestamp of the window.
+        :return: The previous (start, end) window, or None for the first window.
+        """
+        return self.__windows.get(self.__sequence(start_timestamp, end_timestamp) - 1)
+
+    def edge_weights(self, start_timestamp: int, end_timestamp: int) -> dict:
+        """
+        Gets the edges of a window.
+
+        :param start_timestamp: Start unix timestamp of the window.
+        :param end_timestamp: End unix timestamp of the window.
+        :return: A dictionary with the weight of each (parent, child) edge.
+        """
+        return dict(self.__materialize(self.__sequence(start_timestamp, end_timestamp)))
+
+    def graph(self, start_timestamp: int, end_timestamp: int) -> nx.MultiDiGraph:
+        """
+        Rebuilds the graph of a window.
+
+        :param start_timestamp: Start unix timestamp of the window.
+        :param end_timestamp: End unix timestamp of the window.
+        :return: The graph in NetworkX MultiDiGraph format, named <start>_<end>.
+        """
+        graph = nx.MultiDiGraph(name='{}_{}'.format(start_timestamp, end_timestamp))
+        graph.add_edges_from((parent, child, {'weight': weight}) for (parent, child), weight in
+                             self.__materialize(self.__sequence(start_timestamp, end_timestamp)).items())
+        return graph
+
+    def diff(self, first_window: tuple, second_window: tuple) -> GraphDiff:
+        """
+        Performs the difference between the graphs of two windows.
+
+        :param first_window: The first (start, end) window.
+        :param second_window: The second (start, end) window.
+        :return: The GraphDiff, named graph_<first end>_<second end>.
+        """
+        return GraphDiff.from_edge_weights(self.__materialize(self.__sequence(*first_window)),
+                                           self.__materialize(self.__sequence(*second_window)),
+                                           'graph_{}_{}'.format(first_window[1], second_window[1]))
+
+    def __sequence(self, start_timestamp: int, end_timestamp: int) -> int:
+        sequence = self.__sequences.get((start_timestamp, end_timestamp))
+        if sequence is None:
+            raise KeyError('window {} is not in the timeline'.format((start_timestamp, end_timestamp)))
+        return sequence
+
+    def __materialize(self, sequence: int) -> dict:
+        """
+        Rebuilds the edges of a window, from the closest cached window or checkpoint before it.
+        The returned dictionary is shared with the cache and must not be changed.
+
+        :param sequence: The sequence number of the window.
+        :return: A dictionary with the weight of each (parent, child) edge.
+        """
+        if sequence in self.__cache:
+            self.__cache.move_to_end(sequence)
+            return self.__cache[sequence]
+
+        base = sequence
+        while base not in self.__cache and not isinstance(self.__entries[base], dict):
+            base -= 1
+        edge_weights = dict(self.__cache[base] if base in self.__cache else self.__entries[base])
+
+        for next_sequence in range(base + 1, sequence + 1):
+            graph_diff = self.__entries[next_sequence]
+            for edge in graph_diff.removed:
+                del edge_weights[edge]
+            for edge, weight in graph_diff.added.items():
+                edge_weights[edge] = weight
+            for edge, delta in graph_diff.changed.items():
+                edge_weights[edge] += delta
+
+        self.__cache_put(sequence, edge_weights)
+        return edge_weights
+
+    def __cache_put(self, sequence: int, edge_weights: dict):
+        self.__cache[sequence] = edge_weights
+        self.__cache.move_to_end(sequence)
+        while len(self.__cache) > self.__cache_size:
+            self.__cache.popitem(last=False)
+
+    def __drop_first(self):
+        """ Drops the oldest window, the new oldest window becomes a checkpoint. """
+        sequence = self.__first_sequence
+        next_sequence = sequence + 1
+
+        if next_sequence in self.__entries and not isinstance(self.__entries[next_sequence], dict):
+            self.__entries[next_sequence] = self.__materialize(next_sequence)
+            if self.__last_checkpoint < next_sequence:
+                self.__last_checkpoint = next_sequence
+
+        del self.__sequences[self.__windows.pop(sequence)]
+        del self.__entries[sequence]
+        self.__cache.pop(sequence, None)
+        self.__first_sequence = next_sequence
+        logger.debug('graph timeline compacted up to window {}'.format(self.__windows.get(next_sequence)))
@@ -0,0 +1,172 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from graphy.models import span as my_span
+
+SERVICE_KINDS = ('SERVER', None, 'CLIENT', 'PRODUCER', 'CONSUMER')
+
+
+class DependencyLinker(object):
+    """
+    DependencyLinker computes the dependency links between services from spans in Zipkin v2 format, as the Zipkin
+    /dependencies endpoint does: a SERVER span is called by the service of its CLIENT side, of its remote endpoint, or
+    else of its closest ancestor with a known service, and a CLIENT span without a SERVER side is a call to its remote
+    endpoint, unless a SERVER child span records that side of the call. A call is an error if either side has an error
+    tag.
+
+    Spans are added one at a time, in any order, and only the endpoints, the parent and the error flag of each span are
+    kept until its trace is linked. Linkers of different shards or windows can be merged, also when the spans of a
+    trace are split between them.
+    """
+
+    def __init__(self):
+        """ Initiate a new DependencyLinker. """
+        self.__links = dict()  # (parent, child) -> [call count, error count].
+        self.__traces = dict()  # trace id -> span id -> kind -> span endpoints.
+
+    def __len__(self):
+        return len(self.__links)
+
+    @property
+    def pending_traces(self) -> int:
+        """ The number of traces with spans not linked yet. """
+        return len(self.__traces)
+
+    def add_span(self, span: dict):
+        """
+        Adds a span, linked with the rest of its trace by complete or link.
+
+        :param span: The span in Zipkin v2 format, see graphy.models.span.to_v2.
+        :return: The DependencyLinker.
+        """
+        remote_endpoint = span.get('remoteEndpoint') or dict()
+        spans = self.__traces.setdefault(span.get('traceId'), dict())
+        spans.setdefault(span.get('id'), dict())[span.get('kind')] = (
+            my_span.get_service_name(span), remote_endpoint.get('serviceName'), span.get('parentId'),
+            'error' in (span.get('tags') or dict()))
+        return self
+
+    def add_spans(self, spans):
+        """
+        Adds spans from any number of traces.
+
+        :param spans: An iterable of spans in Zipkin v2 format.
+        :return: The DependencyLinker.
+        """
+        for span in spans:
+            self.add_span(span)
+        return self
+
+    def add_trace(self, trace: list):
+        """
+        Adds and links a whole trace.
+
+        :param trace: The trace in Zipkin v2 format.
+        :return: The DependencyLinker.
+        """
+        self.add_spans(trace)
+        if trace:
+            self.complete(trace[0].get('traceId'))
+        return self
+
+    def add_traces(self, traces):
+        """
+        Adds and links whole traces, e.g. a Zipkin get_traces response.
+
+        :param traces: An iterable of traces in Zipkin v2 format.
+        :return: The DependencyLinker.
+        """
+        for trace in traces:
+            self.add_trace(trace)
+        return self
+
+    def complete(self, trace_id=None):
+        """
+        Links the spans of a trace, or of every trace, once all of its spans were added.
+
+        :param trace_id: The trace id, all the pending traces by default.
+        :return: The DependencyLinker.
+        """
+        trace_ids = list(self.__traces) if trace_id is None else [trace_id]
+        for pending_trace_id in trace_ids:
+            spans = self.__traces.pop(pending_trace_id, None)
+            if spans:
+                self.__link_trace(spans)
+        return self
+
+    def __link_trace(self, spans: dict):
+        """
+        Links the spans of a trace.
+
+        :param spans: The (service, remote service, parent id, error) of each kind of each span id.
+        """
+        def service_name(span_id):
+            sides = spans.get(span_id, dict())
+            for kind in SERVICE_KINDS:
+                if kind in sides and sides[kind][0]:
+                    return sides[kind][0]
+            return None
+
+        # Client spans with a SERVER child are linked by the child, as it is the other side of the call.
+        server_parent_ids = {sides['SERVER'][2] for sides in spans.values() if 'SERVER' in sides}
+
+        for span_id, sides in spans.items():
+            server_span = sides.get('SERVER')
+            client_span = sides.get('CLIENT')
+
+            if server_span is not None:
+                child = server_span[0]
+                parent = (client_span[0] if client_span is not None else None) or server_span[1]
+
+                ancestor_id = server_span[2]
+                visited = {span_id}
+                while parent is None and ancestor_id is not None and ancestor_id not in visited:
+                    visited.add(ancestor_id)
+                    parent = service_name(ancestor_id)
+                    ancestor_id = next((ancestor[2] for ancestor in spans.get(ancestor_id, dict()).values()), None)
+            elif client_span is not None and span_id not in server_parent_ids:
+                parent, child = client_span[0], client_span[1]
+            else:
+                continue
+
+            if parent and child:
+                is_error = any(side is not None and side[3] for side in (server_span, client_span))
+                self.__add_link(parent, child, 1, int(is_error))
+
+    def __add_link(self, parent: str, child: str, call_count: int, error_count: int):
+        link = self.__links.get((parent, child))
+        if link is None:
+            self.__links[(parent, child)] = [call_count, error_count]
+        else:
+            link[0] += call_count
+            link[1] += error_count
+
+    def merge(self, other):
+        """
+        Merges the links and the pending spans of another DependencyLinker, e.g. of another shard or window.
+
+        :param other: The other DependencyLinker.
+        :return: The DependencyLinker.
+        """
+        for (parent, child), (call_count, error_count) in other.__links.items():
+            self.__add_link(parent, child, call_count, error_count)
+        for trace_id, spans in other.__traces.items():
+            for span_id, sides in spans.items():
+                self.__traces.setdefault(trace_id, dict()).setdefault(span_id, dict()).update(sides)
+        return self
+
+    def link(self) -> list:
+        """
+        Links the pending traces and gets the dependency links.
+
+        :return: The dependencies data in Zipkin format, the input of GraphProcessor.generate_graph_from_zipkin.
+        """
+        self.complete()
+        dependencies = list()
+        for (parent, child), (call_count, error_count) in sorted(self.__links.items()):
+            dependency = {'parent': parent, 'child': child, 'callCount': call_count}
+            if error_count:
+                dependency['errorCount'] = error_count
+            dependencies.append(dependency)
+        return dependencies
@@ -0,0 +1,320 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import math
+
+import numpy as np
+
+from graphy.models import span as my_span
+from graphy.utils import config
+
+graphy_config = config.get('GRAPHY')
+
+relative_accuracy = graphy_config.get('LATENCY_SKETCH_RELATIVE_ACCURACY', 0.01)
+max_bins = graphy_config.get('LATENCY_SKETCH_MAX_BINS', 2048)
+
+QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99, 'p999': 0.999}
+
+
+class LatencySketch(object):
+    """
+    LatencySketch estimates the quantiles of a stream of durations with a bounded relative error, in the manner of
+    DDSketch: a duration x is counted in the bin ceil(log(x) / log(gamma)), gamma = (1 + a) / (1 - a), so the estimate
+    of any quantile is within a relative accuracy a of the true value.
+
+    Adding a value is O(1) and the memory is bounded by max_bins: past that, the lowest bins are collapsed into one,
+    which only affects the accuracy of the lowest quantiles. The count, sum, min and max are exact. Sketches with the
+    same relative accuracy can be merged, e.g. of different windows or workers.
+    """
+
+    def __init__(self, relative_accuracy: float = relative_accuracy, max_bins: int = max_bins):
+        """
+        Initiate a new LatencySketch.
+
+        :param relative_accuracy: The relative accuracy of the quantiles, between 0 and 1.
+        :param max_bins: The maximum number of bins kept.
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative accuracy must be between 0 and 1, got {}'.format(relative_accuracy))
+
+        self.__relative_accuracy = relative_accuracy
+        self.__max_bins = max_bins
+        self.__gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.__log_gamma = math.log(self.__gamma)
+
+        self.__bins = dict()  # bin index -> count.
+        self.__min_index = None  # every bin below it was collapsed into it.
+        self.__zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def relative_accuracy(self) -> float:
+        return self.__relative_accuracy
+
+    @property
+    def avg(self) -> float:
+        """ The exact mean of the values, -1 if the sketch is empty. """
+        if not self.count:
+            return -1
+        return self.sum / self.count
+
+    def __index(self, value: float) -> int:
+        index = math.ceil(math.log(value) / self.__log_gamma)
+        if self.__min_index is not None and index < self.__min_index:
+            return self.__min_index
+        return index
+
+    def __collapse(self):
+        """ Collapses the lowest bins into one, until there are at most max_bins bins. """
+        if len(self.__bins) <= self.__max_bins:
+            return
+        indexes = sorted(self.__bins)
+        collapsed = indexes[:len(indexes) - self.__max_bins + 1]
+        self.__min_index = collapsed[-1]
+        self.__bins[self.__min_index] = sum(self.__bins.pop(index) for index in collapsed)
+
+    def __update_range(self, count: int, total: float, minimum: float, maximum: float):
+        self.count += count
+        self.sum += total
+        self.min = minimum if self.min is None else min(self.min, minimum)
+        self.max = maximum if self.max is None else max(self.max, maximum)
+
+    def add(self, value: float, count: int = 1):
+        """
+        Adds a value.
+
+        :param value: The value, e.g. a duration in microseconds. Values of 0 or less are counted as 0.
+        :param count: The number of times the value is added.
+        :return: The LatencySketch.
+        """
+        if count <= 0:
+            return self
+        if value > 0:
+            index = self.__index(value)
+            self.__bins[index] = self.__bins.get(index, 0) + count
+            self.__collapse()
+        else:
+            value = 0
+            self.__zero_count += count
+        self.__update_range(count, value * count, value, value)
+        return self
+
+    def add_values(self, values):
+        """
+        Adds many values at once.
+
+        :param values: A list or NumPy array of values.
+        :return: The LatencySketch.
+        """
+        values = np.maximum(np.asarray(values, dtype=np.float64).ravel(), 0)
+        if not len(values):
+            return self
+
+        positive = values[values > 0]
+        if len(positive):
+            indexes = np.ceil(np.log(positive) / self.__log_gamma).astype(np.int64)
+            if self.__min_index is not None:
+                indexes = np.maximum(indexes, self.__min_index)
+            indexes, counts = np.unique(indexes, return_counts=True)
+            for index, count in zip(indexes.tolist(), counts.tolist()):
+                self.__bins[index] = self.__bins.get(index, 0) + count
+            self.__collapse()
+        self.__zero_count += len(values) - len(positive)
+        self.__update_range(len(values), float(values.sum()), float(values.min()), float(values.max()))
+        return self
+
+    def merge(self, other):
+        """
+        Merges the values of another LatencySketch, e.g. of another window or worker.
+
+        :param other: The other LatencySketch, with the same relative accuracy.
+        :return: The LatencySketch.
+        """
+        if other.__relative_accuracy != self.__relative_accuracy:
+            raise ValueError('cannot merge sketches with relative accuracies {} and {}'.format(
+                self.__relative_accuracy, other.__relative_accuracy))
+        if not other.count:
+            return self
+
+        if other.__min_index is not None and (self.__min_index is None or other.__min_index > self.__min_index):
+            self.__min_index = other.__min_index
+            for index in [index for index in self.__bins if index < self.__min_index]:
+                self.__bins[self.__min_index] = self.__bins.get(self.__min_index, 0) + self.__bins.pop(index)
+        for index, count in other.__bins.items():
+            index = index if self.__min_index is None else max(index, self.__min_index)
+            self.__bins[index] = self.__bins.get(index, 0) + count
+        self.__collapse()
+
+        self.__zero_count += other.__zero_count
+        self.__update_range(other.count, other.sum, other.min, other.max)
+        return self
+
+    def quantile(self, quantile: float) -> float:
+        """
+        Estimates a quantile of the values.
+
+        :param quantile: The quantile, between 0 and 1.
+        :return: The estimated value, None if the sketch is empty.
+        """
+        if not 0 <= quantile <= 1:
+            raise ValueError('quantile must be between 0 and 1, got {}'.format(quantile))
+        if not self.count:
+            return None
+
+        rank = quantile * (self.count - 1)
+        if rank < self.__zero_count:
+            return 0.0
+        if rank >= self.count - 1:
+            return self.max
+
+        cumulative_count = self.__zero_count
+        value = self.max
+        for index in sorted(self.__bins):
+            cumulative_count += self.__bins[index]
+            if cumulative_count > rank:
+                value = 2 * self.__gamma ** index / (self.__gamma + 1)
+                break
+        return min(max(value, self.min), self.max)
+
+    def quantiles(self, quantiles: dict = None) -> dict:
+        """
+        Estimates many quantiles of the values.
+
+        :param quantiles: The quantile of each name, QUANTILES (p50, p90, p99 and p999) by default.
+        :return: A dictionary with the estimated value of each quantile name, empty if the sketch is empty.
+        """
+        if not self.count:
+            return dict()
+        quantiles = QUANTILES if quantiles is None else quantiles
+        return {name: self.quantile(quantile) for name, quantile in quantiles.items()}
+
+
+class LatencySketches(object):
+    """
+    LatencySketches keeps a LatencySketch of the span durations of each endpoint, the span name, of each service.
+    Like LatencySketch, it is updated one span at a time and can be merged.
+    """
+
+    def __init__(self, relative_accuracy: float = relative_accuracy, max_bins: int = max_bins):
+        """
+        Initiate a new LatencySketches.
+
+        :param relative_accuracy: The relative accuracy of the sketches.
+        :param max_bins: The maximum number of bins of each sketch.
+        """
+        self.__relative_accuracy = relative_accuracy
+        self.__max_bins = max_bins
+        self.__sketches = dict()  # (service name, endpoint) -> LatencySketch.
+
+    def __len__(self):
+        return len(self.__sketches)
+
+    @property
+    def service_names(self) -> list:
+        return sorted({service_name for service_name, _ in self.__sketches})
+
+    def endpoints(self, service_name: str) -> list:
+        """
+        Gets the endpoints of a service.
+
+        :param service_name: The service name.
+        :return: The sorted list of endpoints.
+        """
+        return sorted(endpoint for name, endpoint in self.__sketches if name == service_name)
+
+    def __sketch(self, service_name: str, endpoint: str) -> LatencySketch:
+        sketch = self.__sketches.get((service_name, endpoint))
+        if sketch is None:
+            sketch = self.__sketches[(service_name, endpoint)] = LatencySketch(self.__relative_accuracy,
+                                                                               self.__max_bins)
+        return sketch
+
+    def add(self, service_name: str, endpoint: str, duration: float):
+        """
+        Adds the duration of a call to an endpoint.
+
+        :param service_name: The service name.
+        :param endpoint: The endpoint, the span name.
+        :param duration: The duration, in microseconds.
+        :return: The LatencySketches.
+        """
+        if service_name and duration is not None:
+            self.__sketch(service_name, endpoint or '').add(duration)
+        return self
+
+    def add_span(self, span: dict):
+        """
+        Adds the duration of a span to the sketch of its service and name.
+
+        :param span: The span in Zipkin v2 format.
+        :return: The LatencySketches.
+        """
+        return self.add(my_span.get_service_name(span), span.get('name'), span.get('duration'))
+
+    def add_spans(self, spans):
+        """
+        Adds the durations of spans.
+
+        :param spans: An iterable of spans in Zipkin v2 format.
+        :return: The LatencySketches.
+        """
+        for span in spans:
+            self.add_span(span)
+        return self
+
+    def add_traces(self, traces):
+        """
+        Adds the durations of the spans of traces.
+
+        :param traces: An iterable of traces in Zipkin v2 format, e.g. a Zipkin get_traces response.
+        :return: The LatencySketches.
+        """
+        for trace in traces:
+            self.add_spans(trace)
+        return self
+
+    def add_records(self, records):
+        """
+        Adds the durations of SpanRecord's.
+
+        :param records: An iterable of SpanRecord's, e.g. from graphy.utils.json.iter_span_records.
+        :return: The LatencySketches.
+        """
+        for record in records:
+            self.add(record.service_name, record.name, record.duration)
+        return self
+
+    def merge(self, other):
+        """
+        Merges the sketches of another LatencySketches, e.g. of another window or worker.
+
+        :param other: The other LatencySketches.
+        :return: The LatencySketches.
+        """
+        for (service_name, endpoint), sketch in other.__sketches.items():
+            self.__sketch(service_name, endpoint).merge(sketch)
+        return self
+
+    def sketch(self, service_name: str, endpoint: str = None) -> LatencySketch:
+        """
+        Gets the sketch of an endpoint of a service.
+
+        :param service_name: The service name.
+        :param endpoint: The endpoint, all the endpoints of the service merged by default.
+        :return: The LatencySketch, empty if there are no spans.
+        """
+        if endpoint is not None:
+            sketch = self.__sketches.get((service_name, endpoint))
+            return sketch if sketch is not None else LatencySketch(self.__relative_accuracy, self.__max_bins)
+
+        sketch = LatencySketch(self.__relative_accuracy, self.__max_bins)
+        for endpoint in self.endpoints(service_name):
+            sketch.merge(self.__sketches[(service_name, endpoint)])
+        return sketch
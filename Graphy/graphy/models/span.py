@@ -1,6 +1,6 @@
 """
     Author: André Bento
-    Date last modified: 20-03-2019
+    Date last modified: 18-10-2026
 
 Fields:
 -------
@@ -27,8 +27,11 @@ Notes:
 1. Time units are not consistent, some fields are in milliseconds and some are in microseconds
 2. Trace spans may contain more fields, except those mentioned here
 """
+import bisect
+from collections import namedtuple
+
+import numpy as np
 
-from graphy.utils import dict as my_dict
 from graphy.utils import logger as my_logger
 
 try:
@@ -38,8 +41,22 @@ except ImportError:
 
 logger = my_logger.setup_logging(__name__)
 
+# Timestamps are fixed to TIMESTAMP_LENGTH characters, microseconds.
+TIMESTAMP_LENGTH = 16
+POWERS_OF_TEN = [10 ** exponent for exponent in range(19)]
+POWERS_OF_TEN_ARRAY = np.array(POWERS_OF_TEN, dtype=np.int64)
+VECTORIZE_MIN_SIZE = 64
+
+# A compact record of the fields of a span the analyses use, cheap to pickle between processes.
+SpanRecord = namedtuple('SpanRecord', ['trace_id', 'id', 'parent_id', 'name', 'kind', 'service_name', 'timestamp',
+                                       'duration', 'status_code'])
+
 
 class Span(object):
+    """ Span is a record of all the span data sharing the same span id, e.g. the client and server sides of a call. """
+
+    __slots__ = ('id', 'parent_id', 'spans_data')
+
     def __init__(self, id: str, parent_id: str = None, spans_data: list = None):
         if spans_data is None:
             spans_data = list()
@@ -54,30 +71,94 @@ class Span(object):
             durations.append(span_data.get('duration', 0))
         return durations
 
+    @property
+    def duration(self) -> int:
+        """ The longest duration of the span data, in microseconds. """
+        return max(self.get_durations(), default=0)
+
+    @property
+    def timestamp(self) -> int:
+        """ The earliest timestamp of the span data, in microseconds. """
+        return min((span_data['timestamp'] for span_data in self.spans_data if 'timestamp' in span_data), default=0)
+
+    @property
+    def service_name(self) -> str:
+        """ The service that served the span, the server side if it was recorded, or None if it is unknown. """
+        service_name = None
+        for span_data in self.spans_data:
+            span_service_name = get_service_name(span_data)
+            if span_service_name and span_data.get('kind') == 'SERVER':
+                return span_service_name
+            if service_name is None:
+                service_name = span_service_name
+        return service_name
+
 
 def fix_timestamps(spans: list):
     """
-    Fixes multiple timestamp values in a span list.
+    Fixes the timestamp values of a span list, see fix_timestamp: the span timestamps and the annotation timestamps.
+    Integer timestamps are scaled at once, as a NumPy column, in batches of VECTORIZE_MIN_SIZE values or more.
 
     :param spans: The span list.
     """
-    timestamp = 'timestamp'
-
+    containers = list()
+    values = list()
     for span in spans:
-        my_dict.update(span, timestamp, fix_timestamp)
+        if 'timestamp' in span:
+            containers.append(span)
+            values.append(span['timestamp'])
+        annotations = span.get('annotations')
+        if isinstance(annotations, list):
+            for annotation in annotations:
+                if isinstance(annotation, dict) and 'timestamp' in annotation:
+                    containers.append(annotation)
+                    values.append(annotation['timestamp'])
+
+    if len(values) >= VECTORIZE_MIN_SIZE and all(type(value) is int and abs(value) < 2 ** 63 for value in values):
+        values = fix_timestamp_array(np.array(values, dtype=np.int64)).tolist()
+    else:
+        values = [fix_timestamp(value) for value in values]
+
+    for container, value in zip(containers, values):
+        container['timestamp'] = value
 
 
 def fix_timestamp(timestamp):
     """
     Fix timestamp values, due to a len issue when posting them to Zipkin.
+    Timestamps shorter than 16 characters are padded with zeros on the right, e.g. milliseconds become microseconds.
+    Integers are scaled by a power of ten instead of being padded as text.
 
     :param timestamp: The unix timestamp format.
     """
-    default_timestamp_len = 16
-    if len(str(timestamp)) < default_timestamp_len:
-        miss_len = default_timestamp_len - len(str(timestamp))
-        timestamp = str(timestamp) + ''.join(['0' for _ in range(miss_len)])
-        return int(timestamp)
+    if type(timestamp) is not int:
+        return __pad_timestamp(timestamp)
+
+    length = bisect.bisect_right(POWERS_OF_TEN, abs(timestamp)) + (timestamp < 0)  # len(str(timestamp)), 0 for 0.
+    if length < TIMESTAMP_LENGTH:
+        return timestamp * POWERS_OF_TEN[TIMESTAMP_LENGTH - max(length, 1)]
+    return timestamp
+
+
+def fix_timestamp_array(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Fixes a column of integer timestamps, see fix_timestamp.
+
+    :param timestamps: The timestamps, as an int64 array.
+    :return: The fixed timestamps.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    lengths = np.searchsorted(POWERS_OF_TEN_ARRAY, np.abs(timestamps), side='right') + (timestamps < 0)
+    lengths = np.maximum(lengths, 1)
+    scales = POWERS_OF_TEN_ARRAY[np.maximum(TIMESTAMP_LENGTH - lengths, 0)]
+    return np.where(lengths < TIMESTAMP_LENGTH, timestamps * scales, timestamps)
+
+
+def __pad_timestamp(timestamp):
+    """ Pads a timestamp of any type as text, the behaviour of fix_timestamp for values that are not integers. """
+    timestamp_len = len(str(timestamp))
+    if timestamp_len < TIMESTAMP_LENGTH:
+        return int(str(timestamp) + '0' * (TIMESTAMP_LENGTH - timestamp_len))
     return timestamp
 
 
@@ -91,3 +172,117 @@ def get_status_code(span):
     except Exception as e:
         logger.error(e)
         return False
+
+
+def get_service_name(span):
+    """
+    Gets the name of the service that recorded a span, in Zipkin v2 format.
+
+    :param span: The span.
+    :return: The service name or None if the span has no local endpoint.
+    """
+    local_endpoint = span.get('localEndpoint')
+    if local_endpoint:
+        return local_endpoint.get('serviceName')
+    return None
+
+
+def is_v2(span):
+    """
+    Checks if a span is in Zipkin v2 format.
+
+    :param span: The span.
+    :return: True if it is in v2 format, False if it is in v1 format.
+    """
+    return 'localEndpoint' in span or 'kind' in span or 'binaryAnnotations' not in span and 'annotations' not in span
+
+
+def to_v2(span):
+    """
+    Converts a span from Zipkin v1 to v2 format, the format returned by the Zipkin API v2.
+    A v1 span with both the client (cs, cr) and the server (sr, ss) annotations is split into a CLIENT and a shared
+    SERVER span. The binary annotations become tags, the other annotations are kept as v2 annotations.
+
+    :param span: The span, in v1 or v2 format.
+    :return: The list of v2 spans.
+    """
+    if is_v2(span):
+        span = dict(span)
+        if 'timestamp' in span:
+            span['timestamp'] = fix_timestamp(span['timestamp'])
+        return [span]
+
+    base = {key: span[key] for key in ('traceId', 'id', 'parentId', 'name') if span.get(key) is not None}
+
+    core_annotations = dict()
+    annotations = list()
+    for annotation in span.get('annotations', list()):
+        if annotation.get('value') in ('cs', 'cr', 'sr', 'ss'):
+            core_annotations[annotation['value']] = annotation
+        else:
+            annotations.append({'timestamp': annotation.get('timestamp'), 'value': annotation.get('value')})
+
+    binary_annotations = span.get('binaryAnnotations', list())
+    if isinstance(binary_annotations, dict):  # Some trace files have the binary annotations as a key value object.
+        binary_annotations = [{'key': key, 'value': value} for key, value in binary_annotations.items()]
+
+    tags = dict()
+    address_endpoints = dict()
+    for binary_annotation in binary_annotations:
+        key = binary_annotation.get('key')
+        if key in ('ca', 'sa'):
+            address_endpoints[key] = binary_annotation.get('endpoint')
+        else:
+            tags[key] = str(binary_annotation.get('value'))
+
+    spans = list()
+    for kind, start, end, remote_address in (('CLIENT', 'cs', 'cr', 'sa'), ('SERVER', 'sr', 'ss', 'ca')):
+        if start not in core_annotations:
+            continue
+        v2_span = dict(base, kind=kind, timestamp=core_annotations[start].get('timestamp'))
+        if end in core_annotations:
+            v2_span['duration'] = core_annotations[end].get('timestamp') - v2_span['timestamp']
+        if core_annotations[start].get('endpoint'):
+            v2_span['localEndpoint'] = core_annotations[start]['endpoint']
+        if address_endpoints.get(remote_address):
+            v2_span['remoteEndpoint'] = address_endpoints[remote_address]
+        spans.append(v2_span)
+
+    if len(spans) == 2:
+        client_span, server_span = spans
+        server_span['shared'] = True
+        if 'remoteEndpoint' not in client_span and 'localEndpoint' in server_span:
+            client_span['remoteEndpoint'] = server_span['localEndpoint']
+    elif not spans:
+        v2_span = dict(base)
+        if 'timestamp' in span:
+            v2_span['timestamp'] = fix_timestamp(span['timestamp'])
+        if 'duration' in span:
+            v2_span['duration'] = span['duration']
+        endpoints = [binary_annotation.get('endpoint') for binary_annotation in binary_annotations
+                     if binary_annotation.get('endpoint')]
+        if endpoints:
+            v2_span['localEndpoint'] = endpoints[0]
+        spans.append(v2_span)
+
+    if tags:
+        spans[0]['tags'] = tags
+        for v2_span in spans[1:]:
+            v2_span['tags'] = dict(tags)
+    if annotations:
+        spans[0]['annotations'] = annotations
+
+    return spans
+
+
+def to_record(span):
+    """
+    Gets the compact record of a span.
+
+    :param span: The span in Zipkin v2 format, see to_v2.
+    :return: The SpanRecord, with a 0 status code if the span has none.
+    """
+    status_code = (span.get('tags') or dict()).get('http.status_code')
+    return SpanRecord(span.get('traceId'), span.get('id'), span.get('parentId'), span.get('name'), span.get('kind'),
+                      get_service_name(span), span.get('timestamp', 0), span.get('duration', 0),
+                      int(status_code) if status_code and str(status_code).isdigit() else 0)
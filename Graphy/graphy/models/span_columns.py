@@ -0,0 +1,128 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from array import array
+
+import numpy as np
+
+
+class SpanColumns(object):
+    """
+    SpanColumns holds the spans of a collection of SpanTree's as NumPy columns, one row per span.
+
+    The rows of each trace are contiguous and in the breadth-first order of its SpanTree, so the root of a trace is its
+    first row. Parent indexes are row positions in the columns and -1 for roots.
+    """
+
+    def __init__(self, trace_ids: list, trace_offsets: np.ndarray, parent_index: np.ndarray, depths: np.ndarray,
+                 durations: np.ndarray, timestamps: np.ndarray, spans: np.ndarray):
+        """
+        Initiate a new SpanColumns.
+
+        :param trace_ids: The trace id of each trace code.
+        :param trace_offsets: The first row of each trace, followed by the total number of rows.
+        :param parent_index: The row of the parent of each span.
+        :param depths: The depth of each span in its trace.
+        :param durations: The duration of each span, in microseconds.
+        :param timestamps: The timestamp of each span, in microseconds.
+        :param spans: The Span object of each span.
+        """
+        self.trace_ids = trace_ids
+        self.trace_offsets = trace_offsets
+        self.parent_index = parent_index
+        self.depths = depths
+        self.durations = durations
+        self.timestamps = timestamps
+        self.spans = spans
+
+        self.span_counts = np.diff(trace_offsets)
+        self.trace_codes = np.repeat(np.arange(len(trace_ids)), self.span_counts)
+
+        self.__span_ids = None
+        self.__service_names = None
+
+    @classmethod
+    def from_span_trees(cls, span_trees: list):
+        """
+        Loads the spans of a list of SpanTree's into columns.
+
+        :param span_trees: The list of SpanTree's.
+        :return: The SpanColumns.
+        """
+        span_counts = np.fromiter((len(span_tree_obj.spans) for span_tree_obj in span_trees), dtype=np.int64,
+                                  count=len(span_trees))
+        trace_offsets = np.zeros(len(span_trees) + 1, dtype=np.int64)
+        np.cumsum(span_counts, out=trace_offsets[1:])
+
+        def column(name, dtype):
+            # Joining the array.array's first is a plain copy, NumPy would read them item by item.
+            values = array(getattr(span_trees[0], name).typecode) if span_trees else array('q')
+            for span_tree_obj in span_trees:
+                values.extend(getattr(span_tree_obj, name))
+            if not values:
+                return np.empty(0, dtype=dtype)
+            return np.frombuffer(values, dtype=values.typecode).astype(dtype)
+
+        parent_index = column('parent_index', np.int64)
+        # Shift the parent positions of each trace to row positions, the roots keep -1.
+        parent_index = np.where(parent_index >= 0, parent_index + np.repeat(trace_offsets[:-1], span_counts), -1)
+
+        spans = np.empty(int(trace_offsets[-1]), dtype=object)
+        spans[:] = [span_obj for span_tree_obj in span_trees for span_obj in span_tree_obj.spans]
+
+        return cls([span_tree_obj.trace_id for span_tree_obj in span_trees], trace_offsets, parent_index,
+                   column('depths', np.int64), column('durations', np.int64), column('timestamps', np.int64),
+                   spans)
+
+    def __len__(self):
+        return len(self.durations)
+
+    @property
+    def trace_count(self) -> int:
+        return len(self.trace_ids)
+
+    @property
+    def span_ids(self) -> np.ndarray:
+        """ The span id of each span. """
+        if self.__span_ids is None:
+            self.__span_ids = np.array([span_obj.id for span_obj in self.spans], dtype=object)
+        return self.__span_ids
+
+    @property
+    def service_names(self) -> np.ndarray:
+        """ The name of the service of each span, None if it is unknown. """
+        if self.__service_names is None:
+            self.__service_names = np.array([span_obj.service_name for span_obj in self.spans], dtype=object)
+        return self.__service_names
+
+    @property
+    def has_root(self) -> np.ndarray:
+        """ A mask of the traces with a root span. """
+        return self.span_counts > 0
+
+    @property
+    def roots(self) -> np.ndarray:
+        """ The row of the root span of each trace, or -1 if the trace is empty. """
+        return np.where(self.has_root, self.trace_offsets[:-1], -1)
+
+    def per_trace_sum(self, values: np.ndarray, mask: np.ndarray = None) -> np.ndarray:
+        """
+        Sums a column over the spans of each trace.
+
+        :param values: A column of values, one per span.
+        :param mask: A mask of the spans to sum, all by default.
+        :return: An array with the sum of each trace.
+        """
+        trace_codes = self.trace_codes if mask is None else self.trace_codes[mask]
+        values = values if mask is None else values[mask]
+        return np.bincount(trace_codes, weights=values, minlength=self.trace_count)
+
+    def per_trace_count(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Counts the spans of each trace.
+
+        :param mask: A mask of the spans to count.
+        :return: An array with the count of each trace.
+        """
+        return np.bincount(self.trace_codes[mask], minlength=self.trace_count)
@@ -1,10 +1,8 @@
 """
     Author: André Bento
-    Date last modified: 22-03-2019
+    Date last modified: 18-10-2026
 """
-
-from treelib import Tree
-from treelib.exceptions import NodeIDAbsentError
+from array import array
 
 from graphy.models import span as my_span
 from graphy.utils import logger as my_logger
@@ -13,21 +11,40 @@ logger = my_logger.setup_logging(__name__)
 
 
 class SpanTree(object):
-    """ SpanTree object is a representation of spans in a tree. """
+    """
+    SpanTree object is a representation of spans in a tree.
+
+    The spans reachable from the root are stored in breadth-first order, so a parent always comes before its children
+    and the children of a span are contiguous. Each span is referred to by its position in that order, and the tree
+    structure is kept in flat arrays indexed by position.
+    """
 
     def __init__(self):
         """Initiate a new SpanTree. """
         self.trace_id = None
-        self.span_tree = None
+        self.spans = list()
+        self.parent_index = array('l')
+        self.depths = array('l')
+        self.durations = array('q')
+        self.timestamps = array('q')
         self.orphan_spans = list()
 
+        self.__positions = dict()
+        self.__child_start = array('l')
+        self.__child_count = array('l')
+
+    @property
+    def root(self):
+        """ The position of the root span, or None if the tree is empty. """
+        return 0 if self.spans else None
+
     def count_spans(self):
         """
         Counts the number of spans in the span tree.
 
         :return: The number of spans in the span tree.
         """
-        return self.span_tree.size()
+        return len(self.spans)
 
     def depth(self) -> int:
         """
@@ -35,43 +52,137 @@ class SpanTree(object):
 
         :return: The maximum depth of the span tree.
         """
-        return self.span_tree.depth(self.span_tree)
+        return max(self.depths, default=0)
+
+    def position(self, span_id: str) -> int:
+        """
+        Gets the position of a span in the tree.
+
+        :param span_id: The span id.
+        :return: The position or None if the span is not in the tree.
+        """
+        return self.__positions.get(span_id)
+
+    def children(self, position: int) -> range:
+        """
+        Gets the children of a span.
+
+        :param position: The position of the span.
+        :return: The range of positions of the children.
+        """
+        start = self.__child_start[position]
+        return range(start, start + self.__child_count[position])
 
     def generate_span_tree(self, trace: list, show_span_tree: bool = False):
         """
         Generates a span tree from a collection of traces.
+        The spans are first indexed by id and then linked to their parents, so they may arrive in any order.
+        Spans that can not be reached from the root (missing parent, extra roots or cycles) go to orphan_spans.
 
         :param trace: A list of spans from a trace.
         :param show_span_tree: Show span tree or not.
         """
         trace_id = None
-        span_tree = Tree()
+        spans = dict()
+        durations = dict()
+        timestamps = dict()
+        root = None
 
+        # First pass: index the span data by span id.
         for span in trace:
-            try:
-                if trace_id and trace_id != span.get('traceId', None):
-                    raise Exception('Multiple trace id')
-                else:
-                    trace_id = span.get('traceId', None)
-
-                parent_id = span.get('parentId', None)
-                span_id = span.get('id', None)
-
-                node = span_tree.get_node(span_id)
-                if node:
-                    span_obj: my_span.Span = node.data
-                    span_obj.spans_data.append(span)
+            span_trace_id = span.get('traceId', None)
+            if trace_id != span_trace_id:
+                if trace_id is not None:
+                    logger.error('multiple trace ids in trace {}'.format(trace_id))
+                    continue
+                trace_id = span_trace_id
+
+            span_id = span.get('id', None)
+            duration = span.get('duration', 0)
+            timestamp = span.get('timestamp', 0)
+
+            span_obj = spans.get(span_id)
+            if span_obj is None:
+                span_obj = my_span.Span(id=span_id, parent_id=span.get('parentId', None), spans_data=[span])
+                spans[span_id] = span_obj
+                durations[span_id] = duration
+                timestamps[span_id] = timestamp
+                if root is None and (span_obj.parent_id is None or span_obj.parent_id == span_id):
+                    root = span_obj
+            else:
+                span_obj.spans_data.append(span)
+                if duration > durations[span_id]:
+                    durations[span_id] = duration
+                if timestamp and (not timestamps[span_id] or timestamp < timestamps[span_id]):
+                    timestamps[span_id] = timestamp
+
+        # Second pass: link the spans to their parents.
+        children = dict()
+        for span_id, span_obj in spans.items():
+            parent_id = span_obj.parent_id
+            if parent_id in spans and parent_id != span_id:
+                if parent_id in children:
+                    children[parent_id].append(span_obj)
                 else:
-                    span_obj = my_span.Span(id=span_id, parent_id=parent_id)
-                    span_obj.spans_data.append(span)
-                    span_tree.create_node(identifier=span_id, parent=parent_id, data=span_obj)
-            except NodeIDAbsentError:
-                self.orphan_spans.append(span_obj)
-            except Exception as ex:
-                logger.error('{}: {}'.format(type(ex), ex))
+                    children[parent_id] = [span_obj]
 
         self.trace_id = trace_id
-        self.span_tree = span_tree
+        if root is not None:
+            self.__build(root, children, durations, timestamps)
+
+        if len(self.spans) < len(spans):
+            self.orphan_spans = [span_obj for span_id, span_obj in spans.items() if span_id not in self.__positions]
 
         if show_span_tree:
-            span_tree.show(idhidden=False)
+            self.show()
+
+    def __build(self, root: my_span.Span, children: dict, durations: dict, timestamps: dict):
+        """
+        Lays the spans reachable from the root out in breadth-first order.
+
+        :param root: The root Span.
+        :param children: A dictionary with the list of child Span's of each span id.
+        :param durations: A dictionary with the duration of each span id.
+        :param timestamps: A dictionary with the timestamp of each span id.
+        """
+        order = [root]
+        parent_index = [-1]
+        depths = [0]
+        child_start = list()
+        child_count = list()
+
+        position = 0
+        while position < len(order):
+            span_children = children.get(order[position].id, ())
+            child_start.append(len(order))
+            child_count.append(len(span_children))
+            if span_children:
+                order.extend(span_children)
+                parent_index.extend([position] * len(span_children))
+                depths.extend([depths[position] + 1] * len(span_children))
+            position += 1
+
+        span_ids = [span_obj.id for span_obj in order]
+
+        self.spans = order
+        self.parent_index = array('l', parent_index)
+        self.depths = array('l', depths)
+        self.durations = array('q', [int(durations[span_id]) for span_id in span_ids])
+        self.timestamps = array('q', [int(timestamps[span_id]) for span_id in span_ids])
+
+        self.__positions = dict(zip(span_ids, range(len(span_ids))))
+        self.__child_start = array('l', child_start)
+        self.__child_count = array('l', child_count)
+
+    def show(self):
+        """ Prints the span tree. """
+        if self.root is None:
+            return
+
+        stack = [self.root]
+        while stack:
+            position = stack.pop()
+            span_obj = self.spans[position]
+            print('{}{} [{}] {}'.format('    ' * self.depths[position], span_obj.spans_data[0].get('name'),
+                                        span_obj.id, self.durations[position]))
+            stack.extend(reversed(self.children(position)))
@@ -0,0 +1,196 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from array import array
+
+import numpy as np
+
+from graphy.models import span as my_span
+
+STATUS_CLASSES = 10  # The first digit of a status code, 0XX to 9XX.
+FLUSH_SIZE = 64 * 1024
+
+
+def get_status_code(span: dict):
+    """
+    Gets the HTTP status code of a span.
+
+    :param span: The span in Zipkin v2 format.
+    :return: The http.status_code tag, or None if the span has none.
+    """
+    tags = span.get('tags')
+    return tags.get('http.status_code') if tags else None
+
+
+def status_class(status_code) -> int:
+    """
+    Gets the class of a status code, its first digit.
+
+    :param status_code: The status code, as in the http.status_code tag.
+    :return: The class, or -1 if the value is not a status code of 2 digits or more.
+    """
+    status_code = str(status_code) if status_code else ''
+    if len(status_code) > 1 and status_code[0].isdigit():
+        return int(status_code[0])
+    return -1
+
+
+class StatusCodeAggregator(object):
+    """
+    StatusCodeAggregator counts the status codes of spans by service and status class (2XX, 4XX, ...), from any stream
+    of spans, traces or SpanRecord's, without keeping them.
+
+    The counts are kept in an integer array with a row per service and a column per class. Spans are buffered as
+    (row, class) pairs in compact arrays and added to the counts in batches. Aggregators of different shards, windows
+    or workers can be merged.
+    """
+
+    def __init__(self):
+        """ Initiate a new StatusCodeAggregator. """
+        self.__service_rows = dict()
+        self.__counts = np.zeros((0, STATUS_CLASSES), dtype=np.int64)
+        self.__pending_rows = array('l')
+        self.__pending_classes = array('b')
+
+    @property
+    def service_names(self) -> list:
+        return sorted(service_name for service_name in self.__service_rows if service_name is not None)
+
+    def __row(self, service_name: str) -> int:
+        row = self.__service_rows.get(service_name)
+        if row is None:
+            row = self.__service_rows[service_name] = len(self.__service_rows)
+        return row
+
+    def __add(self, row: int, code_class: int):
+        self.__pending_rows.append(row)
+        self.__pending_classes.append(code_class)
+        if len(self.__pending_rows) >= FLUSH_SIZE:
+            self.__flush()
+
+    def __flush(self):
+        """ Adds the buffered (row, class) pairs to the counts. """
+        if len(self.__counts) < len(self.__service_rows):
+            counts = np.zeros((len(self.__service_rows), STATUS_CLASSES), dtype=np.int64)
+            counts[:len(self.__counts)] = self.__counts
+            self.__counts = counts
+        if self.__pending_rows:
+            cells = np.frombuffer(self.__pending_rows, dtype=np.dtype('l')) * STATUS_CLASSES + \
+                np.frombuffer(self.__pending_classes, dtype=np.int8)
+            self.__counts += np.bincount(cells, minlength=self.__counts.size).reshape(self.__counts.shape)
+            self.__pending_rows = array('l')
+            self.__pending_classes = array('b')
+
+    def add_span(self, span: dict, service_name: str = None):
+        """
+        Counts the status code of a span.
+
+        :param span: The span in Zipkin v2 format.
+        :param service_name: The service the span is counted for, the service that recorded it by default. Spans
+        without a service are only counted in the totals of all services.
+        :return: The StatusCodeAggregator.
+        """
+        code_class = status_class(get_status_code(span))
+        if code_class >= 0:
+            service_name = my_span.get_service_name(span) if service_name is None else service_name
+            self.__add(self.__row(service_name), code_class)
+        return self
+
+    def add_spans(self, spans):
+        """
+        Counts the status codes of spans, each for the service that recorded it.
+
+        :param spans: An iterable of spans in Zipkin v2 format.
+        :return: The StatusCodeAggregator.
+        """
+        for span in spans:
+            self.add_span(span)
+        return self
+
+    def add_trace(self, trace: list):
+        """
+        Counts the status codes of every span of a trace for each service in the trace, as
+        controller_logic.service_status_codes counts the traces of a service.
+
+        :param trace: The trace in Zipkin v2 format.
+        :return: The StatusCodeAggregator.
+        """
+        code_classes = [code_class for code_class in (status_class(get_status_code(span)) for span in trace)
+                        if code_class >= 0]
+        if code_classes:
+            service_names = {my_span.get_service_name(span) for span in trace}
+            for service_name in service_names:
+                if service_name:
+                    row = self.__row(service_name)
+                    for code_class in code_classes:
+                        self.__add(row, code_class)
+        return self
+
+    def add_traces(self, traces):
+        """
+        Counts the status codes of traces, see add_trace.
+
+        :param traces: An iterable of traces in Zipkin v2 format, e.g. a Zipkin get_traces response.
+        :return: The StatusCodeAggregator.
+        """
+        for trace in traces:
+            self.add_trace(trace)
+        return self
+
+    def add_records(self, records):
+        """
+        Counts the status codes of SpanRecord's, each for the service that recorded it.
+
+        :param records: An iterable of SpanRecord's, e.g. from graphy.utils.json.iter_span_records.
+        :return: The StatusCodeAggregator.
+        """
+        for record in records:
+            if record.status_code >= 10 and record.service_name:
+                self.__add(self.__row(record.service_name), status_class(record.status_code))
+        return self
+
+    def merge(self, other):
+        """
+        Merges the counts of another StatusCodeAggregator, e.g. of another shard or worker.
+
+        :param other: The other StatusCodeAggregator.
+        :return: The StatusCodeAggregator.
+        """
+        other.__flush()
+        for service_name in other.__service_rows:
+            self.__row(service_name)
+        self.__flush()
+        for service_name, other_row in other.__service_rows.items():
+            self.__counts[self.__service_rows[service_name]] += other.__counts[other_row]
+        return self
+
+    def __service_counts(self, service_name: str = None) -> np.ndarray:
+        self.__flush()
+        if service_name is None:
+            return self.__counts.sum(axis=0)
+        row = self.__service_rows.get(service_name)
+        return self.__counts[row] if row is not None else np.zeros(STATUS_CLASSES, dtype=np.int64)
+
+    def counts(self, service_name: str = None) -> dict:
+        """
+        Gets the status code counts of a service.
+
+        :param service_name: The service name, all services added up by default.
+        :return: A dictionary with the count of each status class with spans, e.g. {'2XX': 10, '4XX': 2}.
+        """
+        service_counts = self.__service_counts(service_name)
+        return {'{}XX'.format(code_class): int(service_counts[code_class]) for code_class in
+                np.flatnonzero(service_counts).tolist()}
+
+    def percentages(self, service_name: str = None) -> dict:
+        """
+        Gets the share of each status class of a service, as my_dict.calc_percentage of its counts.
+
+        :param service_name: The service name, all services added up by default.
+        :return: A dictionary with the share of each status class with spans, from 0 to 1.
+        """
+        service_counts = self.__service_counts(service_name)
+        total = int(service_counts.sum())
+        return {'{}XX'.format(code_class): int(service_counts[code_class]) / total for code_class in
+                np.flatnonzero(service_counts).tolist()}
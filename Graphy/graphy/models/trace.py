@@ -1,79 +1,52 @@
 """
     Author: André Bento
-    Date last modified: 08-04-2019
+    Date last modified: 18-10-2026
 """
-from graphy.models import span as my_span
+import numpy as np
+
+from graphy.models.latency_sketch import LatencySketch
+from graphy.models.status_codes import StatusCodeAggregator
 from graphy.models.span_tree import SpanTree
+from graphy.models.trace_analysis import TraceAnalysis
+from graphy.utils import config
 from graphy.utils import logger as my_logger
 
 logger = my_logger.setup_logging(__name__)
 
+graphy_config = config.get('GRAPHY')
+
+# The response time of each trace is kept, besides the response time sketch, up to this many traces.
+response_times_limit = graphy_config.get('RESPONSE_TIMES_LIMIT', 10000)
+
+
+# Lower edges of the coverability buckets; below 1% is '<1%' and the last bucket ends at 100% inclusive.
+COVERABILITY_EDGES = np.array([1.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0, 90.0])
+COVERABILITY_LABELS = ['<1%', '1-10%', '11-20%', '21-30%', '31-40%', '41-50%', '51-60%', '61-70%', '71-80%',
+                       '81-90%', '91-100%', 'error']
+COVERABILITY_ERROR = len(COVERABILITY_LABELS) - 1
+
+
+def coverability_buckets(percentages: np.ndarray) -> np.ndarray:
+    """
+    Gets the coverability bucket of each percentage.
+
+    :param percentages: An array of trace coverability percentages.
+    :return: An array with the index in COVERABILITY_LABELS of each percentage.
+    """
+    percentages = np.asarray(percentages, dtype=np.float64)
+    buckets = np.digitize(percentages, COVERABILITY_EDGES)
+    # Negative, above 100% and NaN percentages are errors.
+    buckets[~((percentages >= 0) & (percentages <= 100))] = COVERABILITY_ERROR
+    return buckets
+
 
 class TraceMetricsData(object):
-    def __init__(self):
-        self.__coverability_count = {
-            '<1%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            '1-10%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            '11-20%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            '21-30%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            '31-40%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            '41-50%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            '51-60%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            '61-70%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            '71-80%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            '81-90%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            '91-100%': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            },
-            'error': {
-                'value': 0,
-                'trace_ids': set(),
-                'span_ids': set()
-            }
-        }
+    def __init__(self, response_times_limit: int = response_times_limit):
+        self.__coverability_count = {label: {'value': 0, 'trace_ids': set(), 'span_ids': set()}
+                                     for label in COVERABILITY_LABELS}
         self.__response_times = {}
+        self.__response_times_limit = response_times_limit
+        self.__response_time_sketch = LatencySketch()
         self.__structural_issues = {
             "count": 0,
             "issue_list": list()
@@ -85,58 +58,70 @@ class TraceMetricsData(object):
 
     @property
     def response_times(self) -> dict:
+        """ The response time of each trace, None when there are more than response_times_limit traces. """
         return self.__response_times
 
+    @property
+    def response_time_sketch(self) -> LatencySketch:
+        return self.__response_time_sketch
+
     @property
     def response_time_avg(self) -> float:
-        if not self.__response_times:
-            return -1
-        return sum(self.__response_times.values()) / len(self.__response_times)
+        return self.__response_time_sketch.avg
+
+    @property
+    def response_time_quantiles(self) -> dict:
+        """ The p50, p90, p99 and p999 response times, empty if there are no traces. """
+        return self.__response_time_sketch.quantiles()
 
     def update_coverability(self, trace_times: dict) -> None:
         """
         Counts the trace coverability for each trace.
 
         :param trace_times: A dictionary with the trace coverability data.
-        :return: A dictionary with the interval trace coverability counting.
         """
+        trace_ids = np.array(list(trace_times.keys()), dtype=object)
+        buckets = coverability_buckets([trace_time.get('%') for trace_time in trace_times.values()])
+        span_ids = np.array([span_id for trace_time in trace_times.values() for span_id in trace_time['span_ids']],
+                            dtype=object)
+        span_buckets = np.repeat(buckets, [len(trace_time['span_ids']) for trace_time in trace_times.values()])
 
-        # TODO: Improve method [If else].
-        for key in trace_times.keys():
-            percentage = trace_times[key].get('%')
-            span_ids = trace_times[key]['span_ids']
-            if percentage < 1.0:
-                trace_coverability_item = self.__coverability_count['<1%']
-            elif 1.0 <= percentage < 10.0:
-                trace_coverability_item = self.__coverability_count['1-10%']
-            elif 11.0 <= percentage < 20.0:
-                trace_coverability_item = self.__coverability_count['11-20%']
-            elif 21.0 <= percentage < 30.0:
-                trace_coverability_item = self.__coverability_count['21-30%']
-            elif 31.0 <= percentage < 40.0:
-                trace_coverability_item = self.__coverability_count['31-40%']
-            elif 41.0 <= percentage < 50.0:
-                trace_coverability_item = self.__coverability_count['41-50%']
-            elif 51.0 <= percentage < 60.0:
-                trace_coverability_item = self.__coverability_count['51-60%']
-            elif 61.0 <= percentage < 70.0:
-                trace_coverability_item = self.__coverability_count['61-70%']
-            elif 71.0 <= percentage < 80.0:
-                trace_coverability_item = self.__coverability_count['71-80%']
-            elif 81.0 <= percentage < 90.0:
-                trace_coverability_item = self.__coverability_count['81-90%']
-            elif 91.0 <= percentage < 100.0:
-                trace_coverability_item = self.__coverability_count['91-100%']
-            else:
-                trace_coverability_item = self.__coverability_count['error']
-
-            if trace_coverability_item:
-                trace_coverability_item['value'] += 1
-                trace_coverability_item['trace_ids'].add(key)
-                trace_coverability_item['span_ids'].update(span_ids)
+        self.update_coverability_buckets(buckets, trace_ids, span_buckets, span_ids)
+
+    def update_coverability_buckets(self, buckets: np.ndarray, trace_ids: np.ndarray, span_buckets: np.ndarray,
+                                    span_ids: np.ndarray) -> None:
+        """
+        Counts the trace coverability of many traces at once.
+
+        :param buckets: The coverability bucket of each trace, from coverability_buckets.
+        :param trace_ids: The trace id of each trace.
+        :param span_buckets: The coverability bucket of the trace of each span.
+        :param span_ids: The span id of each span.
+        """
+        counts = np.bincount(buckets, minlength=len(COVERABILITY_LABELS))
+        for bucket, label in enumerate(COVERABILITY_LABELS):
+            if not counts[bucket]:
+                continue
+            trace_coverability_item = self.__coverability_count[label]
+            trace_coverability_item['value'] += int(counts[bucket])
+            trace_coverability_item['trace_ids'].update(trace_ids[buckets == bucket].tolist())
+            trace_coverability_item['span_ids'].update(span_ids[span_buckets == bucket].tolist())
 
     def update_response_time(self, trace_id: str, response_time: float) -> None:
-        self.__response_times[trace_id] = response_time
+        self.update_response_times([trace_id], [response_time])
+
+    def update_response_times(self, trace_ids: list, response_times: list) -> None:
+        """
+        Adds the response times of traces to the response time sketch.
+
+        :param trace_ids: The trace id of each trace.
+        :param response_times: The response time of each trace.
+        """
+        self.__response_time_sketch.add_values(response_times)
+        if self.__response_times is not None:
+            self.__response_times.update(zip(trace_ids, response_times))
+            if len(self.__response_times) > self.__response_times_limit:
+                self.__response_times = None
 
     def update_structural_issues(self, issue: Exception):
         self.__structural_issues["count"] += 1
@@ -150,74 +135,7 @@ def get_status_codes(trace_list):
     :param trace_list: The trace list in Zipkin format.
     :return: A dictionary containing the grouped status codes counting.
     """
-
-    status_codes_dict = dict()
-    for trace in trace_list:
-        for span in trace:
-            status_code = my_span.get_status_code(span)
-            if status_code and len(status_code) > 1:
-                status_code_group = status_code[0]
-                status_code = status_code_group + 'XX'
-                if status_code in status_codes_dict:
-                    status_codes_dict[status_code] += 1
-                else:
-                    status_codes_dict[status_code] = 1
-    return status_codes_dict
-
-
-def __calculate_trace_metrics_data(trace_metrics_data: TraceMetricsData, span_tree_obj: SpanTree) -> None:
-    """
-    Calculates the trace metrics data for a certain SpanTree.
-
-    :param trace_metrics_data: A TraceMetricsData object.
-    :param span_tree_obj: A SpanTree object.
-    """
-    trace_id = span_tree_obj.trace_id
-    span_tree = span_tree_obj.span_tree
-
-    response_times = list()
-
-    trace_times = dict()
-    trace_times[trace_id] = {
-        't_parent': 0,
-        't_child': 0,
-        '%': -1.0,
-        'span_ids': set()
-    }
-
-    parent_node = span_tree.get_node(span_tree.root)  # TODO: Change to accept multiple levels.
-
-    try:
-        parent_duration = max(parent_node.data.get_durations())
-        trace_times[trace_id]['t_parent'] = parent_duration
-    except Exception as ex:
-        logger.error('{}: {}'.format(type(ex), ex))
-        return
-
-    for child in span_tree.children(span_tree.root):  # TODO: Change to accept multiple levels.
-        child_span_data: my_span.Span = child.data
-
-        span_id = child_span_data.id
-        trace_times[trace_id]['span_ids'].add(span_id)
-
-        duration = max(child_span_data.get_durations())
-        trace_times[trace_id]['t_child'] += duration
-
-        response_times.append(duration)
-
-    t_child = trace_times[trace_id]['t_child']
-    t_parent = trace_times[trace_id]['t_parent']
-    try:
-        t_percentage = (t_child / t_parent) * 100  # microseconds to milliseconds
-        if t_percentage < 0 or t_percentage > 100:
-            raise Exception('trace time percentage error; t_percentage={}'.format(t_percentage))
-        trace_times[trace_id]['%'] = t_percentage
-    except Exception as ex:
-        logger.error('{}: {}'.format(type(ex), ex))
-        trace_times[trace_id]['%'] = -1
-
-    trace_metrics_data.update_coverability(trace_times)
-    trace_metrics_data.update_response_time(trace_id, float(sum(response_times)) / max(len(response_times), 1))
+    return StatusCodeAggregator().add_spans(span for trace in trace_list for span in trace).counts()
 
 
 def generate_span_trees(traces: list) -> list:
@@ -237,16 +155,44 @@ def generate_span_trees(traces: list) -> list:
     return span_trees
 
 
-def extract_metrics(span_trees) -> TraceMetricsData:
+def extract_metrics(span_trees, trace_analysis: TraceAnalysis = None) -> TraceMetricsData:
     """
     Extracts all metrics needed from a list of SpanTree's.
+    The coverability of a trace takes every level of its span tree into account, see TraceAnalysis.trace_coverage.
 
     :param span_trees: The list of SpanTree's.
+    :param trace_analysis: The TraceAnalysis of the span trees, calculated if not given.
     :return: The TraceMetricsData object.
     """
     trace_metrics_data = TraceMetricsData()
 
-    for span_tree_obj in span_trees:
-        __calculate_trace_metrics_data(trace_metrics_data, span_tree_obj)
+    if trace_analysis is None:
+        trace_analysis = TraceAnalysis.from_span_trees(span_trees)
+    columns = trace_analysis.columns
+    trace_ids = np.array(columns.trace_ids, dtype=object)
+    has_root = columns.has_root
+
+    for trace_id in trace_ids[~has_root]:
+        logger.error('trace {} has no root span'.format(trace_id))
+
+    percentages = trace_analysis.trace_coverage()
+    percentage_errors = has_root & ~((percentages >= 0) & (percentages <= 100))
+    if percentage_errors.any():
+        logger.error('trace time percentage error in {} traces'.format(np.count_nonzero(percentage_errors)))
+    percentages[percentage_errors] = -1
+
+    buckets = coverability_buckets(percentages[has_root])
+    span_buckets = np.full(columns.trace_count, COVERABILITY_ERROR)
+    span_buckets[has_root] = buckets
+    children = columns.parent_index >= 0
+    trace_metrics_data.update_coverability_buckets(buckets, trace_ids[has_root],
+                                                   span_buckets[columns.trace_codes[children]],
+                                                   columns.span_ids[children])
+
+    # The response time of a trace is the average duration of the calls made by its root span.
+    root_children = columns.depths == 1
+    response_times = (columns.per_trace_sum(columns.durations, root_children) /
+                      np.maximum(columns.per_trace_count(root_children), 1))
+    trace_metrics_data.update_response_times(trace_ids[has_root].tolist(), response_times[has_root].tolist())
 
     return trace_metrics_data
@@ -0,0 +1,147 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import numpy as np
+
+from graphy.models.span_columns import SpanColumns
+
+
+class TraceAnalysis(object):
+    """
+    TraceAnalysis calculates the timing of every span of a collection of SpanTree's, at every level of the trees.
+
+    For each span:
+    * child_time - the sum of the durations of its children;
+    * self_time - the part of its duration not spent in its children;
+    * child_coverage - the percentage of its duration covered by its children;
+    * critical_child - the child that ends last, the one that delays the span the most;
+    * critical_time - the part of its duration on the critical path of the trace, 0 if it is not on the path.
+
+    Every column is calculated for all the spans at once, in time linear in the number of spans.
+    """
+
+    def __init__(self, columns: SpanColumns):
+        """
+        Initiate a new TraceAnalysis.
+
+        :param columns: The SpanColumns of the traces.
+        """
+        self.columns = columns
+
+        durations = columns.durations.astype(np.float64)
+        parent_index = columns.parent_index
+        children = np.flatnonzero(parent_index >= 0)
+
+        self.child_counts = np.bincount(parent_index[children], minlength=len(columns))
+        self.child_time = np.bincount(parent_index[children], weights=durations[children], minlength=len(columns))
+        self.self_time = np.maximum(durations - self.child_time, 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.child_coverage = np.where(durations > 0, self.child_time / durations * 100, np.nan)
+
+        self.critical_child = self.__latest_children(children)
+        self.on_critical_path = self.__critical_path()
+
+        critical_child_durations = np.where(self.critical_child >= 0, durations[self.critical_child], 0)
+        self.critical_time = np.where(self.on_critical_path,
+                                      np.maximum(durations - critical_child_durations, 0), 0)
+
+    @classmethod
+    def from_span_trees(cls, span_trees: list):
+        """
+        Analyses a list of SpanTree's.
+
+        :param span_trees: The list of SpanTree's.
+        :return: The TraceAnalysis.
+        """
+        return cls(SpanColumns.from_span_trees(span_trees))
+
+    def __latest_children(self, children: np.ndarray) -> np.ndarray:
+        """
+        Finds the child of each span that ends last.
+
+        :param children: The rows of the spans with a parent.
+        :return: An array with the row of the latest child of each span, -1 for leaves.
+        """
+        columns = self.columns
+        ends = columns.timestamps[children] + columns.durations[children]
+
+        # Sort the children by parent and end, the last child of each parent is the latest one.
+        children = children[np.lexsort((ends, columns.parent_index[children]))]
+        parents = columns.parent_index[children]
+        last = np.ones(len(children), dtype=bool)
+        last[:-1] = parents[1:] != parents[:-1]
+
+        latest_children = np.full(len(columns), -1, dtype=np.int64)
+        latest_children[parents[last]] = children[last]
+        return latest_children
+
+    def __critical_path(self) -> np.ndarray:
+        """
+        Follows the latest children from the roots, one tree level at a time.
+
+        :return: A mask of the spans on the critical path of their trace.
+        """
+        on_critical_path = np.zeros(len(self.columns), dtype=bool)
+
+        rows = self.columns.roots[self.columns.has_root]
+        while rows.size:
+            on_critical_path[rows] = True
+            rows = self.critical_child[rows]
+            rows = rows[rows >= 0]
+
+        return on_critical_path
+
+    def trace_coverage(self) -> np.ndarray:
+        """
+        Calculates the coverage of each trace over all its levels: the time covered by children over the duration of
+        every span with children, or of the root if it has none.
+
+        :return: An array with the coverage percentage of each trace, NaN if the trace has no root or no duration.
+        """
+        columns = self.columns
+        parents = (self.child_counts > 0) | (columns.parent_index < 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (columns.per_trace_sum(self.child_time, parents) /
+                    columns.per_trace_sum(columns.durations.astype(np.float64), parents) * 100)
+
+    def service_aggregates(self) -> dict:
+        """
+        Aggregates the timing of the spans by service. Spans without a service name are left out.
+
+        :return: A dictionary with, for each service, the number of spans, the total duration, self time and critical
+        time and the average child coverage of its spans with children.
+        """
+        service_names = self.columns.service_names
+        known = np.flatnonzero(service_names != None)  # noqa: E711
+        if not known.size:
+            return dict()
+
+        names, codes = np.unique(service_names[known].astype(str), return_inverse=True)
+
+        def per_service(values, mask=None):
+            service_codes = codes if mask is None else codes[mask]
+            values = values[known] if mask is None else values[known][mask]
+            return np.bincount(service_codes, weights=values, minlength=len(names))
+
+        span_counts = np.bincount(codes, minlength=len(names))
+        durations = per_service(self.columns.durations.astype(np.float64))
+        self_time = per_service(self.self_time)
+        critical_time = per_service(self.critical_time)
+
+        with_children = (self.child_counts[known] > 0) & ~np.isnan(self.child_coverage[known])
+        coverage_counts = np.bincount(codes[with_children], minlength=len(names))
+        coverage_sums = per_service(self.child_coverage, with_children)
+
+        aggregates = dict()
+        for code, service_name in enumerate(names.tolist()):
+            aggregates[service_name] = {
+                'spans': int(span_counts[code]),
+                'duration': float(durations[code]),
+                'self_time': float(self_time[code]),
+                'critical_time': float(critical_time[code]),
+                'child_coverage_avg': float(coverage_sums[code] / coverage_counts[code]) if coverage_counts[code]
+                else -1
+            }
+        return aggregates
@@ -0,0 +1,85 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from collections import defaultdict
+
+from graphy.models import span as my_span
+
+
+class TraceIndex(object):
+    """ TraceIndex keeps each trace of a window once, indexed by trace id and by the services it touches. """
+
+    def __init__(self, traces: list = None):
+        """
+        Initiate a new TraceIndex.
+
+        :param traces: The list of traces in Zipkin format.
+        """
+        self.__traces = dict()
+        self.__service_trace_ids = defaultdict(list)
+
+        if traces:
+            self.add_traces(traces)
+
+    def __len__(self):
+        return len(self.__traces)
+
+    def __contains__(self, trace_id):
+        return trace_id in self.__traces
+
+    @property
+    def service_names(self) -> list:
+        return sorted(self.__service_trace_ids.keys())
+
+    def add_traces(self, traces: list) -> int:
+        """
+        Adds traces to the index, ignoring the ones already in it.
+
+        :param traces: The list of traces in Zipkin format.
+        :return: The number of added traces.
+        """
+        added = 0
+        for trace in traces:
+            if not trace:
+                continue
+
+            trace_id = trace[0].get('traceId')
+            if trace_id in self.__traces:
+                continue
+
+            self.__traces[trace_id] = trace
+            for service_name in {my_span.get_service_name(span) for span in trace}:
+                if service_name:
+                    self.__service_trace_ids[service_name].append(trace_id)
+            added += 1
+        return added
+
+    def trace_ids(self, service_name: str = None) -> list:
+        """
+        Gets the ids of the traces of a service.
+
+        :param service_name: The service name, all traces by default.
+        :return: The list of trace ids.
+        """
+        if service_name is None:
+            return list(self.__traces.keys())
+        return self.__service_trace_ids.get(service_name, list())
+
+    def trace(self, trace_id: str) -> list:
+        """
+        Gets a trace by id.
+
+        :param trace_id: The trace id.
+        :return: The trace in Zipkin format, or None if it is not in the index.
+        """
+        return self.__traces.get(trace_id)
+
+    def traces(self, service_name: str = None) -> list:
+        """
+        Gets the traces of a service.
+
+        :param service_name: The service name, all traces by default.
+        :return: The list of traces in Zipkin format.
+        """
+        return [self.__traces[trace_id] for trace_id in self.trace_ids(service_name)]
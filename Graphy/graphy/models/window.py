@@ -0,0 +1,163 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from graphy.graph.graph_processor import GraphProcessor
+from graphy.models import trace as my_trace
+from graphy.models.dependency_linker import DependencyLinker
+from graphy.models.latency_sketch import LatencySketches
+from graphy.models.status_codes import StatusCodeAggregator
+from graphy.models.trace_analysis import TraceAnalysis
+from graphy.models.trace_index import TraceIndex
+from graphy.utils import config
+from graphy.utils import zipkin
+
+graphy_config = config.get('GRAPHY')
+
+
+class WindowSnapshot(object):
+    """
+    WindowSnapshot holds the data of a time window: the dependencies, the graph and the traces of each service.
+    Everything is fetched and built once and then shared by every metric calculated for the window.
+    """
+
+    def __init__(self, start_timestamp: int, end_timestamp: int, dependencies: list = None,
+                 trace_index: TraceIndex = None, service_names: list = None, graph_processor: GraphProcessor = None):
+        """
+        Initiate a new WindowSnapshot.
+
+        :param start_timestamp: Start unix timestamp of the window, in milliseconds.
+        :param end_timestamp: End unix timestamp of the window, in milliseconds.
+        :param dependencies: Graph dependencies data in Zipkin format.
+        :param trace_index: The TraceIndex with the traces of the window.
+        :param service_names: The services to analyse, the services found in the traces by default.
+        :param graph_processor: The GraphProcessor used to build the graph, a new one by default. An incremental
+        GraphProcessor shared by consecutive windows only applies the edges that changed since the previous window.
+        """
+        self.start_timestamp = start_timestamp
+        self.end_timestamp = end_timestamp
+        self.dependencies = dependencies if dependencies else list()
+        self.trace_index = trace_index if trace_index is not None else TraceIndex()
+        self.__service_names = service_names
+
+        self.graph_processor = GraphProcessor() if graph_processor is None else graph_processor
+        self.graph_processor.generate_graph_from_zipkin(self.dependencies, start_timestamp, end_timestamp)
+
+        self.__span_trees = dict()
+        self.__trace_analysis = dict()
+        self.__trace_metrics_data = dict()
+        self.__status_codes = None
+        self.__latency_sketches = None
+
+    @classmethod
+    def fetch(cls, start_timestamp: int, end_timestamp: int, service_names: list = None, source=zipkin,
+              local_dependencies: bool = graphy_config.get('LOCAL_DEPENDENCIES', False),
+              graph_processor: GraphProcessor = None):
+        """
+        Fetches the dependencies and the traces of a time window.
+        The traces of all services are fetched in a single query, so a trace is only downloaded once.
+
+        :param start_timestamp: Start unix timestamp of the window, in milliseconds.
+        :param end_timestamp: End unix timestamp of the window, in milliseconds.
+        :param service_names: The services to analyse, the services found in the traces by default.
+        :param source: The data source, with the graphy.utils.zipkin interface.
+        :param local_dependencies: True to compute the dependencies from the fetched traces with a DependencyLinker,
+        False to query them from the data source.
+        :param graph_processor: The GraphProcessor used to build the graph, a new one by default.
+        :return: The WindowSnapshot.
+        """
+        lookback = end_timestamp - start_timestamp
+
+        traces = source.get_traces(end_ts=end_timestamp, lookback=lookback)
+        if local_dependencies:
+            dependencies = DependencyLinker().add_traces(traces).link()
+        else:
+            dependencies = source.get_dependencies(end_ts=end_timestamp, lookback=lookback)
+        trace_index = TraceIndex(traces)
+
+        return cls(start_timestamp, end_timestamp, dependencies, trace_index, service_names, graph_processor)
+
+    @property
+    def graph(self):
+        return self.graph_processor.graph
+
+    @property
+    def service_names(self) -> list:
+        if self.__service_names is None:
+            return self.trace_index.service_names
+        return self.__service_names
+
+    @property
+    def metric_timestamp(self) -> int:
+        """ The timestamp used to store the window metrics, the middle of the window. """
+        return int((self.start_timestamp + self.end_timestamp) / 2)
+
+    def traces(self, service_name: str) -> list:
+        """
+        Gets the traces of a service.
+
+        :param service_name: The service name.
+        :return: The list of traces in Zipkin format.
+        """
+        return self.trace_index.traces(service_name)
+
+    def span_trees(self, service_name: str = None) -> list:
+        """
+        Gets the SpanTree's of the traces of a service.
+        Each SpanTree is generated once per trace, even if the trace is shared by many services.
+
+        :param service_name: The service name, None for all the traces of the window.
+        :return: The list of SpanTree's.
+        """
+        trace_ids = self.trace_index.trace_ids(service_name)
+        missing_trace_ids = [trace_id for trace_id in trace_ids if trace_id not in self.__span_trees]
+        if missing_trace_ids:
+            traces = [self.trace_index.trace(trace_id) for trace_id in missing_trace_ids]
+            self.__span_trees.update(zip(missing_trace_ids, my_trace.generate_span_trees(traces)))
+        return [self.__span_trees[trace_id] for trace_id in trace_ids]
+
+    def trace_analysis(self, service_name: str = None) -> TraceAnalysis:
+        """
+        Gets the timing analysis of the span trees of a service, calculated on the first call.
+
+        :param service_name: The service name, None for all the traces of the window.
+        :return: The TraceAnalysis object.
+        """
+        if service_name not in self.__trace_analysis:
+            self.__trace_analysis[service_name] = TraceAnalysis.from_span_trees(self.span_trees(service_name))
+        return self.__trace_analysis[service_name]
+
+    def trace_metrics_data(self, service_name: str) -> my_trace.TraceMetricsData:
+        """
+        Gets the metrics of the traces of a service, extracted on the first call.
+
+        :param service_name: The service name.
+        :return: The TraceMetricsData object.
+        """
+        if service_name not in self.__trace_metrics_data:
+            self.__trace_metrics_data[service_name] = my_trace.extract_metrics(
+                self.span_trees(service_name), self.trace_analysis(service_name))
+        return self.__trace_metrics_data[service_name]
+
+    def status_codes(self) -> StatusCodeAggregator:
+        """
+        Gets the status code counts of every service, counted in a single pass over the traces on the first call.
+
+        :return: The StatusCodeAggregator.
+        """
+        if self.__status_codes is None:
+            self.__status_codes = StatusCodeAggregator().add_traces(
+                self.trace_index.trace(trace_id) for trace_id in self.trace_index.trace_ids())
+        return self.__status_codes
+
+    def latency_sketches(self) -> LatencySketches:
+        """
+        Gets the span duration sketches of every endpoint of every service, built in a single pass over the traces on
+        the first call.
+
+        :return: The LatencySketches.
+        """
+        if self.__latency_sketches is None:
+            self.__latency_sketches = LatencySketches().add_traces(
+                self.trace_index.trace(trace_id) for trace_id in self.trace_index.trace_ids())
+        return self.__latency_sketches
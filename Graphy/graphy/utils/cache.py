@@ -0,0 +1,176 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+
+from graphy.utils import logger as my_logger
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+logger = my_logger.setup_logging(__name__)
+
+CACHE_FILE_EXTENSION = '.json.gz'
+
+
+class ResponseCache(object):
+    """
+    ResponseCache keeps API responses on disk, gzip compressed, one file per request.
+
+    Files are named after a hash of the namespace, the url and the query parameters, so changing the namespace, e.g.
+    when the data behind the API changes, leaves the previous responses unused. When the cache grows over max_size
+    bytes, the least recently used files are deleted until it is back under 90% of it.
+    """
+
+    def __init__(self, directory: str, max_size: int, compress_level: int = 6, namespace: str = ''):
+        """
+        Initiate a new ResponseCache.
+
+        :param directory: The cache directory, created if it does not exist.
+        :param max_size: The maximum size of the cache, in bytes.
+        :param compress_level: The gzip compression level, from 1 (fastest) to 9 (smallest).
+        :param namespace: The namespace of the responses, part of every key.
+        """
+        self.__directory = directory
+        self.__max_size = max_size
+        self.__compress_level = compress_level
+        self.__namespace = namespace
+
+        self.__lock = threading.Lock()
+        self.__size = None
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    @property
+    def size(self) -> int:
+        """ The size of the cache files, in bytes. """
+        with self.__lock:
+            return self.__current_size()
+
+    @property
+    def namespace(self) -> str:
+        return self.__namespace
+
+    @staticmethod
+    def key(url: str, params: dict = None, namespace: str = '') -> str:
+        """
+        Gets the key of a request. Parameters without a value are ignored, as they are not sent.
+
+        :param url: The request url.
+        :param params: The query parameters.
+        :param namespace: The namespace of the response.
+        :return: The key.
+        """
+        params = {name: value for name, value in (params or dict()).items() if value is not None}
+        request = json.dumps([url, params] + ([namespace] if namespace else []), sort_keys=True)
+        return hashlib.sha1(request.encode('utf-8')).hexdigest()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.__directory, key[:2], key + CACHE_FILE_EXTENSION)
+
+    def get(self, url: str, params: dict = None):
+        """
+        Gets a cached response.
+
+        :param url: The request url.
+        :param params: The query parameters.
+        :return: The response body in bytes, or None if it is not cached.
+        """
+        path = self.__path(self.key(url, params, self.__namespace))
+        try:
+            with open(path, 'rb') as cache_file:
+                content = gzip.decompress(cache_file.read())
+            os.utime(path)  # Mark as recently used.
+        except (OSError, ValueError, EOFError) as ex:
+            if not isinstance(ex, FileNotFoundError):
+                logger.warning('invalid cache file {}: {}'.format(path, ex))
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return content
+
+    def put(self, url: str, params: dict, content: bytes) -> None:
+        """
+        Caches a response.
+
+        :param url: The request url.
+        :param params: The query parameters.
+        :param content: The response body in bytes.
+        """
+        path = self.__path(self.key(url, params, self.__namespace))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        data = gzip.compress(content, compresslevel=self.__compress_level)
+        # Written to a temporary file and renamed, so readers never see a partial file.
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wb') as cache_file:
+            cache_file.write(data)
+        os.replace(temporary_path, path)
+
+        with self.__lock:
+            self.__size = self.__current_size() + len(data)
+            if self.__size > self.__max_size:
+                self.__evict()
+
+    def clear(self) -> None:
+        """ Deletes every cached response. """
+        with self.__lock:
+            for path, _, _ in self.__files():
+                os.remove(path)
+            self.__size = 0
+
+    def __files(self) -> list:
+        """
+        Lists the cache files.
+
+        :return: A list of (path, size, last use time) tuples.
+        """
+        files = list()
+        if not os.path.isdir(self.__directory):
+            return files
+        for sub_directory in os.scandir(self.__directory):
+            if not sub_directory.is_dir():
+                continue
+            for entry in os.scandir(sub_directory.path):
+                if entry.name.endswith(CACHE_FILE_EXTENSION):
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def __current_size(self) -> int:
+        if self.__size is None:
+            self.__size = sum(size for _, size, _ in self.__files())
+        return self.__size
+
+    def __evict(self) -> None:
+        """ Deletes the least recently used files until the cache is under 90% of its maximum size. """
+        files = sorted(self.__files(), key=lambda cache_file: cache_file[2])
+        size = sum(size for _, size, _ in files)
+        target_size = self.__max_size * 0.9
+
+        evicted = 0
+        for path, file_size, _ in files:
+            if size <= target_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+            evicted += 1
+
+        self.__size = size
+        logger.debug('evicted {} cached responses, {} bytes left'.format(evicted, size))
@@ -1,17 +1,40 @@
 """
     Author: André Bento
-    Date last modified: 26-02-2019
+    Date last modified: 18-10-2026
 """
+import itertools
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from os.path import join
 
 from graphy.models import span
+from graphy.utils import config
+from graphy.utils import list as my_list
+from graphy.utils import logger as my_logger
 
 try:
     import simplejson as json
 except ImportError:
     import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = my_logger.setup_logging(__name__)
+
+graphy_config = config.get('GRAPHY')
+
+READ_CHUNK_SIZE = 1024 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
+FIX_BATCH_SIZE = 1000  # spans whose timestamps are fixed at once.
+
+parse_workers = graphy_config.get('PARSE_WORKERS', os.cpu_count() or 1)
+parse_shard_size = graphy_config.get('PARSE_SHARD_SIZE_MB', 16) * 1024 * 1024
+
 
 def is_json(file_path):
     """
@@ -23,39 +46,287 @@ def is_json(file_path):
     return file_path.endswith('.json')
 
 
-def to_json(file_path, limit=None):
+def iter_jsonl(file_path, limit=None):
     """
-    Converts a file to JSON.
+    Lazily reads the entries of a JSONL file, one line at a time.
 
-    :param file_path: The file path.
-    :param limit: Limit the number of entries to convert to the new file.
-    :return: The file path of the created file.
+    :param file_path: The JSONL file path.
+    :param limit: Stop after this number of entries.
+    :return: A generator of the decoded entries.
     """
-    if is_json(file_path):
-        return file_path
+    with open(file_path) as fp:
+        entries = (json.loads(line) for line in fp if line.strip())
+        yield from itertools.islice(entries, limit)
+
+
+def iter_json_array(file_path, limit=None, chunk_size=READ_CHUNK_SIZE):
+    """
+    Lazily reads the entries of a JSON array file, decoding one entry at a time from fixed size chunks.
+
+    :param file_path: The JSON file path.
+    :param limit: Stop after this number of entries.
+    :param chunk_size: The number of characters read from the file at a time.
+    :return: A generator of the decoded entries.
+    """
+    decoder = json.JSONDecoder()
+    count = 0
 
     with open(file_path) as fp:
-        lines = fp.readlines()
+        buffer = fp.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError('{} is not a JSON array'.format(file_path))
+        position = 1
+
+        while limit is None or count < limit:
+            while position < len(buffer) and buffer[position] in ', \t\r\n':
+                position += 1
+
+            if position < len(buffer) and buffer[position] == ']':
+                return
 
-    lines = list(
-        map(
-            lambda x: json.loads(x.strip()),
-            lines
-        )
-    )
+            try:
+                entry, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                chunk = fp.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
 
-    if limit:
-        lines = lines[:limit]
+            count += 1
+            yield entry
 
-    span.fix_timestamps(lines)
 
-    json_array = json.dumps(lines)
+def iter_spans(file_path, limit=None):
+    """
+    Lazily reads the spans of a JSON or JSONL trace file.
+
+    :param file_path: The trace file path.
+    :param limit: Stop after this number of spans.
+    :return: A generator of the spans.
+    """
+    if is_json(file_path):
+        return iter_json_array(file_path, limit)
+    return iter_jsonl(file_path, limit)
+
+
+def iter_span_offsets(file_path, chunk_size=READ_CHUNK_SIZE):
+    """
+    Lazily reads the spans of a JSON or JSONL trace file with their position in it.
+    JSON arrays are decoded as latin-1, one character per byte, so the positions are byte offsets; the text values of
+    the spans with other characters are not decoded as UTF-8, the numeric values are.
+
+    :param file_path: The trace file path.
+    :param chunk_size: The number of bytes read from a JSON file at a time.
+    :return: A generator of (byte offset, byte length, span) tuples.
+    """
+    if not is_json(file_path):
+        offset = 0
+        with open(file_path, 'rb') as fp:
+            for line in fp:
+                if line.strip():
+                    yield offset, len(line.rstrip(b'\r\n')), json.loads(line)
+                offset += len(line)
+        return
+
+    decoder = json.JSONDecoder()
+
+    with open(file_path, encoding='latin-1') as fp:
+        buffer = fp.read(chunk_size)
+        base = len(buffer) - len(buffer.lstrip())
+        buffer = buffer.lstrip()
+        if not buffer.startswith('['):
+            raise ValueError('{} is not a JSON array'.format(file_path))
+        position = 1
+
+        while True:
+            while position < len(buffer) and buffer[position] in ', \t\r\n':
+                position += 1
+
+            if position < len(buffer) and buffer[position] == ']':
+                return
+
+            try:
+                entry, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                chunk = fp.read(chunk_size)
+                if not chunk:
+                    raise
+                base += position
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+
+            yield base + position, end - position, entry
+            position = end
+
+
+def loads(data):
+    """
+    Decodes a JSON document with the fastest backend installed, orjson, simplejson or json.
+
+    :param data: The JSON document, in bytes or str.
+    :return: The decoded document.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def shard_ranges(file_path, shard_size=parse_shard_size):
+    """
+    Splits a JSONL file in byte ranges of about shard_size bytes, at line boundaries.
+
+    :param file_path: The JSONL file path.
+    :param shard_size: The approximate size of each shard, in bytes.
+    :return: A list of (start, end) byte offsets, end excluded.
+    """
+    file_size = os.path.getsize(file_path)
+    ranges = list()
+    start = 0
+    with open(file_path, 'rb') as fp:
+        while start < file_size:
+            fp.seek(min(start + max(shard_size, 1), file_size) - 1)
+            fp.readline()  # The shard ends after the line crossing its nominal end.
+            end = min(fp.tell(), file_size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_shard(file_path, start, end):
+    """
+    Lazily decodes the entries of a shard of a JSONL file.
+
+    :param file_path: The JSONL file path.
+    :param start: The first byte of the shard, at the start of a line.
+    :param end: The byte after the shard, at the start of a line or the end of the file.
+    :return: A generator of the decoded entries.
+    """
+    with open(file_path, 'rb') as fp:
+        fp.seek(start)
+        data = fp.read(end - start)
+    return (loads(line) for line in data.splitlines() if line.strip())
+
+
+def parse_span_records(file_path, start, end):
+    """
+    Parses the spans of a shard of a JSONL trace file into compact records.
+
+    :param file_path: The JSONL file path.
+    :param start: The first byte of the shard.
+    :param end: The byte after the shard.
+    :return: The list of SpanRecord's of the spans, converted to Zipkin v2 format.
+    """
+    return [span.to_record(v2_span) for span_data in read_shard(file_path, start, end)
+            for v2_span in span.to_v2(span_data)]
+
+
+def convert_shard(file_path, start, end):
+    """
+    Converts the spans of a shard of a JSONL trace file to the entries of a JSON array, see to_json.
+
+    :param file_path: The JSONL file path.
+    :param start: The first byte of the shard.
+    :param end: The byte after the shard.
+    :return: A tuple with the number of spans and their fixed JSON text, separated by commas.
+    """
+    spans_data = list(read_shard(file_path, start, end))
+    span.fix_timestamps(spans_data)
+    return len(spans_data), ', '.join(json.dumps(span_data) for span_data in spans_data)
+
+
+def map_shards(file_path, func, workers=parse_workers, shard_size=parse_shard_size):
+    """
+    Applies a function to the shards of a JSONL file, on a process pool.
+    Only 2 shards per worker are in flight, so memory usage does not grow with the file size.
+
+    :param file_path: The JSONL file path.
+    :param func: A picklable function taking the file path and the start and end bytes of a shard.
+    :param workers: The number of processes, 1 runs the shards sequentially.
+    :param shard_size: The approximate size of each shard, in bytes.
+    :return: A generator of the results, in the order of the shards.
+    """
+    ranges = shard_ranges(file_path, shard_size)
+    if workers <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield func(file_path, start, end)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for start, end in ranges:
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(func, file_path, start, end))
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_span_records(file_path, workers=parse_workers, shard_size=parse_shard_size):
+    """
+    Lazily reads the spans of a JSON or JSONL trace file as compact records, in file order.
+    JSONL files are parsed in parallel shards, JSON arrays sequentially.
+
+    :param file_path: The trace file path.
+    :param workers: The number of processes parsing JSONL shards.
+    :param shard_size: The approximate size of each shard, in bytes.
+    :return: A generator of the SpanRecord's of the spans, converted to Zipkin v2 format.
+    """
+    if is_json(file_path):
+        for span_data in iter_json_array(file_path):
+            yield from (span.to_record(v2_span) for v2_span in span.to_v2(span_data))
+        return
+
+    for records in map_shards(file_path, parse_span_records, workers, shard_size):
+        yield from records
+
+
+def to_json(file_path, limit=None, workers=parse_workers, shard_size=parse_shard_size):
+    """
+    Converts a JSONL file to JSON.
+    The spans are read, fixed and written in batches, so memory usage does not grow with the file size.
+    Without a limit the shards are converted in parallel, see map_shards.
+
+    :param file_path: The file path.
+    :param limit: Limit the number of entries to convert to the new file.
+    :param workers: The number of processes converting shards, 1 converts the spans sequentially.
+    :param shard_size: The approximate size of each shard, in bytes.
+    :return: The file path of the created file.
+    """
+    if is_json(file_path):
+        return file_path
 
     dir_path = os.path.dirname(os.path.realpath(file_path))
     file_name = os.path.splitext(file_path)[0]
     new_abs_file_path = join(dir_path, file_name + '.json')
 
-    with open(new_abs_file_path, 'w') as f:
-        f.write(json_array)
+    start_time = time.time()
+    count = 0
+
+    with open(new_abs_file_path, 'w', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write('[')
+        if limit is None and workers > 1:
+            for shard_count, shard_text in map_shards(file_path, convert_shard, workers, shard_size):
+                if not shard_count:
+                    continue
+                if count:
+                    f.write(', ')
+                f.write(shard_text)
+                count += shard_count
+        else:
+            for spans_data in my_list.chunks(iter_jsonl(file_path, limit), FIX_BATCH_SIZE):
+                span.fix_timestamps(spans_data)
+                for span_data in spans_data:
+                    if count:
+                        f.write(', ')
+                    f.write(json.dumps(span_data))
+                    count += 1
+        f.write(']')
+
+    elapsed_time = time.time() - start_time
+    logger.info('converted {} spans in {:.2f} seconds ({:.0f} spans/s)'.format(
+        count, elapsed_time, count / elapsed_time if elapsed_time else count))
 
     return new_abs_file_path
@@ -1,7 +1,8 @@
 """
     Author: André Bento
-    Date last modified: 1-04-2019
+    Date last modified: 18-10-2026
 """
+import itertools
 
 
 def diff(list_1, list_2):
@@ -29,3 +30,18 @@ def tuple_list(values: list):
         tuple_list_result.append((aux_value, value))
         aux_value = value
     return tuple_list_result
+
+
+def chunks(iterable, size: int):
+    """
+    Splits an iterable in lists of a fixed size, without materializing the iterable.
+
+    :param iterable: The iterable to split.
+    :param size: The size of each chunk, the last one may be smaller.
+    :return: A generator of lists.
+    """
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
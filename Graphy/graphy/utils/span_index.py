@@ -0,0 +1,240 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import mmap
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from graphy.models import span as my_span
+from graphy.utils import config
+from graphy.utils import json as my_json
+from graphy.utils import logger as my_logger
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+logger = my_logger.setup_logging(__name__)
+
+graphy_config = config.get('GRAPHY')
+
+INDEX_VERSION = 1
+
+# The spans of the trace file sorted by timestamp, in microseconds, and their byte range in it.
+SPAN_DTYPE = np.dtype([('timestamp', '<i8'), ('offset', '<i8'), ('length', '<i8')])
+
+
+def span_timestamp(span: dict) -> int:
+    """
+    Gets the timestamp of a span in v1 or v2 format, in microseconds.
+
+    :param span: The span.
+    :return: The timestamp, the earliest annotation timestamp if the span has none, or None. Both are fixed up with
+    my_span.fix_timestamp.
+    """
+    if span.get('timestamp'):
+        return my_span.fix_timestamp(span['timestamp'])
+    return min((my_span.fix_timestamp(annotation['timestamp']) for annotation in span.get('annotations', list())
+                if isinstance(annotation, dict) and annotation.get('timestamp')), default=None)
+
+
+class SpanFileIndex(object):
+    """
+    SpanFileIndex is an index of the spans of a JSON or JSONL trace file by time: the byte range of every span sorted by
+    timestamp, and the first span of every bucket of bucket_duration milliseconds.
+
+    It is saved next to the trace file, as <file>.index.npy, <file>.buckets.npy and <file>.index.json, and rebuilt when
+    the size or the modification time of the file change. A time window is found from its buckets and read straight
+    from the memory mapped trace file.
+    """
+
+    def __init__(self, file_path: str, bucket_duration: int = graphy_config.get('SPAN_INDEX_BUCKET_DURATION', 60000)):
+        """
+        Initiate a new SpanFileIndex, building it if it is missing or out of date.
+
+        :param file_path: The trace file path.
+        :param bucket_duration: The time length of each bucket, in milliseconds.
+        """
+        self.__file_path = os.path.abspath(file_path)
+        self.__bucket_duration = bucket_duration
+        self.__meta_path = self.__file_path + '.index.json'
+        self.__spans_path = self.__file_path + '.index.npy'
+        self.__buckets_path = self.__file_path + '.buckets.npy'
+
+        self.__file = None
+        self.__data = b''
+
+        if not self.__is_up_to_date():
+            self.build()
+        self.__load()
+
+    def __len__(self):
+        return len(self.__spans)
+
+    @property
+    def file_path(self) -> str:
+        return self.__file_path
+
+    @property
+    def time_range(self) -> tuple:
+        """ The (first, last) span timestamps, in microseconds. """
+        if not len(self.__spans):
+            return None
+        return int(self.__spans['timestamp'][0]), int(self.__spans['timestamp'][-1])
+
+    def close(self):
+        """ Closes the memory mapped trace file. """
+        if self.__file is not None:
+            if isinstance(self.__data, mmap.mmap):
+                self.__data.close()
+            self.__file.close()
+            self.__file = None
+            self.__data = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __source(self) -> list:
+        stat = os.stat(self.__file_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def __is_up_to_date(self) -> bool:
+        """
+        Checks if the saved index was built from the current trace file, with the same buckets.
+
+        :return: True if the index can be used, False if it must be rebuilt.
+        """
+        try:
+            with open(self.__meta_path) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return False
+        return meta.get('version') == INDEX_VERSION and meta.get('source') == self.__source() and \
+            meta.get('bucket_duration') == self.__bucket_duration and os.path.isfile(self.__spans_path) and \
+            os.path.isfile(self.__buckets_path)
+
+    def build(self):
+        """ Scans the trace file and saves its index. The metadata is written last, so a partial index is never used. """
+        start_time = time.time()
+        source = self.__source()
+
+        timestamps = list()
+        offsets = list()
+        lengths = list()
+        skipped = 0
+        for offset, length, span in my_json.iter_span_offsets(self.__file_path):
+            timestamp = span_timestamp(span)
+            if timestamp is None:
+                skipped += 1
+                continue
+            timestamps.append(timestamp)
+            offsets.append(offset)
+            lengths.append(length)
+
+        spans = np.zeros(len(timestamps), dtype=SPAN_DTYPE)
+        spans['timestamp'] = timestamps
+        spans['offset'] = offsets
+        spans['length'] = lengths
+        spans = spans[np.argsort(spans['timestamp'], kind='stable')]
+
+        bucket_size = self.__bucket_duration * 1000
+        first_bucket = int(spans['timestamp'][0]) // bucket_size if len(spans) else 0
+        last_bucket = int(spans['timestamp'][-1]) // bucket_size if len(spans) else -1
+        bucket_starts = (first_bucket + np.arange(last_bucket - first_bucket + 2, dtype=np.int64)) * bucket_size
+        buckets = np.searchsorted(spans['timestamp'], bucket_starts, side='left').astype(np.int64)
+
+        np.save(self.__spans_path, spans)
+        np.save(self.__buckets_path, buckets)
+
+        meta = {'version': INDEX_VERSION, 'source': source, 'bucket_duration': self.__bucket_duration,
+                'first_bucket': first_bucket}
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(self.__meta_path), suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(temporary_path, self.__meta_path)
+
+        if skipped:
+            logger.warning('{} spans without timestamp not indexed in {}'.format(skipped, self.__file_path))
+        logger.info('indexed {} spans of {} in {:.2f} seconds'.format(len(spans), self.__file_path,
+                                                                    time.time() - start_time))
+
+    def __load(self):
+        """ Memory maps the index and the trace file. """
+        with open(self.__meta_path) as meta_file:
+            self.__first_bucket = json.load(meta_file)['first_bucket']
+
+        self.__spans = np.load(self.__spans_path, mmap_mode='r')
+        self.__buckets = np.load(self.__buckets_path)
+
+        self.close()
+        self.__file = open(self.__file_path, 'rb')
+        if os.fstat(self.__file.fileno()).st_size:
+            self.__data = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __position(self, timestamp: int) -> int:
+        """
+        Finds the first span at or after a timestamp, searching only its bucket.
+
+        :param timestamp: The timestamp, in microseconds.
+        :return: The position of the span in the index.
+        """
+        bucket = timestamp // (self.__bucket_duration * 1000) - self.__first_bucket
+        if bucket < 0:
+            return 0
+        if bucket >= len(self.__buckets) - 1:
+            return len(self.__spans)
+        first, last = int(self.__buckets[bucket]), int(self.__buckets[bucket + 1])
+        return first + int(np.searchsorted(self.__spans['timestamp'][first:last], timestamp, side='left'))
+
+    def window(self, start_timestamp: int, end_timestamp: int) -> tuple:
+        """
+        Finds the spans of a time window.
+
+        :param start_timestamp: Only spans at or after this unix timestamp, in milliseconds.
+        :param end_timestamp: Only spans before this unix timestamp, in milliseconds.
+        :return: The (first, last) positions of the spans in the index, last excluded.
+        """
+        first = self.__position(start_timestamp * 1000)
+        return first, max(first, self.__position(end_timestamp * 1000))
+
+    def count(self, start_timestamp: int, end_timestamp: int) -> int:
+        """
+        Counts the spans of a time window.
+
+        :param start_timestamp: Start unix timestamp of the window, in milliseconds.
+        :param end_timestamp: End unix timestamp of the window, in milliseconds, excluded.
+        :return: The number of spans.
+        """
+        first, last = self.window(start_timestamp, end_timestamp)
+        return last - first
+
+    def spans(self, start_timestamp: int, end_timestamp: int):
+        """
+        Reads the spans of a time window from the trace file, sorted by timestamp.
+
+        :param start_timestamp: Start unix timestamp of the window, in milliseconds.
+        :param end_timestamp: End unix timestamp of the window, in milliseconds, excluded.
+        :return: A generator of the spans, as in the trace file.
+        """
+        first, last = self.window(start_timestamp, end_timestamp)
+        spans = self.__spans[first:last]
+        for offset, length in zip(spans['offset'].tolist(), spans['length'].tolist()):
+            yield json.loads(self.__data[offset:offset + length].decode('utf-8'))
+
+    def windows(self, windows: list):
+        """
+        Reads the spans of consecutive time windows, e.g. of my_list.tuple_list(my_time.timestamp_millis_split(...)).
+
+        :param windows: A list of (start, end) tuples, in unix timestamp milliseconds.
+        :return: A generator of (start, end, list of spans) tuples.
+        """
+        for start_timestamp, end_timestamp in windows:
+            yield start_timestamp, end_timestamp, list(self.spans(start_timestamp, end_timestamp))
@@ -0,0 +1,288 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from graphy.models import span as my_span
+from graphy.utils import config
+from graphy.utils import files as my_files
+from graphy.utils import json as my_json
+from graphy.utils import list as my_list
+from graphy.utils import logger as my_logger
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+logger = my_logger.setup_logging(__name__)
+
+graphy_config = config.get('GRAPHY')
+
+store_directory = os.path.join(my_files.ROOT_PROJECT_DIRECTORY,
+                               graphy_config.get('SPAN_STORE_DIRECTORY', 'data/span_store'))
+partition_duration = graphy_config.get('SPAN_STORE_PARTITION_DURATION', 60 * 60 * 1000)  # milliseconds
+chunk_size = graphy_config.get('SPAN_STORE_CHUNK_SIZE', 500000)  # spans held in memory while converting.
+
+STORE_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+KINDS = [None, 'CLIENT', 'SERVER', 'PRODUCER', 'CONSUMER']
+
+# Text columns hold codes into the dictionaries of the manifest, -1 when the span has no value.
+DICTIONARY_COLUMNS = {'service': 'services', 'name': 'names'}
+COLUMN_DTYPES = {
+    'timestamp': np.dtype('<i8'),  # microseconds, the sort key of each partition.
+    'duration': np.dtype('<i8'),  # microseconds.
+    'trace_id': None,  # fixed width bytes, sized to the longest id.
+    'id': None,
+    'parent_id': None,
+    'kind': np.dtype('i1'),  # position in KINDS.
+    'service': np.dtype('<i4'),
+    'name': np.dtype('<i4'),
+    'status_code': np.dtype('<i2'),  # 0 when the span has no HTTP status code.
+}
+COLUMNS = list(COLUMN_DTYPES)
+
+
+def span_row(record: my_span.SpanRecord, services: dict, names: dict) -> tuple:
+    """
+    Gets the column values of a span.
+
+    :param record: The SpanRecord of the span.
+    :param services: The code of each service name, updated with new names.
+    :param names: The code of each span name, updated with new names.
+    :return: The values in COLUMNS order.
+    """
+    return (record.timestamp or 0, record.duration or 0, record.trace_id or '', record.id or '',
+            record.parent_id or '', KINDS.index(record.kind) if record.kind in KINDS else 0,
+            services.setdefault(record.service_name, len(services)) if record.service_name else -1,
+            names.setdefault(record.name, len(names)) if record.name else -1, record.status_code)
+
+
+def span_columns(records: list, services: dict, names: dict) -> dict:
+    """
+    Gets the columns of a chunk of spans.
+
+    :param records: The list of SpanRecord's.
+    :param services: The code of each service name, updated with new names.
+    :param names: The code of each span name, updated with new names.
+    :return: A dictionary with the NumPy array of each column, in the order of the records.
+    """
+    rows = [span_row(record, services, names) for record in records]
+    columns = dict()
+    for position, column_name in enumerate(COLUMNS):
+        values = [row[position] for row in rows]
+        dtype = COLUMN_DTYPES[column_name]
+        if dtype is None:
+            values = [value.encode('utf-8') for value in values]
+            dtype = np.dtype('S{}'.format(max((len(value) for value in values), default=1) or 1))
+        columns[column_name] = np.array(values, dtype=dtype)
+    return columns
+
+
+class SpanStore(object):
+    """
+    SpanStore keeps the spans of trace files in a columnar format: one NumPy file per column, in partitions of
+    partition_duration milliseconds sorted by timestamp, plus a manifest with the time range of each partition and the
+    dictionaries of the text columns.
+
+    Reading memory maps only the columns asked for, of only the partitions overlapping the time range, and slices them
+    with a binary search on the timestamp column.
+    """
+
+    def __init__(self, directory: str = store_directory):
+        """
+        Initiate a new SpanStore over an existing store directory.
+
+        :param directory: The store directory, see convert.
+        """
+        self.__directory = directory
+        with open(os.path.join(directory, MANIFEST_FILE)) as manifest_file:
+            self.__manifest = json.load(manifest_file)
+
+        self.services = self.__manifest['services']
+        self.names = self.__manifest['names']
+        self.__partitions = self.__manifest['partitions']
+        self.__partition_starts = np.array([partition['start'] for partition in self.__partitions], dtype=np.int64)
+
+    def __len__(self):
+        return sum(partition['rows'] for partition in self.__partitions)
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    @property
+    def time_range(self) -> tuple:
+        """ The (first, last) span timestamps, in microseconds. """
+        if not self.__partitions:
+            return None
+        return self.__partitions[0]['first'], self.__partitions[-1]['last']
+
+    @classmethod
+    def convert(cls, trace_files: list, directory: str = store_directory,
+                partition_duration: int = partition_duration, chunk_size: int = chunk_size):
+        """
+        Converts JSON or JSONL trace files, in Zipkin v1 or v2 format, into a SpanStore.
+        The spans are parsed in parallel shards into compact records, see graphy.utils.json.iter_span_records, and
+        turned into columns chunk_size spans at a time. The columns of each chunk are split by partition into temporary
+        files, and each partition is then sorted and written on its own, so the memory used is bounded by the chunk and
+        the largest partition, not by the trace files.
+        The store is written to a temporary directory and moved into place, replacing any previous store.
+
+        :param trace_files: The trace file paths.
+        :param directory: The store directory.
+        :param partition_duration: The time length of each partition, in milliseconds.
+        :param chunk_size: The number of spans turned into columns at a time.
+        :return: The SpanStore.
+        """
+        start_time = time.time()
+
+        parent_directory = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent_directory, exist_ok=True)
+        temporary_directory = tempfile.mkdtemp(dir=parent_directory, suffix='.tmp')
+        chunks_directory = os.path.join(temporary_directory, 'chunks')
+        os.makedirs(chunks_directory)
+
+        services = dict()
+        names = dict()
+        partition_chunks = dict()  # partition key -> chunk files.
+        records = (record for trace_file in trace_files for record in my_json.iter_span_records(trace_file))
+        for chunk_number, chunk in enumerate(my_list.chunks(records, chunk_size)):
+            columns = span_columns(chunk, services, names)
+            del chunk
+
+            partition_keys = columns['timestamp'] // (partition_duration * 1000)
+            for partition_key in np.unique(partition_keys).tolist():
+                in_partition = partition_keys == partition_key
+                chunk_path = os.path.join(chunks_directory, '{}-{}.npz'.format(partition_key, chunk_number))
+                np.savez(chunk_path, **{column_name: column[in_partition] for column_name, column in columns.items()})
+                partition_chunks.setdefault(partition_key, list()).append(chunk_path)
+
+        partitions = list()
+        for partition_key in sorted(partition_chunks):
+            columns = {column_name: list() for column_name in COLUMNS}
+            for chunk_path in partition_chunks[partition_key]:
+                with np.load(chunk_path) as chunk_columns:
+                    for column_name in COLUMNS:
+                        columns[column_name].append(chunk_columns[column_name])
+                os.remove(chunk_path)
+            columns = {column_name: np.concatenate(column) for column_name, column in columns.items()}
+
+            order = np.argsort(columns['timestamp'], kind='stable')
+            partition_start = partition_key * partition_duration * 1000
+            partition_name = 'part-{}'.format(partition_start)
+            os.makedirs(os.path.join(temporary_directory, partition_name))
+            for column_name, column in columns.items():
+                np.save(os.path.join(temporary_directory, partition_name, column_name + '.npy'), column[order])
+            partitions.append({'name': partition_name, 'start': partition_start,
+                               'end': partition_start + partition_duration * 1000, 'rows': len(order),
+                               'first': int(columns['timestamp'][order[0]]),
+                               'last': int(columns['timestamp'][order[-1]])})
+        os.rmdir(chunks_directory)
+
+        manifest = {
+            'version': STORE_VERSION,
+            'sources': [os.path.abspath(trace_file) for trace_file in trace_files],
+            'partition_duration': partition_duration,
+            'columns': COLUMNS,
+            'services': sorted(services, key=services.get),
+            'names': sorted(names, key=names.get),
+            'partitions': partitions
+        }
+        with open(os.path.join(temporary_directory, MANIFEST_FILE), 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(temporary_directory, directory)
+
+        logger.info('converted {} spans into {} partitions in {:.2f} seconds'.format(
+            sum(partition['rows'] for partition in partitions), len(partitions), time.time() - start_time))
+        return cls(directory)
+
+    def read(self, columns: list = None, start_timestamp: int = None, end_timestamp: int = None,
+             service_name: str = None) -> dict:
+        """
+        Reads the spans of a time range.
+
+        :param columns: The columns to read, all by default.
+        :param start_timestamp: Only spans at or after this unix timestamp, in milliseconds.
+        :param end_timestamp: Only spans before this unix timestamp, in milliseconds.
+        :param service_name: Only the spans recorded by this service.
+        :return: A dictionary with the NumPy array of each column, sorted by timestamp.
+        """
+        columns = list(COLUMNS if columns is None else columns)
+        for column_name in columns:
+            if column_name not in COLUMN_DTYPES:
+                raise KeyError('unknown column {}'.format(column_name))
+
+        start = None if start_timestamp is None else start_timestamp * 1000
+        end = None if end_timestamp is None else end_timestamp * 1000
+
+        service_code = None
+        if service_name is not None:
+            service_code = self.services.index(service_name) if service_name in self.services else -2
+            read_columns = columns if 'service' in columns else columns + ['service']
+        else:
+            read_columns = columns
+
+        first_partition = 0
+        last_partition = len(self.__partitions)
+        if start is not None:
+            first_partition = max(int(np.searchsorted(self.__partition_starts, start, side='right')) - 1, 0)
+        if end is not None:
+            last_partition = int(np.searchsorted(self.__partition_starts, end, side='left'))
+
+        slices = {column_name: list() for column_name in read_columns}
+        for partition in self.__partitions[first_partition:last_partition]:
+            if (start is not None and partition['last'] < start) or (end is not None and partition['first'] >= end):
+                continue
+
+            first, last = 0, partition['rows']
+            if (start is not None and partition['first'] < start) or (end is not None and partition['last'] >= end):
+                timestamps = self.__column(partition, 'timestamp')
+                if start is not None:
+                    first = int(np.searchsorted(timestamps, start, side='left'))
+                if end is not None:
+                    last = int(np.searchsorted(timestamps, end, side='left'))
+
+            for column_name in read_columns:
+                slices[column_name].append(self.__column(partition, column_name)[first:last])
+
+        result = dict()
+        for column_name in read_columns:
+            if slices[column_name]:
+                result[column_name] = np.concatenate(slices[column_name])
+            else:
+                result[column_name] = np.zeros(0, dtype=COLUMN_DTYPES[column_name] or np.dtype('S1'))
+
+        if service_code is not None:
+            mask = result['service'] == service_code
+            result = {column_name: result[column_name][mask] for column_name in columns}
+        return result
+
+    def __column(self, partition: dict, column_name: str) -> np.ndarray:
+        return np.load(os.path.join(self.__directory, partition['name'], column_name + '.npy'), mmap_mode='r')
+
+    def decode(self, column_name: str, values: np.ndarray) -> list:
+        """
+        Decodes the values of a text column.
+
+        :param column_name: The column name.
+        :param values: The column values, as returned by read.
+        :return: The list of strings, None for spans without a value.
+        """
+        if column_name in DICTIONARY_COLUMNS:
+            dictionary = self.__manifest[DICTIONARY_COLUMNS[column_name]]
+            return [dictionary[code] if code >= 0 else None for code in values.tolist()]
+        if column_name == 'kind':
+            return [KINDS[code] for code in values.tolist()]
+        return [value.decode('utf-8') or None for value in values.tolist()]
@@ -0,0 +1,439 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from graphy.models import span as my_span
+from graphy.models.dependency_linker import DependencyLinker
+from graphy.utils import config
+from graphy.utils import files as my_files
+from graphy.utils import json as my_json
+from graphy.utils import logger as my_logger
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+logger = my_logger.setup_logging(__name__)
+
+graphy_config = config.get('GRAPHY')
+zipkin_config = config.get('ZIPKIN')
+
+index_directory = os.path.join(my_files.ROOT_PROJECT_DIRECTORY,
+                               graphy_config.get('TRACE_INDEX_DIRECTORY', 'data/trace_index'))
+
+INDEX_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+TRACES_FILE = 'traces.jsonl'
+TRACE_TABLE_FILE = 'traces.npy'
+TRACE_IDS_FILE = 'trace_ids.npy'
+TRACE_SERVICES_FILE = 'trace_services.npy'
+LINKS_FILE = 'links.npy'
+
+# Traces sorted by start, in microseconds, and their position in the traces file.
+TRACE_DTYPE = np.dtype([('start', '<i8'), ('end', '<i8'), ('offset', '<i8'), ('length', '<i8')])
+# The services of each trace and the dependency links of each trace, sorted by trace position.
+TRACE_SERVICE_DTYPE = np.dtype([('trace', '<i8'), ('service', '<i4')])
+LINK_DTYPE = np.dtype([('trace', '<i8'), ('parent', '<i4'), ('child', '<i4'), ('calls', '<i8'), ('errors', '<i8')])
+
+
+def matches_annotation_query(trace: list, annotation_query: str, service_name: str = None) -> bool:
+    """
+    Checks if a span of a trace matches all the terms of a Zipkin annotation query, e.g. "http.status_code=500 and
+    retried". A key=value term matches a tag, a single word matches an annotation value or a tag key.
+
+    :param trace: The trace in Zipkin v2 format.
+    :param annotation_query: The annotation query.
+    :param service_name: Only match the spans of this service.
+    :return: True if a span matches, False otherwise.
+    """
+    terms = [term.strip() for term in annotation_query.split(' and ') if term.strip()]
+    for span in trace:
+        if service_name is not None and my_span.get_service_name(span) != service_name:
+            continue
+        tags = span.get('tags') or dict()
+        values = {annotation.get('value') for annotation in span.get('annotations', list())}
+        if all(tags.get(term.split('=', 1)[0]) == term.split('=', 1)[1] if '=' in term else
+               term in values or term in tags for term in terms):
+            return True
+    return False
+
+
+class TraceFileSource(object):
+    """
+    TraceFileSource answers the queries of the Zipkin API from trace files, JSON or JSONL in Zipkin v1 or v2 format,
+    with the graphy.utils.zipkin interface.
+
+    The spans are converted to v2 and grouped by trace once, into an index directory: the traces sorted by start, one
+    per line, and NumPy tables with their time and byte range, their services and their dependency links. The tables
+    and the traces are memory mapped, so a window query is a binary search and the dependencies are aggregated
+    without decoding any trace. The index is rebuilt when a trace file changes.
+    """
+
+    def __init__(self, trace_files: list, directory: str = None):
+        """
+        Initiate a new TraceFileSource, building the index if it is missing or out of date.
+
+        :param trace_files: The trace file paths.
+        :param directory: The index directory, a directory named after the trace files in TRACE_INDEX_DIRECTORY by
+        default.
+        """
+        self.__trace_files = [os.path.abspath(trace_file) for trace_file in trace_files]
+        if directory is None:
+            key = hashlib.sha1('\n'.join(self.__trace_files).encode('utf-8')).hexdigest()
+            directory = os.path.join(index_directory, key)
+        self.__directory = directory
+
+        self.__traces_file = None
+        self.__traces_data = b''
+
+        if not self.__is_up_to_date():
+            self.__build()
+        self.__load()
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    def __len__(self):
+        return len(self.__traces)
+
+    def close(self):
+        """ Closes the memory mapped traces file. """
+        if self.__traces_file is not None:
+            if isinstance(self.__traces_data, mmap.mmap):
+                self.__traces_data.close()
+            self.__traces_file.close()
+            self.__traces_file = None
+            self.__traces_data = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __path(self, file_name: str) -> str:
+        return os.path.join(self.__directory, file_name)
+
+    def __sources(self) -> list:
+        """
+        Gets the identity of the trace files, their path, size and modification time.
+
+        :return: A list of [path, size, modification time] lists.
+        """
+        sources = list()
+        for trace_file in self.__trace_files:
+            stat = os.stat(trace_file)
+            sources.append([trace_file, stat.st_size, stat.st_mtime_ns])
+        return sources
+
+    def __is_up_to_date(self) -> bool:
+        """
+        Checks if the index was built from the current trace files.
+
+        :return: True if the index can be used, False if it must be rebuilt.
+        """
+        try:
+            with open(self.__path(MANIFEST_FILE)) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return False
+        return manifest.get('version') == INDEX_VERSION and manifest.get('sources') == self.__sources()
+
+    def __build(self):
+        """ Builds the index of the trace files. The manifest is written last, so a partial index is never used. """
+        start_time = time.time()
+        os.makedirs(self.__directory, exist_ok=True)
+
+        traces = defaultdict(list)
+        span_count = 0
+        for trace_file in self.__trace_files:
+            for span in my_json.iter_spans(trace_file):
+                for v2_span in my_span.to_v2(span):
+                    if v2_span.get('traceId') is None:
+                        continue
+                    traces[v2_span.get('traceId')].append(v2_span)
+                    span_count += 1
+
+        trace_bounds = dict()
+        for trace_id, trace in traces.items():
+            timestamps = [span['timestamp'] for span in trace if span.get('timestamp')]
+            start = min(timestamps, default=0)
+            end = max((span['timestamp'] + span.get('duration', 0) for span in trace if span.get('timestamp')),
+                      default=0)
+            trace_bounds[trace_id] = (start, end)
+        trace_ids = sorted(traces, key=lambda trace_id: (trace_bounds[trace_id][0], trace_id))
+
+        service_codes = dict()
+        services = set()
+        span_names = defaultdict(set)
+
+        def service_code(name):
+            return service_codes.setdefault(name, len(service_codes))
+
+        trace_table = np.zeros(len(trace_ids), dtype=TRACE_DTYPE)
+        trace_services = list()
+        links = list()
+        offset = 0
+
+        with open(self.__path(TRACES_FILE) + '.tmp', 'wb') as traces_file:
+            for position, trace_id in enumerate(trace_ids):
+                trace = traces.pop(trace_id)
+                line = json.dumps(trace).encode('utf-8') + b'\n'
+                traces_file.write(line)
+                trace_table[position] = trace_bounds[trace_id] + (offset, len(line))
+                offset += len(line)
+
+                trace_service_names = set()
+                for span in trace:
+                    name = my_span.get_service_name(span)
+                    if name:
+                        trace_service_names.add(name)
+                        if span.get('name'):
+                            span_names[name].add(span['name'])
+                services.update(trace_service_names)
+                trace_services.extend((position, service_code(name)) for name in sorted(trace_service_names))
+
+                for dependency in DependencyLinker().add_trace(trace).link():
+                    links.append((position, service_code(dependency['parent']), service_code(dependency['child']),
+                                  dependency['callCount'], dependency.get('errorCount', 0)))
+
+        os.replace(self.__path(TRACES_FILE) + '.tmp', self.__path(TRACES_FILE))
+        np.save(self.__path(TRACE_TABLE_FILE), trace_table)
+        np.save(self.__path(TRACE_IDS_FILE), np.array(trace_ids, dtype=bytes) if trace_ids else np.zeros(0, 'S1'))
+        np.save(self.__path(TRACE_SERVICES_FILE), np.array(trace_services, dtype=TRACE_SERVICE_DTYPE))
+        np.save(self.__path(LINKS_FILE), np.array(links, dtype=LINK_DTYPE))
+
+        manifest = {
+            'version': INDEX_VERSION,
+            'sources': self.__sources(),
+            'service_codes': sorted(service_codes, key=service_codes.get),
+            'services': sorted(services),
+            'span_names': {name: sorted(names) for name, names in span_names.items()},
+            'trace_count': len(trace_ids),
+            'span_count': span_count
+        }
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.__directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(temporary_path, self.__path(MANIFEST_FILE))
+
+        logger.info('indexed {} spans in {} traces from {} in {:.2f} seconds'.format(
+            span_count, len(trace_ids), self.__trace_files, time.time() - start_time))
+
+    def __load_table(self, file_name: str) -> np.ndarray:
+        table = np.load(self.__path(file_name), mmap_mode='r')
+        return table if table.size else np.load(self.__path(file_name))
+
+    def __load(self):
+        """ Memory maps the index. """
+        with open(self.__path(MANIFEST_FILE)) as manifest_file:
+            manifest = json.load(manifest_file)
+
+        self.__service_names = manifest['service_codes']
+        self.__service_codes = {name: code for code, name in enumerate(self.__service_names)}
+        self.__services = manifest['services']
+        self.__span_names = manifest['span_names']
+
+        self.__traces = self.__load_table(TRACE_TABLE_FILE)
+        self.__trace_ids = self.__load_table(TRACE_IDS_FILE)
+        self.__trace_services = self.__load_table(TRACE_SERVICES_FILE)
+        self.__links = self.__load_table(LINKS_FILE)
+
+        self.__traces_file = open(self.__path(TRACES_FILE), 'rb')
+        if os.fstat(self.__traces_file.fileno()).st_size:
+            self.__traces_data = mmap.mmap(self.__traces_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __window(self, end_ts: int, lookback: int) -> tuple:
+        """
+        Finds the traces that started in a window.
+
+        :param end_ts: End timestamp in milliseconds, the current time by default.
+        :param lookback: The window length in milliseconds.
+        :return: The (first, last) positions of the traces in the window, last excluded.
+        """
+        end_ts = int(time.time() * 1000) if end_ts is None else end_ts
+        start = self.__traces['start']
+        first = np.searchsorted(start, (end_ts - lookback) * 1000, side='left')
+        last = np.searchsorted(start, end_ts * 1000, side='right')
+        return int(first), int(last)
+
+    def __trace(self, position: int) -> list:
+        offset = int(self.__traces['offset'][position])
+        return json.loads(self.__traces_data[offset:offset + int(self.__traces['length'][position])].decode('utf-8'))
+
+    def get_services(self) -> list:
+        """
+        Get all the service names in the trace files.
+
+        :return: A list with all services.
+        """
+        return list(self.__services)
+
+    def get_spans(self, service_name: str) -> list:
+        """
+        Get all the span names recorded by a particular service.
+
+        :param service_name: The service name.
+        :return: the span names
+        """
+        return list(self.__span_names.get(service_name, list()))
+
+    def get_traces(self, lookback=365 * 24 * 60 * 60 * 1000, service_name=None, span_name=None,
+                   annotation_query=None, min_duration=None, max_duration=None, end_ts=None,
+                   limit=zipkin_config.get('TRACE_LIMIT')) -> list:
+        """
+        Get the traces that started in a window, newest first, see graphy.utils.zipkin.get_traces for the parameters.
+
+        :return: list of traces with respect to the provided parameters.
+        """
+        first, last = self.__window(end_ts, lookback)
+        positions = np.arange(first, last)
+
+        if service_name is not None:
+            service_code = self.__service_codes.get(service_name)
+            trace_services = self.__trace_services
+            service_first, service_last = np.searchsorted(trace_services['trace'], [first, last])
+            trace_services = trace_services[service_first:service_last]
+            positions = np.unique(trace_services['trace'][trace_services['service'] == service_code])
+
+        traces = list()
+        for position in positions[::-1]:
+            if limit is not None and len(traces) >= limit:
+                break
+            trace = self.__trace(int(position))
+
+            spans = [span for span in trace
+                     if service_name is None or my_span.get_service_name(span) == service_name]
+            if span_name is not None:
+                spans = [span for span in spans if span.get('name') == span_name]
+            if min_duration is not None:
+                spans = [span for span in spans if span.get('duration', 0) >= min_duration]
+            if max_duration is not None:
+                spans = [span for span in spans if span.get('duration', 0) <= max_duration]
+            if not spans:
+                continue
+            if annotation_query and not matches_annotation_query(trace, annotation_query, service_name):
+                continue
+            traces.append(trace)
+        return traces
+
+    def get_trace(self, trace_id) -> list:
+        """
+        Get the trace with the provided trace id.
+
+        :param trace_id: Trace identifier, set on all spans within it
+        :return: the trace data, an empty list if it is not in the trace files
+        """
+        positions = np.flatnonzero(self.__trace_ids == str(trace_id).encode('utf-8'))
+        return self.__trace(int(positions[0])) if len(positions) else list()
+
+    def get_dependencies(self, end_ts, lookback=60 * 60 * 1000) -> list:
+        """
+        Get the dependencies of the traces that started in a window.
+
+        :param end_ts: End timestamp in milliseconds.
+        :param lookback: Timestamp in milliseconds of lookback, 1 hour default.
+        :return: the dependencies data, in Zipkin format
+        """
+        first, last = self.__window(end_ts, lookback)
+        link_first, link_last = np.searchsorted(self.__links['trace'], [first, last])
+        links = self.__links[link_first:link_last]
+        if not len(links):
+            return list()
+
+        service_count = len(self.__service_names)
+        keys = links['parent'].astype(np.int64) * service_count + links['child']
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        call_counts = np.bincount(inverse, weights=links['calls'])
+        error_counts = np.bincount(inverse, weights=links['errors'])
+
+        dependencies = list()
+        for key, call_count, error_count in zip(unique_keys.tolist(), call_counts.tolist(), error_counts.tolist()):
+            dependency = {'parent': self.__service_names[key // service_count],
+                          'child': self.__service_names[key % service_count],
+                          'callCount': int(call_count)}
+            if error_count:
+                dependency['errorCount'] = int(error_count)
+            dependencies.append(dependency)
+        return dependencies
+
+
+default_source = None
+
+
+def get_source() -> TraceFileSource:
+    """
+    Gets the TraceFileSource of the TRACE_FILES shared by the module functions.
+
+    :return: The default TraceFileSource.
+    """
+    global default_source
+    if default_source is None:
+        default_source = TraceFileSource([my_files.get_absolute_path(trace_file,
+                                                                     graphy_config.get('TRACE_FILE_FROM_PROJECT'))
+                                          for trace_file in graphy_config.get('TRACE_FILES')])
+    return default_source
+
+
+def get_services():
+    """
+    Get all the service names in the trace files.
+
+    :return: A list with all services.
+    """
+    return get_source().get_services()
+
+
+def get_spans(service_name: str) -> list:
+    """
+    Get all the span names recorded by a particular service.
+
+    :param service_name: The service name.
+    :return: the span names
+    """
+    return get_source().get_spans(service_name)
+
+
+def get_traces(lookback=365 * 24 * 60 * 60 * 1000, service_name=None, span_name=None, annotation_query=None,
+               min_duration=None, max_duration=None, end_ts=None, limit=zipkin_config.get('TRACE_LIMIT')):
+    """
+    Get the traces in the trace files, see graphy.utils.zipkin.get_traces for the parameters.
+
+    :return: list of traces with respect to the provided parameters.
+    """
+    return get_source().get_traces(lookback=lookback, service_name=service_name, span_name=span_name,
+                                   annotation_query=annotation_query, min_duration=min_duration,
+                                   max_duration=max_duration, end_ts=end_ts, limit=limit)
+
+
+def get_trace(trace_id):
+    """
+    Get the trace with the provided trace id.
+
+    :param trace_id: Trace identifier, set on all spans within it
+    :return: the trace data
+    """
+    return get_source().get_trace(trace_id)
+
+
+def get_dependencies(end_ts, lookback=60 * 60 * 1000):
+    """
+    Get the dependencies computed from the trace files.
+
+    :param end_ts: End timestamp in milliseconds.
+    :param lookback: Timestamp in milliseconds of lookback, 1 hour default.
+    :return: the dependencies data
+    """
+    return get_source().get_dependencies(end_ts, lookback)
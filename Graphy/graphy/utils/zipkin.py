@@ -1,15 +1,24 @@
 """
     Author: André Bento
-    Date last modified: 07-03-2019
+    Date last modified: 18-10-2026
 """
-import sys
+import asyncio
+import functools
+import gzip
+import hashlib
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from graphy.utils import config
 from graphy.utils import files as my_files
+from graphy.utils import json as my_json
+from graphy.utils import list as my_list
 from graphy.utils import logger as my_logger
+from graphy.utils.cache import ResponseCache
 
 try:
     import simplejson as json
@@ -31,6 +40,21 @@ address_v2 = base_address + api_v2_endpoint
 
 headers = {'content-type': 'application/json'}
 
+timeout = zipkin_config.get('TIMEOUT', 60)
+pool_size = zipkin_config.get('POOL_SIZE', 10)
+use_gzip = zipkin_config.get('GZIP', True)
+
+post_batch_size = zipkin_config.get('POST_BATCH_SIZE', 5000)
+post_workers = zipkin_config.get('POST_WORKERS', 4)
+post_retries = zipkin_config.get('POST_RETRIES', 3)
+post_retry_backoff = 1  # seconds, doubled on every retry.
+
+cache_enabled = zipkin_config.get('CACHE_ENABLED', False)
+cache_directory = os.path.join(my_files.ROOT_PROJECT_DIRECTORY,
+                               zipkin_config.get('CACHE_DIRECTORY', 'data/zipkin_cache'))
+cache_max_size = zipkin_config.get('CACHE_MAX_SIZE_MB', 1024) * 1024 * 1024
+cache_min_age = zipkin_config.get('CACHE_MIN_AGE', 300) * 1000  # milliseconds
+
 
 class ZipkinTraceLimit(Exception):
     """ Exception for Zipkin request trace limit. # """
@@ -39,18 +63,392 @@ class ZipkinTraceLimit(Exception):
         super(ZipkinTraceLimit, self).__init__('trace limit exceeded with {} traces'.format(trace_len))
 
 
+class ZipkinError(Exception):
+    """ Base exception for errors while communicating with the Zipkin API. """
+
+
+class ZipkinConnectionError(ZipkinError):
+    """ Exception for Zipkin API requests that could not be completed (connection refused, timeout, ...). """
+
+    def __init__(self, url: str, cause: Exception) -> None:
+        super(ZipkinConnectionError, self).__init__('request to {} failed: {}'.format(url, cause))
+        self.url = url
+
+
+class ZipkinResponseError(ZipkinError):
+    """ Exception for Zipkin API responses with an unexpected HTTP status code. """
+
+    def __init__(self, url: str, status_code: int) -> None:
+        super(ZipkinResponseError, self).__init__('request to {} returned HTTP code {}'.format(url, status_code))
+        self.url = url
+        self.status_code = status_code
+
+
+class ZipkinClient(object):
+    """ ZipkinClient queries the Zipkin API over a keep-alive connection pool. """
+
+    def __init__(self, address: str = base_address, timeout: float = timeout, pool_size: int = pool_size,
+                 gzip_enabled: bool = use_gzip, cache: ResponseCache = None):
+        """
+        Initiate a new ZipkinClient.
+
+        :param address: The Zipkin base address, protocol included.
+        :param timeout: The connect and read timeout of each request, in seconds.
+        :param pool_size: The maximum number of connections kept alive.
+        :param gzip_enabled: True to compress requests and responses with gzip, False otherwise.
+        :param cache: The ResponseCache of the traces and dependencies of past windows, None to disable caching. Empty
+        responses, and responses received while spans are posted or after a failed post, are not cached.
+        """
+        self.__address_v1 = address + api_v1_endpoint
+        self.__address_v2 = address + api_v2_endpoint
+        self.__timeout = timeout
+        self.__gzip = gzip_enabled
+        self.__pool_size = pool_size
+        self.__cache = cache
+
+        self.__posting = 0  # Responses are not cached while spans are posted, nor after a failed post.
+        self.__post_failed = False
+
+        self.__session = requests.Session()
+        self.__session.mount(address, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.__session.headers['Accept-Encoding'] = 'gzip' if gzip_enabled else 'identity'
+
+    @property
+    def pool_size(self):
+        return self.__pool_size
+
+    @property
+    def cache(self) -> ResponseCache:
+        return self.__cache
+
+    def close(self):
+        """ Closes all the pooled connections. """
+        self.__session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __request(self, method: str, url: str, expected_status_code: int = 200, **kwargs):
+        """
+        Performs a request to the Zipkin API.
+
+        :param method: The HTTP method.
+        :param url: The request url.
+        :param expected_status_code: The HTTP code of a successful response.
+        :return: The response.
+        """
+        try:
+            response = self.__session.request(method, url, timeout=self.__timeout, **kwargs)
+        except requests.exceptions.RequestException as ex:
+            raise ZipkinConnectionError(url, ex) from ex
+        if response.status_code != expected_status_code:
+            raise ZipkinResponseError(url, response.status_code)
+        return response
+
+    def __get(self, endpoint: str, params: dict = None, cacheable: bool = False):
+        """
+        Gets and decodes a JSON resource from the Zipkin API v2.
+
+        :param endpoint: The endpoint, relative to the API v2 address.
+        :param params: The query parameters.
+        :param cacheable: True if the response only depends on the endTs and lookback parameters, so it can be cached
+        once the window is in the past.
+        :return: The decoded response.
+        """
+        url = self.__address_v2 + endpoint
+
+        cache = self.__cache if cacheable and self.__is_past_window(params) else None
+        if cache is not None:
+            content = cache.get(url, params)
+            if content is not None:
+                return json.loads(content.decode('utf-8'))
+
+        response = self.__request('GET', url, params=params)
+        content = json.loads(response.text)
+        # Empty responses are not cached, as the spans of the window may not have been posted yet.
+        if cache is not None and content and not self.__posting and not self.__post_failed:
+            cache.put(url, params, response.content)
+        return content
+
+    @staticmethod
+    def __is_past_window(params: dict) -> bool:
+        """
+        Checks if a query window ended long enough ago for its data not to change.
+
+        :param params: The query parameters, with endTs in milliseconds.
+        :return: True if the window is in the past, False if it overlaps now.
+        """
+        return params['endTs'] <= time.time() * 1000 - cache_min_age
+
+    def get_services(self) -> list:
+        """
+        Get all the service names from the Zipkin API.
+
+        :return: A list with all services presented in Zipkin.
+        """
+        return self.__get('services')
+
+    def get_spans(self, service_name: str) -> list:
+        """
+        Get all the span names recorded by a particular service from the Zipkin API.
+
+        :param service_name: Ex api_com (required) - Lower-case label of a node in the service graph.
+        :return: the spans data
+        """
+        return self.__get('spans', {'serviceName': service_name})
+
+    def get_traces(self, lookback=365 * 24 * 60 * 60 * 1000, service_name=None, span_name=None,
+                   annotation_query=None, min_duration=None, max_duration=None, end_ts=None,
+                   limit=zipkin_config.get('TRACE_LIMIT')) -> list:
+        """
+        Get all the traces from the Zipkin API, see the module get_traces function for the parameters.
+
+        :return: list of traces with respect to the provided parameters.
+        """
+        params = {
+            'serviceName': service_name,
+            'spanName': span_name,
+            'annotationQuery': annotation_query,
+            'minDuration': min_duration,
+            'maxDuration': max_duration,
+            'endTs': int(time.time() * 1000) if end_ts is None else end_ts,
+            'lookback': lookback,
+            'limit': limit
+        }
+        return self.__get('traces', params, cacheable=True)
+
+    def get_trace(self, trace_id) -> list:
+        """
+        Get the trace with the provided trace id.
+
+        :param trace_id: Trace identifier, set on all spans within it
+        :return: the trace data
+        """
+        return self.__get('trace/{}'.format(trace_id))
+
+    def get_dependencies(self, end_ts, lookback=60 * 60 * 1000) -> list:
+        """
+        Get all the dependencies from the Zipkin API.
+
+        :param end_ts: End timestamp in milliseconds.
+        :param lookback: Timestamp in milliseconds of lookback, 1 hour default.
+        :return: the dependencies data
+        """
+        return self.__get('dependencies', {'endTs': end_ts, 'lookback': lookback}, cacheable=True)
+
+    def post_spans(self, spans_file, batch_size=post_batch_size, workers=post_workers, retries=post_retries):
+        """
+        Post the spans utils file to the Zipkin API.
+        The file is streamed in batches of spans, posted concurrently over the connection pool.
+
+        :param spans_file: spans file path.
+        :param batch_size: The number of spans sent in each request.
+        :param workers: The maximum number of requests in flight, bounded by the pool size.
+        :param retries: The number of times a failed batch is retried.
+        :return: True if all batches were accepted (equal to HTTP code 202), False otherwise.
+        """
+        workers = min(workers, self.__pool_size)
+
+        self.__posting += 1
+        success = False
+        try:
+            success = self.__post_spans(spans_file, batch_size, workers, retries)
+            return success
+        finally:
+            self.__posting -= 1
+            self.__post_failed = self.__post_failed or not success
+
+    def __post_spans(self, spans_file, batch_size: int, workers: int, retries: int) -> bool:
+        """ Posts the spans file in concurrent batches, see post_spans. """
+        start_time = time.time()
+        posted_spans = 0
+        failed_batches = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for batch in my_list.chunks(my_json.iter_spans(spans_file), batch_size):
+                if len(pending) >= 2 * workers:  # Bound the number of batches held in memory.
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        batch_len, success = future.result()
+                        posted_spans += batch_len if success else 0
+                        failed_batches += 0 if success else 1
+                    self.__log_post_progress(spans_file, posted_spans, start_time)
+
+                pending.add(executor.submit(self.__post_batch, batch, retries))
+
+            for future in pending:
+                batch_len, success = future.result()
+                posted_spans += batch_len if success else 0
+                failed_batches += 0 if success else 1
+
+        self.__log_post_progress(spans_file, posted_spans, start_time)
+        if failed_batches:
+            logger.error('{} batches from {} were not accepted by Zipkin'.format(failed_batches, spans_file))
+        return failed_batches == 0
+
+    def __post_batch(self, batch: list, retries: int):
+        """
+        Posts a batch of spans to the Zipkin API, retrying with exponential backoff on failure.
+
+        :param batch: The list of spans.
+        :param retries: The number of times the batch is retried.
+        :return: A tuple with the number of spans in the batch and True if the batch was accepted, False otherwise.
+        """
+        spans_data = json.dumps(batch).encode('utf-8')
+        post_headers = dict(headers)
+        if self.__gzip:
+            spans_data = gzip.compress(spans_data)
+            post_headers['content-encoding'] = 'gzip'
+
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(post_retry_backoff * 2 ** (attempt - 1))
+            try:
+                self.__request('POST', self.__address_v1 + 'spans', 202, data=spans_data, headers=post_headers)
+                return len(batch), True
+            except ZipkinError as ex:
+                logger.warning('batch of {} spans not posted: {}'.format(len(batch), ex))
+        return len(batch), False
+
+    @staticmethod
+    def __log_post_progress(spans_file, posted_spans: int, start_time: float):
+        """
+        Logs the progress and throughput of a span upload.
+
+        :param spans_file: spans file path.
+        :param posted_spans: The number of spans accepted so far.
+        :param start_time: The time the upload started.
+        """
+        elapsed_time = time.time() - start_time
+        logger.info('{}: posted {} spans in {:.2f} seconds ({:.0f} spans/s)'.format(
+            spans_file, posted_spans, elapsed_time, posted_spans / elapsed_time if elapsed_time else posted_spans))
+
+
+class AsyncZipkinClient(object):
+    """
+    AsyncZipkinClient exposes the ZipkinClient queries as coroutines, so many windows or services can be fetched at
+    once. The blocking requests run on a bounded thread pool sharing the ZipkinClient connection pool.
+    """
+
+    def __init__(self, client: ZipkinClient = None, max_concurrency: int = None):
+        """
+        Initiate a new AsyncZipkinClient.
+
+        :param client: The ZipkinClient used to perform the requests, a new one is created by default. A client passed
+        in is left open on close.
+        :param max_concurrency: The maximum number of requests in flight, the client pool size by default.
+        """
+        self.__owns_client = client is None
+        self.__client = ZipkinClient() if client is None else client
+        self.__executor = ThreadPoolExecutor(max_workers=max_concurrency or self.__client.pool_size)
+
+    def close(self):
+        """ Shuts down the thread pool and closes the client connections, if the client was created by it. """
+        self.__executor.shutdown()
+        if self.__owns_client:
+            self.__client.close()
+
+    async def __run(self, func, *args, **kwargs):
+        """ Runs a blocking ZipkinClient call on the thread pool. """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, functools.partial(func, *args, **kwargs))
+
+    async def get_services(self) -> list:
+        """ See ZipkinClient.get_services. """
+        return await self.__run(self.__client.get_services)
+
+    async def get_traces(self, **kwargs) -> list:
+        """ See ZipkinClient.get_traces. """
+        return await self.__run(self.__client.get_traces, **kwargs)
+
+    async def get_dependencies(self, end_ts, lookback=60 * 60 * 1000) -> list:
+        """ See ZipkinClient.get_dependencies. """
+        return await self.__run(self.__client.get_dependencies, end_ts, lookback)
+
+    async def get_dependencies_in_windows(self, windows: list) -> list:
+        """
+        Gets the dependencies of many time windows at once.
+
+        :param windows: A list of (start, end) tuples, in unix timestamp milliseconds.
+        :return: A list with the dependencies of each window, in the same order.
+        """
+        return await asyncio.gather(*[self.get_dependencies(end_ts=end, lookback=end - start)
+                                      for start, end in windows])
+
+    async def get_traces_in_windows(self, windows: list, **kwargs) -> list:
+        """
+        Gets the traces of many time windows at once.
+
+        :param windows: A list of (start, end) tuples, in unix timestamp milliseconds.
+        :return: A list with the traces of each window, in the same order.
+        """
+        return await asyncio.gather(*[self.get_traces(end_ts=end, lookback=end - start, **kwargs)
+                                      for start, end in windows])
+
+    async def get_traces_by_service(self, service_names: list, **kwargs) -> dict:
+        """
+        Gets the traces of many services at once.
+
+        :param service_names: The list of service names.
+        :return: A dictionary with the traces of each service.
+        """
+        traces = await asyncio.gather(*[self.get_traces(service_name=service_name, **kwargs)
+                                        for service_name in service_names])
+        return dict(zip(service_names, traces))
+
+
+default_client = None
+
+
+def cache_namespace(trace_files: list = None) -> str:
+    """
+    Gets the namespace of the cached responses, a hash of the path, size and modification time of the trace files
+    posted to Zipkin, so the responses cached for other trace files are not used.
+
+    :param trace_files: The trace file paths, the GRAPHY TRACE_FILES by default.
+    :return: The namespace.
+    """
+    graphy_config = config.get('GRAPHY')
+    if trace_files is None:
+        trace_files = graphy_config.get('TRACE_FILES') or list()
+
+    sources = list()
+    for trace_file in trace_files:
+        if graphy_config.get('TRACE_FILE_FROM_PROJECT'):
+            trace_file = os.path.join(my_files.ROOT_PROJECT_DIRECTORY, trace_file)
+        trace_file = os.path.abspath(trace_file)
+        try:
+            stat = os.stat(trace_file)
+            sources.append([trace_file, stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            sources.append([trace_file, None, None])
+    return hashlib.sha1(json.dumps(sources).encode('utf-8')).hexdigest()
+
+
+def get_client() -> ZipkinClient:
+    """
+    Gets the ZipkinClient shared by the module functions.
+
+    :return: The default ZipkinClient.
+    """
+    global default_client
+    if default_client is None:
+        cache = ResponseCache(cache_directory, cache_max_size, namespace=cache_namespace()) if cache_enabled else None
+        default_client = ZipkinClient(cache=cache)
+    return default_client
+
+
 def get_services():
     """
     Get all the service names from the Zipkin API.
 
     :return: A list with all services presented in Zipkin.
     """
-    try:
-        response = requests.get(address_v2 + 'services')
-        return json.loads(response.text)
-    except ConnectionError as ex:
-        logger.error('{}: {}'.format(type(ex), ex))
-        sys.exit(status=1)
+    return get_client().get_services()
 
 
 def get_spans(service_name: str) -> list:
@@ -61,31 +459,23 @@ def get_spans(service_name: str) -> list:
     enumerates possible input values.
     :return: the spans data
     """
-    try:
-        params = {'serviceName': service_name}
-        response = requests.get(address_v2 + 'spans', params)
-        return json.loads(response.text)
-    except ConnectionError as ex:
-        logger.error('{}: {}'.format(type(ex), ex))
-        sys.exit(status=1)
+    return get_client().get_spans(service_name)
 
 
-def post_spans(spans_file):
+def post_spans(spans_file, batch_size=post_batch_size, workers=post_workers, retries=post_retries):
     """
     Post the spans utils file to the Zipkin API if it's not already there.
+    The file is streamed in batches of spans, posted concurrently over a pooled HTTP session.
 
     :param spans_file: spans file path.
-    :return: True if the operation was successful (equal to HTTP code 202), False otherwise.
+    :param batch_size: The number of spans sent in each request.
+    :param workers: The maximum number of requests in flight.
+    :param retries: The number of times a failed batch is retried.
+    :return: True if all batches were accepted (equal to HTTP code 202), False otherwise.
     """
     if not zipkin_config['POST_DATA']:
         return True
-    try:
-        spans_data = my_files.read_file(spans_file)
-        response = requests.post(address_v1 + 'spans', data=spans_data, headers=headers)
-        return response.status_code == 202
-    except Exception as ex:
-        logger.error('{}: {}'.format(type(ex), ex))
-        sys.exit(status=1)
+    return get_client().post_spans(spans_file, batch_size, workers, retries)
 
 
 def get_traces(lookback=365 * 24 * 60 * 60 * 1000, service_name=None, span_name=None, annotation_query=None,
@@ -110,22 +500,9 @@ def get_traces(lookback=365 * 24 * 60 * 60 * 1000, service_name=None, span_name=
     :param limit: Maximum number of traces to return. Defaults to 10
     :return: list of traces with respect to the provided parameters.
     """
-    try:
-        params = {
-            'serviceName': service_name,
-            'spanName': span_name,
-            'annotationQuery': annotation_query,
-            'minDuration': min_duration,
-            'maxDuration': max_duration,
-            'endTs': int(time.time()) if end_ts is None else end_ts,
-            'lookback': lookback,
-            'limit': limit
-        }
-        response = requests.get(address_v2 + 'traces', params)
-        return json.loads(response.text)
-    except ConnectionError as ex:
-        logger.error('{}: {}'.format(type(ex), ex))
-        sys.exit(status=1)
+    return get_client().get_traces(lookback=lookback, service_name=service_name, span_name=span_name,
+                                   annotation_query=annotation_query, min_duration=min_duration,
+                                   max_duration=max_duration, end_ts=end_ts, limit=limit)
 
 
 def get_trace(trace_id):
@@ -135,8 +512,7 @@ def get_trace(trace_id):
     :param trace_id: Trace identifier, set on all spans within it
     :return: the trace data
     """
-    response = requests.get(address_v2 + 'trace/{}'.format(trace_id))
-    return json.loads(response.text)
+    return get_client().get_trace(trace_id)
 
 
 def get_dependencies(end_ts, lookback=60 * 60 * 1000):
@@ -144,12 +520,6 @@ def get_dependencies(end_ts, lookback=60 * 60 * 1000):
     Get all the dependencies from the Zipkin API.
     :param end_ts: End timestamp in milliseconds.
     :param lookback: Timestamp in milliseconds of lookback, 1 hour default.
-    :return: the dependencies data or None
-    """
-    try:
-        params = {'endTs': end_ts, 'lookback': lookback}
-        response = requests.get(address_v2 + 'dependencies', params)
-        return None if response.status_code != 200 else json.loads(response.text)
-    except ConnectionError as ex:
-        logger.error('{}: {}'.format(type(ex), ex))
-        sys.exit(status=1)
+    :return: the dependencies data
+    """
+    return get_client().get_dependencies(end_ts, lookback)
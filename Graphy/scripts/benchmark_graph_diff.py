@@ -0,0 +1,115 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+
+Benchmarks the graph difference against the copy based implementation it replaced, on synthetic graphs.
+
+Usage: python scripts/benchmark_graph_diff.py [services] [edges per service] [changed fraction]
+"""
+import random
+import sys
+import time
+
+import networkx as nx
+
+from graphy.graph.graph_diff import GraphDiff
+
+
+def legacy_graphs_difference(first_graph: nx.MultiDiGraph, second_graph: nx.MultiDiGraph, graph_name: str = None):
+    """ The graph difference as implemented before GraphDiff. """
+    g_diff = nx.MultiDiGraph()
+    graph_1 = first_graph.copy()
+    graph_2 = second_graph.copy()
+
+    for n in graph_1.edges:
+        if n not in graph_2.edges:
+            edge_weight = graph_1.get_edge_data(n[0], n[1])[0].get('weight')
+            edge_weight = str(int(edge_weight) * -1)
+            g_diff.add_edge(n[0], n[1], weight=edge_weight)
+        else:
+            first_edge_weight = graph_1.get_edge_data(n[0], n[1])[0].get('weight')
+            second_edge_weight = graph_2.get_edge_data(n[0], n[1])[0].get('weight')
+            if first_edge_weight != second_edge_weight:
+                g_diff.add_edge(n[0], n[1], weight=second_edge_weight - first_edge_weight)
+            graph_2.remove_edge(n[0], n[1])
+
+    for n in graph_2.edges:
+        if n not in graph_1.edges:
+            edge_weight = graph_2.get_edge_data(n[0], n[1])[0].get('weight')
+            g_diff.add_edge(n[0], n[1], weight=edge_weight)
+
+    if graph_name is None:
+        graph_name = 'graph_{}_{}'.format(graph_1.name.split('_')[1], graph_2.name.split('_')[-1])
+    g_diff.name = graph_name
+
+    return g_diff
+
+
+def synthetic_graphs(services: int, edges_per_service: int, changed_fraction: float, seed: int = 0):
+    """
+    Generates two consecutive window graphs, the second with a fraction of the edges added, removed or reweighted.
+
+    :param services: The number of services.
+    :param edges_per_service: The number of out edges of each service.
+    :param changed_fraction: The fraction of the edges changed in the second graph.
+    :param seed: The random seed.
+    :return: The two graphs in NetworkX MultiDiGraph format.
+    """
+    rand = random.Random(seed)
+    service_names = ['service_{}'.format(number) for number in range(services)]
+
+    first_edges = dict()
+    for parent in service_names:
+        for child in rand.sample(service_names, edges_per_service):
+            first_edges[(parent, child)] = rand.randint(1, 1000)
+
+    second_edges = dict(first_edges)
+    for edge in rand.sample(list(first_edges), int(len(first_edges) * changed_fraction)):
+        change = rand.random()
+        if change < 1 / 3:
+            del second_edges[edge]
+        elif change < 2 / 3:
+            second_edges[edge] += rand.randint(1, 100)
+        else:
+            second_edges[(edge[0], rand.choice(service_names))] = rand.randint(1, 1000)
+
+    graphs = list()
+    for name, edges in (('0_60', first_edges), ('60_120', second_edges)):
+        graph = nx.MultiDiGraph(name=name)
+        graph.add_edges_from((parent, child, {'weight': weight}) for (parent, child), weight in edges.items())
+        graphs.append(graph)
+    return graphs
+
+
+def timed(func, *args, repeat: int = 3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(services: int = 10000, edges_per_service: int = 5, changed_fraction: float = 0.05):
+    first_graph, second_graph = synthetic_graphs(services, edges_per_service, changed_fraction)
+    print('{} services, {} and {} edges'.format(services, first_graph.number_of_edges(),
+                                                second_graph.number_of_edges()))
+
+    legacy_time, legacy_diff = timed(legacy_graphs_difference, first_graph, second_graph)
+    diff_time, graph_diff = timed(GraphDiff.from_graphs, first_graph, second_graph)
+    graph_time, _ = timed(lambda: GraphDiff.from_graphs(first_graph, second_graph).to_graph())
+
+    assert legacy_diff.number_of_edges() == len(graph_diff)
+
+    print('legacy graphs_difference:  {:.3f}s'.format(legacy_time))
+    print('GraphDiff.from_graphs:     {:.3f}s ({:.1f}x)'.format(diff_time, legacy_time / diff_time))
+    print('GraphDiff + to_graph:      {:.3f}s ({:.1f}x)'.format(graph_time, legacy_time / graph_time))
+    print('{} changed edges'.format(len(graph_diff)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4:
+        main(int(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3]))
+    else:
+        main()
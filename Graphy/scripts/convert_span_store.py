@@ -0,0 +1,28 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+
+Converts trace files into the columnar span store read by graphy.utils.span_store.SpanStore.
+
+Usage: python scripts/convert_span_store.py [trace files]
+  The TRACE_FILES of the configuration are converted by default, into SPAN_STORE_DIRECTORY.
+"""
+import sys
+
+from graphy.utils import config
+from graphy.utils import files as my_files
+from graphy.utils.span_store import SpanStore
+
+
+def main(trace_files: list):
+    if not trace_files:
+        graphy_config = config.get('GRAPHY')
+        trace_files = [my_files.get_absolute_path(trace_file, graphy_config.get('TRACE_FILE_FROM_PROJECT'))
+                       for trace_file in graphy_config.get('TRACE_FILES')]
+
+    store = SpanStore.convert(trace_files)
+    print('{} spans stored in {}'.format(len(store), store.directory))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,24 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+
+Copies the graphs stored one per window in ArangoDB (graph_<start>_<end> with a ServiceLinks_<start>_<end> edge
+collection) into the timeline layout: a single graph with one Services and one ServiceLinks collection.
+
+Usage: python scripts/migrate_arangodb_timeline.py [--delete]
+  --delete  deletes each window graph and its edge collection once copied.
+"""
+import sys
+
+from graphy.db.arangodb import ArangoDB
+
+
+def main(delete_window_graphs: bool = False):
+    arango_db = ArangoDB()
+    for db in (arango_db.graph_db, arango_db.graph_diff_db):
+        windows = arango_db.migrate_to_timeline(db, delete_window_graphs)
+        print('{}: {} windows migrated'.format(db, windows))
+
+
+if __name__ == '__main__':
+    main('--delete' in sys.argv[1:])
@@ -0,0 +1,181 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from unittest import TestCase
+
+from graphy.controller.window_pipeline import WindowPipeline
+from graphy.graph.graph_processor import GraphProcessor
+from graphy.models.trace_index import TraceIndex
+from graphy.models.window import WindowSnapshot
+from tests.models import span
+
+START_TIMESTAMP = 1530140000000
+END_TIMESTAMP = START_TIMESTAMP + 60 * 1000
+
+
+class StubSink(object):
+    """ Keeps the metrics sent, with the interface of graphy.db.opentsdb. """
+
+    def __init__(self):
+        self.metrics = list()
+
+    def send_numeric_metrics(self, metric_name, metrics, timestamp):
+        self.metrics.append((metric_name, metrics, timestamp))
+
+
+class TestWindowPipeline(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__traces = [[span('t1', 'a', 'api', timestamp=10, duration=100, status_code='200'),
+                          span('t1', 'b', 'nova', 'a', timestamp=20, duration=50, status_code='200')],
+                         [span('t2', 'c', 'nova', timestamp=30, duration=30, status_code='500')]]
+        self.__dependencies = [{'parent': 'api', 'child': 'nova', 'callCount': 1}]
+        self.__sink = StubSink()
+
+        self.__pipeline = WindowPipeline()
+
+        @self.__pipeline.register_window_metric
+        def service_degree(snapshot: WindowSnapshot):
+            degrees = dict(snapshot.graph.degree())
+            self.__sink.send_numeric_metrics('degree', degrees, snapshot.metric_timestamp)
+            return ['Degree', degrees]
+
+        @self.__pipeline.register_service_metric
+        def span_count(snapshot: WindowSnapshot, service_name):
+            spans = snapshot.trace_analysis().service_aggregates()[service_name]['spans']
+            self.__sink.send_numeric_metrics('spans', {service_name: spans}, snapshot.metric_timestamp)
+            return ['Spans of {}'.format(service_name), spans]
+
+        @self.__pipeline.register_service_metric
+        def status_codes(snapshot: WindowSnapshot, service_name):
+            return ['Status codes of {}'.format(service_name), snapshot.status_codes().counts(service_name)]
+
+        self.__metrics = service_degree, span_count, status_codes
+
+    def snapshot(self, dependencies=None, service_names=None) -> WindowSnapshot:
+        dependencies = self.__dependencies if dependencies is None else dependencies
+        return WindowSnapshot(START_TIMESTAMP, END_TIMESTAMP, dependencies, TraceIndex(self.__traces), service_names)
+
+    def test_register(self):
+        """ Test register_window_metric and register_service_metric functions. """
+        service_degree, span_count, status_codes = self.__metrics
+
+        self.assertEqual(self.__pipeline.window_metrics, [service_degree])
+        self.assertEqual(self.__pipeline.service_metrics, [span_count, status_codes])
+        self.assertIs(WindowPipeline().register_window_metric(service_degree), service_degree)
+
+    def test_run(self):
+        """ Test run function, the window metrics run once and the service metrics once per service, in order. """
+        snapshot = self.snapshot()
+
+        self.assertEqual(self.__pipeline.run(snapshot), [['Degree', {'api': 1, 'nova': 1}],
+                                                         ['Spans of api', 1],
+                                                         ['Status codes of api', {'2XX': 2}],
+                                                         ['Spans of nova', 2],
+                                                         ['Status codes of nova', {'2XX': 2, '5XX': 1}]])
+        self.assertEqual(self.__sink.metrics, [('degree', {'api': 1, 'nova': 1}, snapshot.metric_timestamp),
+                                               ('spans', {'api': 1}, snapshot.metric_timestamp),
+                                               ('spans', {'nova': 2}, snapshot.metric_timestamp)])
+
+    def test_run_without_dependencies(self):
+        """ Test run function, without dependencies the window metrics are skipped. """
+        messages = self.__pipeline.run(self.snapshot(dependencies=[], service_names=['nova']))
+
+        self.assertEqual(len(messages), 3)
+        self.assertTrue(messages[0][0].startswith('No services from'))
+        self.assertEqual(messages[1:], [['Spans of nova', 2], ['Status codes of nova', {'2XX': 2, '5XX': 1}]])
+        self.assertEqual(self.__sink.metrics, [('spans', {'nova': 2}, self.snapshot().metric_timestamp)])
+
+    def test_run_without_traces(self):
+        """ Test run function, the service metrics are skipped for a service without traces. """
+        messages = self.__pipeline.run(self.snapshot(service_names=['unknown']))
+
+        self.assertEqual(messages[0], ['Degree', {'api': 1, 'nova': 1}])
+        self.assertEqual(len(messages), 2)
+        self.assertTrue(messages[1][0].startswith('No traces found from'))
+        self.assertTrue(messages[1][0].endswith('for service unknown'))
+        self.assertEqual([metric_name for metric_name, _, _ in self.__sink.metrics], ['degree'])
+
+
+class TestWindowSnapshot(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__snapshot = WindowSnapshot(
+            START_TIMESTAMP, END_TIMESTAMP, [{'parent': 'api', 'child': 'nova', 'callCount': 1}],
+            TraceIndex([[span('t1', 'a', 'api', name='get', timestamp=10, duration=100, status_code='200'),
+                         span('t1', 'b', 'nova', 'a', timestamp=20, duration=50, status_code='404')],
+                        [span('t2', 'c', 'nova', timestamp=30, duration=30)]]))
+
+    def test_init(self):
+        """ Test the graph is built from the dependencies and the services are the ones of the traces. """
+        self.assertEqual(list(self.__snapshot.graph.edges()), [('api', 'nova')])
+        self.assertEqual(self.__snapshot.service_names, ['api', 'nova'])
+        self.assertEqual(self.__snapshot.metric_timestamp, START_TIMESTAMP + 30 * 1000)
+        self.assertEqual(len(self.__snapshot.traces('nova')), 2)
+
+    def test_graph_processor(self):
+        """ Test consecutive windows sharing an incremental GraphProcessor update the same graph in place. """
+        graph_processor = GraphProcessor(incremental=True)
+        first_snapshot = WindowSnapshot(START_TIMESTAMP, END_TIMESTAMP,
+                                        [{'parent': 'api', 'child': 'nova', 'callCount': 1}],
+                                        graph_processor=graph_processor)
+        first_graph = first_snapshot.graph.copy()
+        second_snapshot = WindowSnapshot(END_TIMESTAMP, END_TIMESTAMP + 60 * 1000,
+                                         [{'parent': 'api', 'child': 'nova', 'callCount': 3},
+                                          {'parent': 'nova', 'child': 'mysql', 'callCount': 1}],
+                                         graph_processor=graph_processor)
+
+        self.assertIs(second_snapshot.graph, first_snapshot.graph)
+        self.assertEqual(graph_processor.last_delta.added, {('nova', 'mysql'): 1})
+        self.assertEqual(graph_processor.last_delta.changed, {('api', 'nova'): 2})
+        self.assertEqual(list(first_graph.edges(data='weight')), [('api', 'nova', 1)])
+        self.assertEqual(sorted(second_snapshot.graph.edges(data='weight')), [('api', 'nova', 3), ('nova', 'mysql', 1)])
+
+    def test_span_trees(self):
+        """ Test span_trees function, each SpanTree is generated once and shared by the services of the trace. """
+        api_span_trees = self.__snapshot.span_trees('api')
+        nova_span_trees = self.__snapshot.span_trees('nova')
+        span_trees = self.__snapshot.span_trees()
+
+        self.assertEqual(len(api_span_trees), 1)
+        self.assertEqual(len(nova_span_trees), 2)
+        self.assertEqual(len(span_trees), 2)
+        self.assertIn(api_span_trees[0], nova_span_trees)
+        self.assertEqual({id(span_tree) for span_tree in span_trees},
+                         {id(span_tree) for span_tree in nova_span_trees})
+        for span_tree, cached_span_tree in zip(nova_span_trees, self.__snapshot.span_trees('nova')):
+            self.assertIs(span_tree, cached_span_tree)
+        self.assertEqual(sorted(span_tree.count_spans() for span_tree in span_trees), [1, 2])
+
+    def test_trace_analysis(self):
+        """ Test trace_analysis function, the analysis of each service is calculated once. """
+        trace_analysis = self.__snapshot.trace_analysis()
+
+        self.assertIs(self.__snapshot.trace_analysis(), trace_analysis)
+        self.assertIsNot(self.__snapshot.trace_analysis('api'), trace_analysis)
+        self.assertIs(self.__snapshot.trace_analysis('api'), self.__snapshot.trace_analysis('api'))
+        self.assertEqual({service_name: aggregates['spans'] for service_name, aggregates in
+                          trace_analysis.service_aggregates().items()}, {'api': 1, 'nova': 2})
+        self.assertEqual(self.__snapshot.trace_analysis('api').service_aggregates()['nova']['duration'], 50)
+
+    def test_status_codes(self):
+        """ Test status_codes function, the status codes of the traces of every service are counted once. """
+        status_codes = self.__snapshot.status_codes()
+
+        self.assertIs(self.__snapshot.status_codes(), status_codes)
+        self.assertEqual(status_codes.counts('api'), {'2XX': 1, '4XX': 1})
+        self.assertEqual(status_codes.counts('nova'), {'2XX': 1, '4XX': 1})
+        self.assertEqual(status_codes.counts('unknown'), dict())
+
+    def test_latency_sketches(self):
+        """ Test latency_sketches function, the sketches of every service are built once. """
+        latency_sketches = self.__snapshot.latency_sketches()
+
+        self.assertIs(self.__snapshot.latency_sketches(), latency_sketches)
+        self.assertEqual(latency_sketches.service_names, ['api', 'nova'])
+        self.assertEqual(latency_sketches.sketch('nova').count, 2)
+        self.assertEqual(latency_sketches.sketch('nova').max, 50)
+        self.assertEqual(latency_sketches.sketch('api', 'get').sum, 100)
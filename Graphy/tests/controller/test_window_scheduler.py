@@ -0,0 +1,62 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import os
+import threading
+import time
+from unittest import TestCase
+
+from graphy.controller.window_scheduler import WindowScheduler
+
+WINDOWS = [(start, start + 10) for start in range(0, 60, 10)]
+
+
+def slow_window(start, end):
+    """ Processes a window, the first windows being the slowest so they are the last to finish. """
+    time.sleep((WINDOWS[-1][0] - start) / 1000)
+    return start, end, os.getpid(), threading.get_ident()
+
+
+class TestWindowScheduler(TestCase):
+
+    def test_map_sequential(self):
+        """ Test map function, with one worker the windows are processed one at a time in the caller thread. """
+        calls = list()
+
+        def window(start, end):
+            calls.append(start)
+            return slow_window(start, end)
+
+        results = WindowScheduler(workers=1).map(window, WINDOWS)
+        self.assertEqual(calls, [])
+
+        results = list(results)
+        self.assertEqual(calls, [start for start, _ in WINDOWS])
+        self.assertEqual([(start, end) for start, end, _, _ in results], WINDOWS)
+        self.assertEqual({(pid, thread) for _, _, pid, thread in results}, {(os.getpid(), threading.get_ident())})
+
+    def test_map_thread(self):
+        """ Test map function, with a thread pool the results are in the order of the windows. """
+        results = list(WindowScheduler(workers=3, executor='thread').map(slow_window, WINDOWS))
+
+        self.assertEqual([(start, end) for start, end, _, _ in results], WINDOWS)
+        self.assertEqual({pid for _, _, pid, _ in results}, {os.getpid()})
+        self.assertNotIn(threading.get_ident(), {thread for _, _, _, thread in results})
+
+    def test_map_process(self):
+        """ Test map function, with a process pool the results are in the order of the windows. """
+        results = list(WindowScheduler(workers=3, executor='process').map(slow_window, WINDOWS))
+
+        self.assertEqual([(start, end) for start, end, _, _ in results], WINDOWS)
+        self.assertNotIn(os.getpid(), {pid for _, _, pid, _ in results})
+
+    def test_map_empty(self):
+        """ Test map function, with no windows. """
+        self.assertEqual(list(WindowScheduler(workers=3).map(slow_window, [])), [])
+
+    def test_init(self):
+        """ Test the number of workers is at least 1 and the executor is validated. """
+        self.assertEqual(WindowScheduler(workers=0).workers, 1)
+        with self.assertRaises(ValueError):
+            WindowScheduler(executor='unknown')
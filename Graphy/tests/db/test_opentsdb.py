@@ -2,15 +2,50 @@
     Author: André Bento
     Date last modified: 04-03-2019
 """
+import os
+import threading
 import time
 from unittest import TestCase
 
 from graphy.db import opentsdb
+from graphy.db.opentsdb import MetricsWriter
 from graphy.utils import config as my_config
 
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
 TIME_WAIT = 3
 
 
+class StubResponse(object):
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.text = ''
+
+
+class StubSession(object):
+    """ Records the batches posted by a MetricsWriter, or raises error on every post. """
+
+    def __init__(self, status_code: int = 204, error: Exception = None):
+        self.status_code = status_code
+        self.error = error
+        self.batches = list()
+        self.closed = False
+        self.posted = threading.Event()
+
+    def post(self, url, data=None, headers=None):
+        if self.error is not None:
+            raise self.error
+        self.batches.append(json.loads(data))
+        self.posted.set()
+        return StubResponse(self.status_code)
+
+    def close(self):
+        self.closed = True
+
+
 class TestOpenTSDB(TestCase):
 
     def setUp(self) -> None:
@@ -99,3 +134,83 @@ class TestOpenTSDB(TestCase):
         self.assertTrue(opentsdb.send_numeric_metric([self.__metric_name], 100, 1546304400))  # 2019.1.1 01:00:00
 
         time.sleep(TIME_WAIT)
+
+
+class TestMetricsWriter(TestCase):
+
+    def test_flush_size(self):
+        """ Test a batch is sent when it reaches flush_size points. """
+        session = StubSession()
+        writer = MetricsWriter(flush_size=3, flush_interval=60, session=session, tags={})
+        for value in range(3):
+            writer.put('metric', value, 1546304400)
+
+        self.assertTrue(session.posted.wait(5))
+        self.assertEqual([[point['value'] for point in batch] for batch in session.batches], [[0, 1, 2]])
+        writer.close()
+
+    def test_flush_interval(self):
+        """ Test a batch is sent flush_interval seconds after its first point. """
+        session = StubSession()
+        writer = MetricsWriter(flush_size=100, flush_interval=0.1, session=session, tags={'host': 'test'})
+        writer.put('metric', '1.5', 1546304400, {'service': 'api'})
+
+        self.assertTrue(session.posted.wait(5))
+        self.assertEqual(session.batches, [[{'metric': 'metric', 'timestamp': 1546304400, 'value': 1.5,
+                                             'tags': {'host': 'test', 'service': 'api'}}]])
+        writer.close()
+
+    def test_flush(self):
+        """ Test flush sends the buffered points and waits for them. """
+        session = StubSession()
+        writer = MetricsWriter(flush_size=100, flush_interval=60, session=session, tags={})
+        writer.put('metric', 1, 1546304400)
+        writer.put('metric', 2, 1546304400)
+        writer.flush()
+
+        self.assertEqual(writer.sent_points, 2)
+        self.assertEqual(len(session.batches), 1)
+        writer.close()
+
+    def test_close(self):
+        """ Test close sends the buffered points and stops the writer. """
+        session = StubSession()
+        writer = MetricsWriter(flush_size=100, flush_interval=60, session=session, tags={})
+        writer.put('metric', 1, 1546304400)
+        writer.close()
+
+        self.assertEqual(writer.sent_points, 1)
+        self.assertTrue(session.closed)
+        self.assertRaises(RuntimeError, writer.put, 'metric', 2, 1546304400)
+        writer.flush()  # Returns at once, the writer is closed.
+
+    def test_send_errors(self):
+        """ Test failed batches are counted and do not stop the writer. """
+        session = StubSession(error=ValueError('unexpected'))
+        writer = MetricsWriter(flush_size=100, flush_interval=60, session=session, tags={})
+        writer.put('metric', 1, 1546304400)
+        writer.flush()
+        self.assertEqual(writer.failed_points, 1)
+
+        session.error = None
+        session.status_code = 400
+        writer.put('metric', 2, 1546304400)
+        writer.flush()
+        self.assertEqual((writer.sent_points, writer.failed_points), (0, 2))
+        writer.close()
+
+    def test_get_writer_after_fork(self):
+        """ Test a process other than the one that created the default writer gets a new writer. """
+        writer, writer_pid = opentsdb.writer, opentsdb.writer_pid
+        try:
+            first_writer = opentsdb.get_writer()
+            self.assertIs(opentsdb.get_writer(), first_writer)
+
+            opentsdb.writer_pid = os.getpid() + 1  # As seen from a forked worker.
+            second_writer = opentsdb.get_writer()
+            self.assertIsNot(second_writer, first_writer)
+            self.assertEqual(opentsdb.writer_pid, os.getpid())
+            first_writer.close()
+            second_writer.close()
+        finally:
+            opentsdb.writer, opentsdb.writer_pid = writer, writer_pid
@@ -0,0 +1,4 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
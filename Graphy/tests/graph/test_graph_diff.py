@@ -0,0 +1,54 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from unittest import TestCase
+
+import networkx as nx
+
+from graphy.graph.graph_diff import GraphDiff, edge_weights
+
+
+def graph(name, edges):
+    graph_obj = nx.MultiDiGraph(name=name)
+    graph_obj.add_edges_from((parent, child, {'weight': weight}) for parent, child, weight in edges)
+    return graph_obj
+
+
+class TestGraphDiff(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__first_graph = graph('0_10', [('api', 'nova', 3), ('nova', 'db', 2), ('api', 'glance', 1)])
+        self.__second_graph = graph('10_20', [('api', 'nova', 5), ('api', 'keystone', 1), ('api', 'glance', 1)])
+
+    def test_edge_weights(self):
+        """ Test edge_weights function. """
+        self.assertEqual(edge_weights(graph('0_10', [('api', 'nova', 3), ('api', 'nova', 2)])), {('api', 'nova'): 5})
+
+    def test_from_graphs(self):
+        """ Test from_graphs function. """
+        graph_diff = GraphDiff.from_graphs(self.__first_graph, self.__second_graph)
+
+        self.assertEqual(graph_diff.name, 'graph_10_20')
+        self.assertEqual(graph_diff.added, {('api', 'keystone'): 1})
+        self.assertEqual(graph_diff.removed, {('nova', 'db'): -2})
+        self.assertEqual(graph_diff.changed, {('api', 'nova'): 2})
+        self.assertEqual(len(graph_diff), 3)
+        self.assertEqual(graph_diff.nodes, {'api', 'nova', 'db', 'keystone'})
+
+    def test_edges(self):
+        """ Test edges function and the iteration as node links. """
+        graph_diff = GraphDiff.from_graphs(self.__first_graph, self.__second_graph)
+
+        self.assertEqual(sorted((parent, child, data['weight']) for parent, child, data in graph_diff),
+                         [('api', 'keystone', 1), ('api', 'nova', 2), ('nova', 'db', -2)])
+        self.assertEqual(graph_diff.edges(), list(graph_diff))
+
+    def test_to_graph(self):
+        """ Test to_graph function. """
+        graph_obj = GraphDiff.from_graphs(self.__first_graph, self.__second_graph).to_graph()
+
+        self.assertEqual(graph_obj.name, 'graph_10_20')
+        self.assertEqual(graph_obj.number_of_edges(), 3)
+        self.assertEqual(graph_obj['nova']['db'][0]['weight'], -2)
@@ -0,0 +1,94 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import random
+from unittest import TestCase
+
+from graphy.graph.graph_processor import GraphProcessor
+
+
+def dependency(parent, child, call_count):
+    return {'parent': parent, 'child': child, 'callCount': call_count}
+
+
+def edges(graph):
+    return sorted((parent, child, data['weight']) for parent, child, data in graph.edges(data=True))
+
+
+class TestGraphProcessor(TestCase):
+
+    def test_generate_graph_from_zipkin(self):
+        """ Test generate_graph_from_zipkin function. """
+        graph_processor = GraphProcessor()
+        graph = graph_processor.generate_graph_from_zipkin([dependency('api', 'nova', 3)], 0, 10)
+
+        self.assertEqual(edges(graph), [('api', 'nova', 3)])
+        self.assertEqual(graph_processor.edge_weights, {('api', 'nova'): 3})
+        self.assertIsNone(graph_processor.last_delta)
+
+        # The same window is memoized.
+        graph = graph_processor.generate_graph_from_zipkin([dependency('api', 'keystone', 1)], 0, 10)
+        self.assertEqual(edges(graph), [('api', 'nova', 3)])
+
+        graph = graph_processor.generate_graph_from_zipkin([dependency('api', 'keystone', 1)], 10, 20)
+        self.assertEqual(edges(graph), [('api', 'keystone', 1)])
+
+    def test_generate_graph_from_zipkin_incremental(self):
+        """ Test generate_graph_from_zipkin function in incremental mode. """
+        graph_processor = GraphProcessor(incremental=True)
+        graph = graph_processor.generate_graph_from_zipkin([dependency('api', 'nova', 3), dependency('nova', 'db', 2)],
+                                                           0, 10)
+        graph = graph_processor.generate_graph_from_zipkin([dependency('api', 'nova', 5),
+                                                            dependency('api', 'keystone', 1)], 10, 20)
+
+        self.assertEqual(edges(graph), [('api', 'keystone', 1), ('api', 'nova', 5)])
+        self.assertEqual(sorted(graph.nodes), ['api', 'keystone', 'nova'])
+        self.assertEqual(graph_processor.last_delta.added, {('api', 'keystone'): 1})
+        self.assertEqual(graph_processor.last_delta.removed, {('nova', 'db'): -2})
+        self.assertEqual(graph_processor.last_delta.changed, {('api', 'nova'): 2})
+
+    def test_generate_graph_from_zipkin_duplicate_dependencies(self):
+        """ Test dependencies repeating a (parent, child) pair are one edge with the summed call count. """
+        dependencies = [dependency('api', 'nova', 3), dependency('api', 'nova', 2), dependency('nova', 'db', 1)]
+        graph = GraphProcessor().generate_graph_from_zipkin(dependencies, 0, 10)
+
+        self.assertEqual(edges(graph), [('api', 'nova', 5), ('nova', 'db', 1)])
+
+        graph_processor = GraphProcessor(incremental=True)
+        graph_processor.generate_graph_from_zipkin([dependency('api', 'nova', 1)], 0, 10)
+        incremental_graph = graph_processor.generate_graph_from_zipkin(dependencies, 10, 20)
+        self.assertEqual(edges(incremental_graph), edges(graph))
+
+        incremental_graph = graph_processor.generate_graph_from_zipkin([dependency('nova', 'db', 1)], 20, 30)
+        self.assertEqual(edges(incremental_graph), [('nova', 'db', 1)])
+
+    def test_generate_graph_from_zipkin_incremental_random_windows(self):
+        """ Test the incremental graphs are the same as the rebuilt ones, with repeated dependencies. """
+        rand = random.Random(3)
+        services = ['s{}'.format(number) for number in range(15)]
+        incremental_graph_processor = GraphProcessor(incremental=True)
+
+        for window in range(30):
+            pairs = [(rand.choice(services), rand.choice(services)) for _ in range(rand.randint(0, 40))]
+            dependencies = [dependency(parent, child, rand.randint(1, 4)) for parent, child in pairs]
+
+            graph = GraphProcessor().generate_graph_from_zipkin(dependencies, window, window + 1)
+            incremental_graph = incremental_graph_processor.generate_graph_from_zipkin(dependencies, window, window + 1)
+
+            self.assertEqual(edges(incremental_graph), edges(graph))
+            self.assertEqual(sorted(incremental_graph.nodes), sorted(graph.nodes))
+
+    def test_graphs_difference(self):
+        """ Test graphs_difference function. """
+        first_graph = GraphProcessor().generate_graph_from_zipkin([dependency('api', 'nova', 3),
+                                                                   dependency('nova', 'db', 2)], 0, 10)
+        first_graph.name = '0_10'
+        second_graph = GraphProcessor().generate_graph_from_zipkin([dependency('api', 'nova', 5),
+                                                                    dependency('api', 'keystone', 1)], 10, 20)
+        second_graph.name = '10_20'
+
+        graph_diff = GraphProcessor.graphs_difference(first_graph, second_graph)
+
+        self.assertEqual(graph_diff.name, 'graph_10_20')
+        self.assertEqual(edges(graph_diff), [('api', 'keystone', 1), ('api', 'nova', 2), ('nova', 'db', -2)])
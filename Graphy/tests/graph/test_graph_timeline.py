@@ -0,0 +1,90 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import random
+from unittest import TestCase
+
+import networkx as nx
+
+from graphy.graph.graph_diff import GraphDiff
+from graphy.graph.graph_timeline import GraphTimeline
+
+
+def random_windows(count, seed=5):
+    """ Generates the edge weights of consecutive windows, each one a few changes away from the previous. """
+    rand = random.Random(seed)
+    services = ['s{}'.format(number) for number in range(10)]
+    edge_weights = dict()
+    windows = list()
+    for _ in range(count):
+        for _ in range(rand.randint(0, 6)):
+            edge = (rand.choice(services), rand.choice(services))
+            if edge in edge_weights and rand.random() < 0.4:
+                del edge_weights[edge]
+            else:
+                edge_weights[edge] = rand.randint(1, 50)
+        windows.append(dict(edge_weights))
+    return windows
+
+
+class TestGraphTimeline(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__windows = random_windows(40)
+
+    def test_edge_weights(self):
+        """ Test every window is rebuilt from the checkpoints and deltas. """
+        timeline = GraphTimeline(checkpoint_interval=7, cache_size=3, retention=100)
+        for number, edge_weights in enumerate(self.__windows):
+            self.assertTrue(timeline.append(number * 10, number * 10 + 10, edge_weights))
+
+        self.assertEqual(len(timeline), 40)
+        self.assertEqual(timeline.checkpoint_count, 6)
+        self.assertLessEqual(timeline.cached_count, 3)
+        for number in random.Random(1).sample(range(40), 40):
+            self.assertEqual(timeline.edge_weights(number * 10, number * 10 + 10), self.__windows[number])
+
+    def test_append(self):
+        """ Test append function. """
+        timeline = GraphTimeline()
+        graph = nx.MultiDiGraph()
+        graph.add_edge('api', 'nova', weight=3)
+
+        self.assertTrue(timeline.append(0, 10, graph))
+        self.assertFalse(timeline.append(0, 10, graph))
+        self.assertTrue(timeline.append(10, 20, {('api', 'nova'): 4}))
+        self.assertRaises(ValueError, timeline.append, 5, 15, graph)
+        self.assertEqual(timeline.windows, [(0, 10), (10, 20)])
+        self.assertEqual(timeline.previous(10, 20), (0, 10))
+        self.assertIsNone(timeline.previous(0, 10))
+        self.assertRaises(KeyError, timeline.graph, 20, 30)
+
+    def test_graph_and_diff(self):
+        """ Test graph and diff functions. """
+        timeline = GraphTimeline(checkpoint_interval=4)
+        for number, edge_weights in enumerate(self.__windows):
+            timeline.append(number * 10, number * 10 + 10, edge_weights)
+
+        graph = timeline.graph(50, 60)
+        self.assertEqual(graph.name, '50_60')
+        self.assertEqual({(parent, child): weight for parent, child, weight in graph.edges(data='weight')},
+                         self.__windows[5])
+
+        graph_diff = timeline.diff((50, 60), (330, 340))
+        expected_graph_diff = GraphDiff.from_edge_weights(self.__windows[5], self.__windows[33])
+        self.assertEqual(graph_diff.name, 'graph_60_340')
+        self.assertEqual((graph_diff.added, graph_diff.removed, graph_diff.changed),
+                         (expected_graph_diff.added, expected_graph_diff.removed, expected_graph_diff.changed))
+
+    def test_retention(self):
+        """ Test the oldest windows are dropped and the timeline compacted. """
+        timeline = GraphTimeline(checkpoint_interval=10, cache_size=2, retention=15)
+        for number, edge_weights in enumerate(self.__windows):
+            timeline.append(number * 10, number * 10 + 10, edge_weights)
+
+        self.assertEqual(len(timeline), 15)
+        self.assertEqual(timeline.windows[0], (250, 260))
+        for number in range(25, 40):
+            self.assertEqual(timeline.edge_weights(number * 10, number * 10 + 10), self.__windows[number])
@@ -0,0 +1,41 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+
+
+def span(trace_id: str, span_id: str, service_name: str = None, parent_id: str = None, kind: str = None,
+         name: str = None, timestamp: int = None, duration: int = None, remote_service_name: str = None,
+         status_code: str = None, error: bool = False) -> dict:
+    """
+    Builds a span in Zipkin v2 format for the tests, with only the fields given.
+
+    :param trace_id: The trace id.
+    :param span_id: The span id.
+    :param service_name: The service name of the local endpoint.
+    :param parent_id: The parent span id.
+    :param kind: The span kind, e.g. 'CLIENT' or 'SERVER'.
+    :param name: The span name.
+    :param timestamp: The timestamp, in microseconds.
+    :param duration: The duration, in microseconds.
+    :param remote_service_name: The service name of the remote endpoint.
+    :param status_code: The http.status_code tag.
+    :param error: True to tag the span as an error.
+    :return: The span.
+    """
+    span_data = {'traceId': trace_id, 'id': span_id}
+    fields = {'parentId': parent_id, 'kind': kind, 'name': name, 'timestamp': timestamp, 'duration': duration}
+    span_data.update((key, value) for key, value in fields.items() if value is not None)
+    if service_name:
+        span_data['localEndpoint'] = {'serviceName': service_name}
+    if remote_service_name:
+        span_data['remoteEndpoint'] = {'serviceName': remote_service_name}
+
+    tags = dict()
+    if status_code is not None:
+        tags['http.status_code'] = status_code
+    if error:
+        tags['error'] = 'true'
+    if tags:
+        span_data['tags'] = tags
+    return span_data
@@ -0,0 +1,69 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import pickle
+from unittest import TestCase
+
+from graphy.graph.graph_processor import GraphProcessor
+from graphy.models.dependency_linker import DependencyLinker
+from tests.models import span
+
+
+class TestDependencyLinker(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__trace_1 = [span('t1', 'a', 'api', kind='SERVER'),
+                          span('t1', 'b', 'api', 'a', 'CLIENT'),
+                          span('t1', 'b', 'nova', 'a', 'SERVER', error=True),
+                          span('t1', 'c', 'nova', 'b', 'SERVER'),
+                          span('t1', 'd', 'nova', 'c', 'CLIENT', remote_service_name='mysql'),
+                          span('t1', 'e', 'nova', 'c', 'CLIENT')]
+        self.__trace_2 = [span('t2', 'a', 'api', kind='SERVER'),
+                          span('t2', 'b', 'nova', 'a', 'SERVER', remote_service_name='api')]
+        self.__dependencies = [{'parent': 'api', 'child': 'nova', 'callCount': 2, 'errorCount': 1},
+                               {'parent': 'nova', 'child': 'mysql', 'callCount': 1},
+                               {'parent': 'nova', 'child': 'nova', 'callCount': 1}]
+
+    def test_link(self):
+        """ Test link function. """
+        self.assertEqual(DependencyLinker().add_traces([self.__trace_1, self.__trace_2]).link(), self.__dependencies)
+        self.assertEqual(DependencyLinker().link(), [])
+
+    def test_link_client_with_server_child(self):
+        """ Test a call recorded by a CLIENT span and a SERVER child span is linked once. """
+        trace = [span('t1', 'a', 'api', kind='CLIENT', remote_service_name='nova'),
+                 span('t1', 'b', 'nova', 'a', 'SERVER')]
+
+        self.assertEqual(DependencyLinker().add_trace(trace).link(),
+                         [{'parent': 'api', 'child': 'nova', 'callCount': 1}])
+
+    def test_add_spans(self):
+        """ Test add_spans function, with the spans of the traces interleaved and in reverse order. """
+        spans = [span_data for pair in zip(reversed(self.__trace_1), reversed(self.__trace_2)) for span_data in pair]
+        spans += self.__trace_1[:len(self.__trace_1) - len(self.__trace_2)]
+
+        linker = DependencyLinker().add_spans(spans)
+        self.assertEqual(linker.pending_traces, 2)
+        self.assertEqual(linker.link(), self.__dependencies)
+        self.assertEqual(linker.pending_traces, 0)
+
+    def test_merge(self):
+        """ Test merge function, with the spans of a trace split between shards. """
+        shards = [DependencyLinker().add_spans(self.__trace_1[:3]),
+                  DependencyLinker().add_spans(self.__trace_1[3:]).add_trace(self.__trace_2)]
+        shards = [pickle.loads(pickle.dumps(shard)) for shard in shards]  # As returned by a worker process.
+
+        linker = DependencyLinker()
+        for shard in shards:
+            linker.merge(shard)
+        self.assertEqual(linker.link(), self.__dependencies)
+
+    def test_generate_graph(self):
+        """ Test the links are the input of GraphProcessor generate_graph_from_zipkin function. """
+        dependencies = DependencyLinker().add_traces([self.__trace_1, self.__trace_2]).link()
+        graph = GraphProcessor().generate_graph_from_zipkin(dependencies, 0, 60)
+
+        self.assertEqual(graph.get_edge_data('api', 'nova')[0]['weight'], 2)
+        self.assertEqual(graph.number_of_edges(), 3)
@@ -0,0 +1,134 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import pickle
+from unittest import TestCase
+
+import numpy as np
+
+from graphy.models import span as my_span
+from graphy.models.latency_sketch import LatencySketch, LatencySketches, QUANTILES
+from tests.models import span
+
+
+class TestLatencySketch(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__values = np.random.RandomState(7).lognormal(mean=8, sigma=1.5, size=20000)
+
+    def assertQuantiles(self, sketch: LatencySketch, values: np.ndarray):
+        for name, quantile in QUANTILES.items():
+            expected = np.quantile(values, quantile, method='lower')
+            self.assertLessEqual(abs(sketch.quantile(quantile) - expected), expected * sketch.relative_accuracy * 1.01,
+                                 name)
+
+    def test_quantiles(self):
+        """ Test the quantiles are within the relative accuracy. """
+        sketch = LatencySketch()
+        for value in self.__values.tolist():
+            sketch.add(value)
+
+        self.assertQuantiles(sketch, self.__values)
+        self.assertEqual(len(self.__values), sketch.count)
+        self.assertAlmostEqual(self.__values.mean(), sketch.avg)
+        self.assertEqual(self.__values.min(), sketch.min)
+        self.assertEqual(self.__values.max(), sketch.max)
+        self.assertEqual(sketch.max, sketch.quantile(1))
+        self.assertEqual(set(QUANTILES), set(sketch.quantiles()))
+
+    def test_add_values(self):
+        """ Test add_values matches adding the values one by one. """
+        sketch = LatencySketch()
+        for value in self.__values.tolist():
+            sketch.add(value)
+        values_sketch = LatencySketch().add_values(self.__values)
+
+        self.assertEqual(sketch.quantiles(), values_sketch.quantiles())
+        self.assertEqual(sketch.count, values_sketch.count)
+
+    def test_zeros(self):
+        """ Test zero and negative values. """
+        sketch = LatencySketch().add_values([0, 0, -5, 10])
+
+        self.assertEqual(0, sketch.quantile(0.5))
+        self.assertAlmostEqual(10, sketch.quantile(1))
+        self.assertEqual(0, sketch.min)
+        self.assertEqual(2.5, sketch.avg)
+
+    def test_empty(self):
+        """ Test an empty sketch. """
+        sketch = LatencySketch()
+
+        self.assertIsNone(sketch.quantile(0.5))
+        self.assertEqual(dict(), sketch.quantiles())
+        self.assertEqual(-1, sketch.avg)
+        self.assertRaises(ValueError, sketch.quantile, 2)
+        self.assertRaises(ValueError, LatencySketch, 0)
+
+    def test_max_bins(self):
+        """ Test the bins are bounded and only the lowest quantiles lose accuracy. """
+        sketch = LatencySketch(max_bins=300).add_values(self.__values)
+        values = np.sort(self.__values)
+
+        self.assertLessEqual(len(pickle.dumps(sketch)), len(pickle.dumps(LatencySketch().add_values(self.__values))))
+        for quantile in (0.9, 0.99, 0.999):
+            expected = np.quantile(values, quantile, method='lower')
+            self.assertLessEqual(abs(sketch.quantile(quantile) - expected), expected * 0.0101)
+
+    def test_merge(self):
+        """ Test merge of sketches of different workers, after a pickle round trip. """
+        sketch = LatencySketch().add_values(self.__values[:5000])
+        other = pickle.loads(pickle.dumps(LatencySketch().add_values(self.__values[5000:])))
+        sketch.merge(other).merge(LatencySketch())
+
+        self.assertEqual(LatencySketch().add_values(self.__values).quantiles(), sketch.quantiles())
+        self.assertEqual(len(self.__values), sketch.count)
+        self.assertRaises(ValueError, sketch.merge, LatencySketch(0.05))
+
+    def test_merge_collapsed(self):
+        """ Test merge of collapsed sketches keeps the high quantiles accuracy. """
+        sketch = LatencySketch(max_bins=300).add_values(self.__values[:5000])
+        sketch.merge(LatencySketch(max_bins=300).add_values(self.__values[5000:]))
+
+        expected = np.quantile(self.__values, 0.99, method='lower')
+        self.assertLessEqual(abs(sketch.quantile(0.99) - expected), expected * 0.0101)
+
+
+class TestLatencySketches(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__spans = [span('t1', 'a', 'api', name='get /', duration=100),
+                        span('t1', 'b', 'api', name='get /', duration=200),
+                        span('t1', 'c', 'api', name='post /', duration=1000),
+                        span('t1', 'd', 'nova', name='boot', duration=5000),
+                        span('t1', 'x', duration=10)]
+
+    def test_add_spans(self):
+        """ Test the sketches of each endpoint of each service. """
+        sketches = LatencySketches().add_spans(self.__spans)
+
+        self.assertEqual(['api', 'nova'], sketches.service_names)
+        self.assertEqual(['get /', 'post /'], sketches.endpoints('api'))
+        self.assertEqual(2, sketches.sketch('api', 'get /').count)
+        self.assertEqual(3, sketches.sketch('api').count)
+        self.assertAlmostEqual(1000, sketches.sketch('api').quantile(1))
+        self.assertEqual(0, sketches.sketch('api', 'unknown').count)
+
+    def test_add_records(self):
+        """ Test add_records matches add_spans. """
+        sketches = LatencySketches().add_records(my_span.to_record(trace_span) for trace_span in self.__spans)
+
+        self.assertEqual(LatencySketches().add_spans(self.__spans).sketch('api').quantiles(),
+                         sketches.sketch('api').quantiles())
+
+    def test_merge(self):
+        """ Test merge of the sketches of different windows. """
+        sketches = LatencySketches().add_traces([self.__spans[:2]])
+        sketches.merge(pickle.loads(pickle.dumps(LatencySketches().add_traces([self.__spans[2:]]))))
+
+        self.assertEqual(LatencySketches().add_spans(self.__spans).sketch('api').quantiles(),
+                         sketches.sketch('api').quantiles())
+        self.assertEqual(['api', 'nova'], sketches.service_names)
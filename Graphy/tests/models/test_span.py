@@ -0,0 +1,96 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import copy
+import json
+import os
+import random
+from unittest import TestCase
+
+import numpy as np
+
+from graphy.models import span as my_span
+from graphy.utils import dict as my_dict
+from graphy.utils import files as my_files
+
+
+def padded_timestamp(timestamp):
+    """ The text padding fix_timestamp replaced, the reference of its results. """
+    default_timestamp_len = 16
+    if len(str(timestamp)) < default_timestamp_len:
+        miss_len = default_timestamp_len - len(str(timestamp))
+        timestamp = str(timestamp) + ''.join(['0' for _ in range(miss_len)])
+        return int(timestamp)
+    return timestamp
+
+
+class TestSpan(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        rand = random.Random(0)
+        self.__timestamps = [0, 1, -1, 9, 10, -10, 1530138186882, 1530138186882049, 10 ** 15 - 1, 10 ** 15,
+                             -10 ** 14, 10 ** 18]
+        self.__timestamps += [rand.randrange(10 ** (length - 1), 10 ** length) * rand.choice((1, -1))
+                              for length in range(1, 19) for _ in range(20)]
+
+    def test_fix_timestamp(self):
+        """ Test fix_timestamp function gives the results of padding the timestamps as text. """
+        for timestamp in self.__timestamps + ['1530138186882', '1530138186882049']:
+            self.assertEqual(my_span.fix_timestamp(timestamp), padded_timestamp(timestamp), timestamp)
+
+    def test_fix_timestamp_array(self):
+        """ Test fix_timestamp_array function gives the results of padding the timestamps as text. """
+        fixed_timestamps = my_span.fix_timestamp_array(np.array(self.__timestamps, dtype=np.int64))
+        self.assertEqual(fixed_timestamps.tolist(), [padded_timestamp(timestamp) for timestamp in self.__timestamps])
+
+    def test_fix_timestamps(self):
+        """ Test fix_timestamps function gives the results of padding every timestamp field as text. """
+        with open(os.path.join(my_files.DATA_PROJECT_DIRECTORY, '28_06_simplified_100_spans.jsonl')) as f:
+            spans = [json.loads(line) for line in f]
+        spans.append({'id': 's1', 'timestamp': '1530138186882', 'annotations': [{'value': 'retried'}]})
+
+        expected_spans = copy.deepcopy(spans)
+        for span_data in expected_spans:
+            my_dict.update(span_data, 'timestamp', padded_timestamp)
+
+        for batch_size in (len(spans), 1):  # Vectorized and one span at a time.
+            fixed_spans = copy.deepcopy(spans)
+            for position in range(0, len(fixed_spans), batch_size):
+                my_span.fix_timestamps(fixed_spans[position:position + batch_size])
+            self.assertEqual(fixed_spans, expected_spans)
+
+    def test_to_v2(self):
+        """ Test to_v2 function. """
+        api = {'serviceName': 'api'}
+        nova = {'serviceName': 'nova'}
+        span_data = {'traceId': 't1', 'id': 's2', 'parentId': 's1', 'name': 'get', 'timestamp': 1530138186940,
+                     'annotations': [{'timestamp': 1530138186940100, 'value': 'cs', 'endpoint': api},
+                                     {'timestamp': 1530138186940200, 'value': 'sr', 'endpoint': nova},
+                                     {'timestamp': 1530138186940800, 'value': 'ss', 'endpoint': nova},
+                                     {'timestamp': 1530138186941000, 'value': 'cr', 'endpoint': api},
+                                     {'timestamp': 1530138186940500, 'value': 'retried'}],
+                     'binaryAnnotations': [{'key': 'http.status_code', 'value': 500}]}
+
+        client_span, server_span = my_span.to_v2(span_data)
+
+        self.assertEqual(client_span, {'traceId': 't1', 'id': 's2', 'parentId': 's1', 'name': 'get', 'kind': 'CLIENT',
+                                       'timestamp': 1530138186940100, 'duration': 900, 'localEndpoint': api,
+                                       'remoteEndpoint': nova, 'tags': {'http.status_code': '500'},
+                                       'annotations': [{'timestamp': 1530138186940500, 'value': 'retried'}]})
+        self.assertEqual(server_span['kind'], 'SERVER')
+        self.assertEqual(server_span['duration'], 600)
+        self.assertTrue(server_span['shared'])
+        self.assertEqual(my_span.get_status_code(server_span), '500')
+
+    def test_to_v2_without_core_annotations(self):
+        """ Test to_v2 function with spans without client or server annotations, or already in v2 format. """
+        span_data = {'traceId': 't1', 'id': 's1', 'timestamp': 1530138186940, 'duration': 10,
+                     'binaryAnnotations': {'http.status_code': '200'}}
+
+        self.assertEqual(my_span.to_v2(span_data), [{'traceId': 't1', 'id': 's1', 'timestamp': 1530138186940000,
+                                                     'duration': 10, 'tags': {'http.status_code': '200'}}])
+
+        v2_span = {'traceId': 't1', 'id': 's1', 'kind': 'SERVER', 'timestamp': 1530138186940000}
+        self.assertEqual(my_span.to_v2(v2_span), [v2_span])
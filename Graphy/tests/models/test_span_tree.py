@@ -0,0 +1,50 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from unittest import TestCase
+
+from graphy.models.span_tree import SpanTree
+from tests.models import span
+
+
+class TestSpanTree(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        # Children arrive before their parents and 's2' is shared by a client and a server span.
+        self.__trace = [span('t1', 's4', parent_id='s2', duration=10), span('t1', 's2', parent_id='s1', duration=40),
+                        span('t1', 's3', parent_id='s1', duration=20), span('t1', 's1', duration=100),
+                        span('t1', 's2', parent_id='s1', duration=30),
+                        span('t1', 's5', parent_id='missing', duration=5), span('t1', 's6', parent_id='s5', duration=1)]
+
+        self.__span_tree = SpanTree()
+        self.__span_tree.generate_span_tree(self.__trace)
+
+    def test_generate_span_tree(self):
+        """ Test generate_span_tree function. """
+        self.assertEqual(self.__span_tree.trace_id, 't1')
+        self.assertEqual([span_obj.id for span_obj in self.__span_tree.spans], ['s1', 's2', 's3', 's4'])
+        self.assertEqual(list(self.__span_tree.parent_index), [-1, 0, 0, 1])
+        self.assertEqual(list(self.__span_tree.durations), [100, 40, 20, 10])
+        self.assertEqual(len(self.__span_tree.spans[1].spans_data), 2)
+        self.assertEqual(sorted(span_obj.id for span_obj in self.__span_tree.orphan_spans), ['s5', 's6'])
+
+    def test_count_spans(self):
+        """ Test count_spans function. """
+        self.assertEqual(self.__span_tree.count_spans(), 4)
+
+        self.assertEqual(SpanTree().count_spans(), 0)
+
+    def test_depth(self):
+        """ Test depth function. """
+        self.assertEqual(self.__span_tree.depth(), 2)
+
+    def test_children(self):
+        """ Test children function. """
+        span_tree = self.__span_tree
+
+        self.assertEqual([span_tree.spans[child].id for child in span_tree.children(span_tree.root)], ['s2', 's3'])
+        self.assertEqual([span_tree.spans[child].id for child in span_tree.children(span_tree.position('s2'))],
+                         ['s4'])
+        self.assertEqual(list(span_tree.children(span_tree.position('s4'))), list())
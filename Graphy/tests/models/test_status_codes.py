@@ -0,0 +1,96 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import pickle
+from unittest import TestCase
+
+from graphy.models import span as my_span
+from graphy.models import status_codes as my_status_codes
+from graphy.models.status_codes import StatusCodeAggregator
+from graphy.models.trace_index import TraceIndex
+from graphy.utils import dict as my_dict
+from tests.models import span
+
+
+def legacy_status_codes(traces):
+    status_codes_dict = dict()
+    for trace in traces:
+        for trace_span in trace:
+            status_code = my_span.get_status_code(trace_span)
+            if status_code and len(status_code) > 1:
+                status_code = status_code[0] + 'XX'
+                status_codes_dict[status_code] = status_codes_dict.get(status_code, 0) + 1
+    return status_codes_dict
+
+
+class TestStatusCodes(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__traces = [[span('t1', 'a', 'api', status_code='200'), span('t1', 'b', 'nova', status_code='404'),
+                          span('t1', 'c', 'nova')],
+                         [span('t2', 'a', 'api', status_code='500'), span('t2', 'b', 'api', status_code='201')],
+                         [span('t3', 'a', 'nova', status_code='1'), span('t3', 'b', 'keystone', status_code='302')]]
+
+    def test_status_class(self):
+        """ Test status_class function. """
+        self.assertEqual(2, my_status_codes.status_class('200'))
+        self.assertEqual(4, my_status_codes.status_class(404))
+        self.assertEqual(-1, my_status_codes.status_class('1'))
+        self.assertEqual(-1, my_status_codes.status_class(None))
+        self.assertEqual(-1, my_status_codes.status_class(''))
+
+    def test_counts(self):
+        """ Test counts against the per service traces counting of service_status_codes. """
+        aggregator = StatusCodeAggregator().add_traces(self.__traces)
+        trace_index = TraceIndex(self.__traces)
+
+        self.assertEqual(['api', 'keystone', 'nova'], aggregator.service_names)
+        for service_name in trace_index.service_names:
+            status_codes = legacy_status_codes(trace_index.traces(service_name))
+            self.assertEqual(status_codes, aggregator.counts(service_name))
+            self.assertEqual(my_dict.calc_percentage(status_codes), aggregator.percentages(service_name))
+
+        self.assertEqual({'2XX': 1, '3XX': 1, '4XX': 1}, aggregator.counts('nova'))
+        self.assertEqual(dict(), aggregator.counts('unknown'))
+        self.assertEqual(dict(), aggregator.percentages('unknown'))
+
+    def test_add_spans(self):
+        """ Test add_spans and the total of all services against the legacy get_status_codes. """
+        aggregator = StatusCodeAggregator().add_spans(trace_span for trace in self.__traces for trace_span in trace)
+
+        self.assertEqual(legacy_status_codes(self.__traces), aggregator.counts())
+        self.assertEqual({'2XX': 2, '5XX': 1}, aggregator.counts('api'))
+        self.assertEqual({'4XX': 1}, aggregator.counts('nova'))
+
+    def test_add_records(self):
+        """ Test add_records matches add_spans. """
+        spans = [trace_span for trace in self.__traces for trace_span in trace]
+        aggregator = StatusCodeAggregator().add_records(my_span.to_record(trace_span) for trace_span in spans)
+
+        expected = StatusCodeAggregator().add_spans(spans)
+        for service_name in expected.service_names:
+            self.assertEqual(expected.counts(service_name), aggregator.counts(service_name))
+
+    def test_flush(self):
+        """ Test the counts are the same when the buffers are flushed in many batches. """
+        flush_size = my_status_codes.FLUSH_SIZE
+        my_status_codes.FLUSH_SIZE = 2
+        try:
+            aggregator = StatusCodeAggregator().add_traces(self.__traces)
+        finally:
+            my_status_codes.FLUSH_SIZE = flush_size
+
+        self.assertEqual(StatusCodeAggregator().add_traces(self.__traces).counts('api'), aggregator.counts('api'))
+
+    def test_merge(self):
+        """ Test merge of aggregators of different shards, after a pickle round trip. """
+        aggregator = StatusCodeAggregator().add_traces(self.__traces[:1])
+        other = pickle.loads(pickle.dumps(StatusCodeAggregator().add_traces(self.__traces[1:])))
+        aggregator.merge(other)
+
+        expected = StatusCodeAggregator().add_traces(self.__traces)
+        self.assertEqual(expected.service_names, aggregator.service_names)
+        for service_name in expected.service_names:
+            self.assertEqual(expected.counts(service_name), aggregator.counts(service_name))
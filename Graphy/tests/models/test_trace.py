@@ -0,0 +1,115 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import random
+from unittest import TestCase
+
+from graphy.models import trace as my_trace
+from tests.models import span
+
+
+def expected_metrics(span_trees):
+    """ Calculates the coverability over all levels and the response times of the traces one by one. """
+    coverability = {label: 0 for label in my_trace.COVERABILITY_LABELS}
+    response_times = dict()
+    for span_tree_obj in span_trees:
+        if span_tree_obj.root is None:
+            continue
+        t_child = 0
+        t_parent = 0
+        for position in range(span_tree_obj.count_spans()):
+            children = span_tree_obj.children(position)
+            if children or position == span_tree_obj.root:
+                t_child += sum(span_tree_obj.durations[child] for child in children)
+                t_parent += span_tree_obj.durations[position]
+        percentage = t_child / t_parent * 100 if t_parent else -1
+        if percentage < 0 or percentage > 100:
+            label = 'error'
+        elif percentage < 1:
+            label = '<1%'
+        elif percentage < 10:
+            label = '1-10%'
+        else:
+            label = my_trace.COVERABILITY_LABELS[int(percentage // 10) + 1] if percentage < 100 else '91-100%'
+        coverability[label] += 1
+        children = span_tree_obj.children(span_tree_obj.root)
+        t_child = sum(span_tree_obj.durations[child] for child in children)
+        response_times[span_tree_obj.trace_id] = t_child / max(len(children), 1)
+    return coverability, response_times
+
+
+class TestTrace(TestCase):
+
+    def test_coverability_buckets(self):
+        """ Test coverability_buckets function. """
+        percentages = [-1, 0, 0.99, 1, 9.99, 10, 10.5, 19.99, 20, 89.99, 90, 99.5, 100, 100.01, float('nan')]
+        labels = [my_trace.COVERABILITY_LABELS[bucket] for bucket in my_trace.coverability_buckets(percentages)]
+        self.assertEqual(labels, ['error', '<1%', '<1%', '1-10%', '1-10%', '11-20%', '11-20%', '11-20%', '21-30%',
+                                  '81-90%', '91-100%', '91-100%', '91-100%', 'error', 'error'])
+
+    def test_update_coverability(self):
+        """ Test update_coverability function. """
+        trace_metrics_data = my_trace.TraceMetricsData()
+        trace_metrics_data.update_coverability({'t1': {'%': 10.5, 'span_ids': {'s2', 's3'}},
+                                                't2': {'%': -1, 'span_ids': set()}})
+
+        self.assertEqual(trace_metrics_data.coverability_count['11-20%']['value'], 1)
+        self.assertEqual(trace_metrics_data.coverability_count['11-20%']['trace_ids'], {'t1'})
+        self.assertEqual(trace_metrics_data.coverability_count['11-20%']['span_ids'], {'s2', 's3'})
+        self.assertEqual(trace_metrics_data.coverability_count['error']['trace_ids'], {'t2'})
+
+    def test_extract_metrics(self):
+        """ Test extract_metrics function. """
+        span_trees = my_trace.generate_span_trees([
+            [span('t1', 's1', timestamp=1, duration=100), span('t1', 's2', parent_id='s1', timestamp=1, duration=30),
+             span('t1', 's3', parent_id='s1', timestamp=1, duration=15),
+             span('t1', 's4', parent_id='s2', timestamp=1, duration=10)],
+            [span('t2', 's5', timestamp=1, duration=100), span('t2', 's6', parent_id='s5', timestamp=1, duration=150)],
+            [span('t3', 's7', parent_id='missing', timestamp=1, duration=100)],
+            [span('t4', 's8', timestamp=1, duration=100)]
+        ])
+
+        trace_metrics_data = my_trace.extract_metrics(span_trees)
+
+        self.assertEqual(trace_metrics_data.coverability_count['41-50%']['trace_ids'], {'t1'})
+        self.assertEqual(trace_metrics_data.coverability_count['41-50%']['span_ids'], {'s2', 's3', 's4'})
+        self.assertEqual(trace_metrics_data.coverability_count['error']['trace_ids'], {'t2'})
+        self.assertEqual(trace_metrics_data.coverability_count['<1%']['trace_ids'], {'t4'})
+        self.assertEqual(trace_metrics_data.response_times, {'t1': 22.5, 't2': 150.0, 't4': 0.0})
+        self.assertAlmostEqual(trace_metrics_data.response_time_avg, 172.5 / 3)
+        self.assertAlmostEqual(trace_metrics_data.response_time_quantiles['p50'], 22.5, delta=22.5 * 0.01)
+
+    def test_response_times_limit(self):
+        """ Test the response time of each trace is dropped past the limit, but not the sketch. """
+        trace_metrics_data = my_trace.TraceMetricsData(response_times_limit=2)
+        trace_metrics_data.update_response_times(['t1', 't2'], [10.0, 20.0])
+        self.assertEqual(trace_metrics_data.response_times, {'t1': 10.0, 't2': 20.0})
+
+        trace_metrics_data.update_response_time('t3', 30.0)
+        self.assertIsNone(trace_metrics_data.response_times)
+        self.assertEqual(trace_metrics_data.response_time_sketch.count, 3)
+        self.assertAlmostEqual(trace_metrics_data.response_time_avg, 20.0)
+
+    def test_extract_metrics_random_traces(self):
+        """ Test extract_metrics function against the metrics calculated trace by trace. """
+        rand = random.Random(7)
+        traces = list()
+        for trace_number in range(200):
+            trace_id = 't{}'.format(trace_number)
+            trace = [span(trace_id, '0', timestamp=1, duration=rand.randint(0, 1000))]
+            for span_number in range(1, rand.randint(1, 12)):
+                trace.append(span(trace_id, str(span_number), parent_id=str(rand.randrange(span_number)), timestamp=1,
+                                  duration=rand.randint(0, 300)))
+            rand.shuffle(trace)
+            traces.append(trace)
+        span_trees = my_trace.generate_span_trees(traces)
+
+        trace_metrics_data = my_trace.extract_metrics(span_trees)
+        coverability, response_times = expected_metrics(span_trees)
+
+        self.assertEqual({label: item['value'] for label, item in trace_metrics_data.coverability_count.items()},
+                         coverability)
+        self.assertEqual(trace_metrics_data.response_times.keys(), response_times.keys())
+        for trace_id, response_time in response_times.items():
+            self.assertAlmostEqual(trace_metrics_data.response_times[trace_id], response_time)
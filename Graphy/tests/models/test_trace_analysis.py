@@ -0,0 +1,63 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import math
+from unittest import TestCase
+
+from graphy.models import trace as my_trace
+from graphy.models.trace_analysis import TraceAnalysis
+from tests.models import span
+
+
+class TestTraceAnalysis(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        # api calls nova twice, the second call ends last and calls keystone; 's2' is also recorded by api's client.
+        self.__trace_1 = [span('t1', 's1', 'api', None, 'SERVER', timestamp=0, duration=100),
+                          span('t1', 's2', 'nova', 's1', 'SERVER', timestamp=10, duration=30),
+                          span('t1', 's2', 'api', 's1', 'CLIENT', timestamp=5, duration=40),
+                          span('t1', 's3', 'nova', 's1', 'SERVER', timestamp=50, duration=40),
+                          span('t1', 's4', 'keystone', 's3', 'SERVER', timestamp=60, duration=20)]
+        self.__trace_2 = [span('t2', 's5', 'nova', None, 'SERVER', timestamp=0, duration=10)]
+
+        self.__trace_analysis = TraceAnalysis.from_span_trees(
+            my_trace.generate_span_trees([self.__trace_1, self.__trace_2]))
+        self.__rows = dict(zip(self.__trace_analysis.columns.span_ids.tolist(),
+                               range(len(self.__trace_analysis.columns))))
+
+    def values(self, column) -> dict:
+        return {span_id: column[row] for span_id, row in self.__rows.items()}
+
+    def test_self_time(self):
+        """ Test self_time and child_coverage columns. """
+        self.assertEqual(self.values(self.__trace_analysis.self_time),
+                         {'s1': 20, 's2': 40, 's3': 20, 's4': 20, 's5': 10})
+        self.assertEqual(self.values(self.__trace_analysis.child_coverage)['s1'], 80)
+        self.assertEqual(self.values(self.__trace_analysis.child_coverage)['s3'], 50)
+
+    def test_critical_path(self):
+        """ Test critical_child and critical_time columns. """
+        on_critical_path = self.values(self.__trace_analysis.on_critical_path)
+        self.assertEqual([span_id for span_id, value in on_critical_path.items() if value], ['s1', 's3', 's4', 's5'])
+        self.assertEqual(self.values(self.__trace_analysis.critical_time),
+                         {'s1': 60, 's2': 0, 's3': 20, 's4': 20, 's5': 10})
+
+    def test_trace_coverage(self):
+        """ Test trace_coverage function. """
+        trace_coverage = self.__trace_analysis.trace_coverage()
+        self.assertAlmostEqual(trace_coverage[0], (80 + 20) / (100 + 40) * 100)
+        self.assertEqual(trace_coverage[1], 0)
+
+        empty_trace_analysis = TraceAnalysis.from_span_trees(my_trace.generate_span_trees([[]]))
+        self.assertTrue(math.isnan(empty_trace_analysis.trace_coverage()[0]))
+
+    def test_service_aggregates(self):
+        """ Test service_aggregates function. """
+        service_aggregates = self.__trace_analysis.service_aggregates()
+
+        self.assertEqual(sorted(service_aggregates.keys()), ['api', 'keystone', 'nova'])
+        self.assertEqual(service_aggregates['nova'], {'spans': 3, 'duration': 90.0, 'self_time': 70.0,
+                                                      'critical_time': 30.0, 'child_coverage_avg': 50.0})
+        self.assertEqual(service_aggregates['keystone']['child_coverage_avg'], -1)
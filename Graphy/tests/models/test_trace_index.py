@@ -0,0 +1,39 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+from unittest import TestCase
+
+from graphy.models.trace_index import TraceIndex
+from tests.models import span
+
+
+class TestTraceIndex(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__trace_1 = [span('t1', 's1', 'api'), span('t1', 's2', 'nova', 's1')]
+        self.__trace_2 = [span('t2', 's3', 'nova')]
+
+    def test_add_traces(self):
+        """ Test add_traces function. """
+        trace_index = TraceIndex()
+
+        self.assertEqual(trace_index.add_traces([self.__trace_1, self.__trace_2, self.__trace_1, []]), 2)
+        self.assertEqual(trace_index.add_traces([self.__trace_2]), 0)
+        self.assertEqual(len(trace_index), 2)
+        self.assertIn('t1', trace_index)
+
+    def test_service_names(self):
+        """ Test service_names property. """
+        self.assertEqual(TraceIndex([self.__trace_1, self.__trace_2]).service_names, ['api', 'nova'])
+
+    def test_traces(self):
+        """ Test traces function. """
+        trace_index = TraceIndex([self.__trace_1, self.__trace_2])
+
+        self.assertEqual(trace_index.traces('api'), [self.__trace_1])
+        self.assertEqual(trace_index.traces('nova'), [self.__trace_1, self.__trace_2])
+        self.assertEqual(trace_index.traces('keystone'), list())
+        self.assertEqual(len(trace_index.traces()), 2)
+        self.assertEqual(trace_index.trace('t2'), self.__trace_2)
@@ -0,0 +1,141 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import TestCase
+
+from graphy.utils import zipkin
+from graphy.utils.cache import ResponseCache
+
+
+class ZipkinHandler(BaseHTTPRequestHandler):
+    """ Answers the dependencies of a window with no links until spans are posted, and fails every post. """
+    posted = False
+
+    def do_GET(self):
+        body = b'[{"parent": "api", "child": "nova", "callCount": 1}]' if ZipkinHandler.posted else b'[]'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        ZipkinHandler.posted = True
+        self.send_response(500)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCache(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        shutil.rmtree(self.__tmp_dir)
+
+    def test_get_put(self):
+        """ Test get and put functions. """
+        cache = ResponseCache(self.__tmp_dir, 1024 * 1024)
+        params = {'endTs': 1546300800000, 'lookback': 60000, 'serviceName': None}
+
+        self.assertIsNone(cache.get('http://zipkin/api/v2/dependencies', params))
+        cache.put('http://zipkin/api/v2/dependencies', params, b'[{"parent": "api"}]')
+
+        self.assertEqual(cache.get('http://zipkin/api/v2/dependencies', {'lookback': 60000, 'endTs': 1546300800000}),
+                         b'[{"parent": "api"}]')
+        self.assertIsNone(cache.get('http://zipkin/api/v2/traces', params))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_eviction(self):
+        """ Test the least recently used responses are evicted. """
+        cache = ResponseCache(self.__tmp_dir, 3000, compress_level=1)
+        contents = [os.urandom(1000) for _ in range(4)]
+
+        for number, content in enumerate(contents[:2]):
+            cache.put('http://zipkin/traces', {'endTs': number}, content)
+            time.sleep(0.01)
+        cache.get('http://zipkin/traces', {'endTs': 0})  # Used after the second one.
+        time.sleep(0.01)
+        cache.put('http://zipkin/traces', {'endTs': 2}, contents[2])
+
+        self.assertLessEqual(cache.size, 3000)
+        self.assertEqual(cache.get('http://zipkin/traces', {'endTs': 0}), contents[0])
+        self.assertIsNone(cache.get('http://zipkin/traces', {'endTs': 1}))
+        self.assertEqual(cache.get('http://zipkin/traces', {'endTs': 2}), contents[2])
+
+    def test_invalid_file(self):
+        """ Test an invalid cache file is a miss. """
+        cache = ResponseCache(self.__tmp_dir, 1024 * 1024)
+        cache.put('http://zipkin/traces', {'endTs': 0}, b'[]')
+        key = ResponseCache.key('http://zipkin/traces', {'endTs': 0})
+        with open(os.path.join(self.__tmp_dir, key[:2], key + '.json.gz'), 'wb') as cache_file:
+            cache_file.write(b'not gzip')
+
+        self.assertIsNone(cache.get('http://zipkin/traces', {'endTs': 0}))
+
+    def test_zipkin_client_cache(self):
+        """ Test past windows are answered from the cache and windows overlapping now are not. """
+        cache = ResponseCache(self.__tmp_dir, 1024 * 1024)
+        cache.put('http://127.0.0.1:1/api/v2/dependencies', {'endTs': 1546300800000, 'lookback': 60000},
+                  b'[{"parent": "api", "child": "nova", "callCount": 1}]')
+
+        with zipkin.ZipkinClient(address='http://127.0.0.1:1', timeout=1, cache=cache) as client:
+            self.assertEqual(client.get_dependencies(end_ts=1546300800000, lookback=60000),
+                             [{'parent': 'api', 'child': 'nova', 'callCount': 1}])
+
+            end_ts = int(time.time() * 1000)
+            cache.put('http://127.0.0.1:1/api/v2/dependencies', {'endTs': end_ts, 'lookback': 60000}, b'[]')
+            with self.assertRaises(zipkin.ZipkinConnectionError):
+                client.get_dependencies(end_ts=end_ts, lookback=60000)
+
+    def test_namespace(self):
+        """ Test responses cached in a namespace are not used by another one. """
+        ResponseCache(self.__tmp_dir, 1024 * 1024, namespace='a').put('http://zipkin/traces', {'endTs': 0}, b'[1]')
+
+        self.assertEqual(ResponseCache(self.__tmp_dir, 1024 * 1024, namespace='a').get('http://zipkin/traces',
+                                                                                      {'endTs': 0}), b'[1]')
+        self.assertIsNone(ResponseCache(self.__tmp_dir, 1024 * 1024, namespace='b').get('http://zipkin/traces',
+                                                                                      {'endTs': 0}))
+        self.assertNotEqual(zipkin.cache_namespace(['a.json']), zipkin.cache_namespace(['b.json']))
+
+    def test_zipkin_client_cache_stale(self):
+        """ Test empty responses and responses after a failed post are not cached. """
+        ZipkinHandler.posted = False
+        server = HTTPServer(('127.0.0.1', 0), ZipkinHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        spans_file = os.path.join(self.__tmp_dir, 'spans.json')
+        with open(spans_file, 'w') as file:
+            file.write('[{"traceId": "t1", "id": "a"}]')
+
+        cache = ResponseCache(os.path.join(self.__tmp_dir, 'cache'), 1024 * 1024)
+        try:
+            with zipkin.ZipkinClient(address='http://127.0.0.1:{}'.format(server.server_port), timeout=5,
+                                     cache=cache) as client:
+                self.assertEqual(client.get_dependencies(end_ts=1546300800000, lookback=60000), [])
+                self.assertEqual(cache.size, 0)
+
+                self.assertFalse(client.post_spans(spans_file, retries=0))
+                self.assertEqual(len(client.get_dependencies(end_ts=1546300800000, lookback=60000)), 1)
+                self.assertEqual(cache.size, 0)
+
+            with zipkin.ZipkinClient(address='http://127.0.0.1:{}'.format(server.server_port), timeout=5,
+                                     cache=cache) as client:
+                client.get_dependencies(end_ts=1546300800000, lookback=60000)
+                self.assertGreater(cache.size, 0)
+        finally:
+            server.shutdown()
+            server.server_close()
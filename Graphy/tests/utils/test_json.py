@@ -1,14 +1,30 @@
 """
     Author: André Bento
-    Date last modified: 06-03-2019
+    Date last modified: 18-10-2026
 """
+import json
+import os
+import shutil
+import tempfile
 from unittest import TestCase
 
+from graphy.models import span as my_span
+from graphy.utils import files as my_files
 from graphy.utils import json as my_json
 
 
 class TestJson(TestCase):
 
+    def setUp(self) -> None:
+        super().setUp()
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__jsonl_file = shutil.copy(
+            os.path.join(my_files.DATA_PROJECT_DIRECTORY, '28_06_simplified_100_spans.jsonl'), self.__tmp_dir)
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        shutil.rmtree(self.__tmp_dir)
+
     def test_is_json(self):
         """ Tests is_json function. """
         self.assertTrue(my_json.is_json('test.json'))
@@ -17,14 +33,78 @@ class TestJson(TestCase):
         self.assertTrue(my_json.is_json('dir/test.json'))
         self.assertFalse(my_json.is_json('dir/test.not_json'))
 
+    def test_iter_jsonl(self):
+        """ Tests iter_jsonl function. """
+        self.assertEqual(len(list(my_json.iter_jsonl(self.__jsonl_file))), 100)
+        self.assertEqual(len(list(my_json.iter_jsonl(self.__jsonl_file, 10))), 10)
+
+    def test_iter_json_array(self):
+        """ Tests iter_json_array function. """
+        json_file = os.path.join(my_files.DATA_PROJECT_DIRECTORY, '28_06_simplified_100_spans.json')
+        with open(json_file) as f:
+            spans = json.load(f)
+
+        self.assertEqual(list(my_json.iter_json_array(json_file, chunk_size=100)), spans)
+        self.assertEqual(list(my_json.iter_json_array(json_file, limit=10)), spans[:10])
+        self.assertEqual(list(my_json.iter_spans(json_file)), spans)
+
+        with self.assertRaises(ValueError):
+            list(my_json.iter_json_array(self.__jsonl_file))
+
+    def test_shard_ranges(self):
+        """ Tests shard_ranges function. """
+        with open(self.__jsonl_file, 'rb') as f:
+            data = f.read()
+
+        ranges = my_json.shard_ranges(self.__jsonl_file, 1000)
+        self.assertGreater(len(ranges), 1)
+        self.assertEqual(b''.join(data[start:end] for start, end in ranges), data)
+        for start, end in ranges[:-1]:
+            self.assertEqual(data[end - 1:end], b'\n')
+
+        self.assertEqual(my_json.shard_ranges(self.__jsonl_file, len(data) * 2), [(0, len(data))])
+
+    def test_iter_span_records(self):
+        """ Tests iter_span_records function, in parallel shards and sequentially. """
+        with open(self.__jsonl_file) as f:
+            expected_records = [my_span.to_record(v2_span) for line in f
+                                for v2_span in my_span.to_v2(json.loads(line))]
+
+        records = list(my_json.iter_span_records(self.__jsonl_file, workers=2, shard_size=2000))
+        self.assertEqual(records, expected_records)
+        self.assertEqual(list(my_json.iter_span_records(self.__jsonl_file, workers=1)), expected_records)
+
+        json_file = os.path.join(my_files.DATA_PROJECT_DIRECTORY, '28_06_simplified_100_spans.json')
+        self.assertEqual(len(list(my_json.iter_span_records(json_file))), len(expected_records))
+
+    def test_to_json_parallel(self):
+        """ Tests to_json function with the shards converted in parallel. """
+        json_file = my_json.to_json(self.__jsonl_file, workers=1)
+        with open(json_file) as f:
+            expected_spans = json.load(f)
+
+        json_file = my_json.to_json(self.__jsonl_file, workers=2, shard_size=2000)
+        with open(json_file) as f:
+            self.assertEqual(json.load(f), expected_spans)
+
     def test_to_json(self):
         """ Tests to_json function. """
         json_file = '28_06_simplified_100_spans.json'
-        not_json_file = '28_06_simplified_100_spans.jsonl'
         self.assertEqual(my_json.to_json(json_file), json_file)
 
-        # TODO: Write tests.
+        json_file = my_json.to_json(self.__jsonl_file)
+        self.assertEqual(json_file, os.path.splitext(self.__jsonl_file)[0] + '.json')
+
+        with open(self.__jsonl_file) as f:
+            expected_spans = [json.loads(line) for line in f]
+        my_span.fix_timestamps(expected_spans)
 
-        # my_json.to_json(json_file)
+        with open(json_file) as f:
+            self.assertEqual(json.load(f), expected_spans)
 
-        # self.assertEqual, not_json_file)
+    def test_to_json_limit(self):
+        """ Tests to_json function with a limit. """
+        with open(my_json.to_json(self.__jsonl_file, limit=10)) as f:
+            spans = json.load(f)
+        self.assertEqual(len(spans), 10)
+        self.assertTrue(all(len(str(span.get('timestamp'))) == 16 for span in spans))
@@ -1,6 +1,6 @@
 """
     Author: André Bento
-    Date last modified: 25-02-2019
+    Date last modified: 18-10-2026
 """
 import unittest
 
@@ -40,3 +40,11 @@ class TestList(unittest.TestCase):
         self.assertEqual(my_list.symmetric_diff(list_1, list_3), list([3, 4]))
 
         self.assertEqual(my_list.symmetric_diff(list_3, list_1), list([3, 4]))
+
+    def test_chunks(self):
+        """ Test chunks function. """
+        self.assertEqual(list(my_list.chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+        self.assertEqual(list(my_list.chunks(iter(range(4)), 2)), [[0, 1], [2, 3]])
+
+        self.assertEqual(list(my_list.chunks([], 2)), list())
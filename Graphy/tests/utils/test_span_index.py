@@ -0,0 +1,104 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from graphy.utils import files as my_files
+from graphy.utils import json as my_json
+from graphy.utils.span_index import SpanFileIndex, span_timestamp
+
+BUCKET_DURATION = 10 * 1000
+
+
+class TestSpanIndex(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__jsonl_file = shutil.copy(
+            os.path.join(my_files.DATA_PROJECT_DIRECTORY, '28_06_simplified_100_spans.jsonl'), self.__tmp_dir)
+        self.__json_file = shutil.copy(
+            os.path.join(my_files.DATA_PROJECT_DIRECTORY, '28_06_simplified_100_spans.json'), self.__tmp_dir)
+        self.__spans = list(my_json.iter_spans(self.__jsonl_file))
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        shutil.rmtree(self.__tmp_dir)
+
+    def __expected(self, start_timestamp, end_timestamp):
+        return sorted((span for span in self.__spans
+                       if start_timestamp * 1000 <= span_timestamp(span) < end_timestamp * 1000),
+                      key=span_timestamp)
+
+    def test_span_timestamp(self):
+        """ Test span_timestamp function. """
+        self.assertEqual(span_timestamp({'timestamp': 1530138186882}), 1530138186882000)
+        self.assertEqual(span_timestamp({'annotations': [{'timestamp': 1530138186882049, 'value': 'sr'},
+                                                         {'timestamp': 1530138186882001, 'value': 'cs'}]}),
+                         1530138186882001)
+        self.assertEqual(span_timestamp({'annotations': [{'timestamp': 1530138186883, 'value': 'sr'},
+                                                         {'timestamp': 1530138186882, 'value': 'cs'}]}),
+                         1530138186882000)
+        self.assertIsNone(span_timestamp({'id': 's1'}))
+
+    def test_spans_annotation_timestamps(self):
+        """ Test spans without a timestamp are indexed by their earliest annotation timestamp, in microseconds. """
+        file_path = os.path.join(self.__tmp_dir, 'annotations.jsonl')
+        with open(file_path, 'w') as fp:
+            fp.write('{"traceId": "t1", "id": "a", "timestamp": 1530138186882500}\n')
+            fp.write('{"traceId": "t1", "id": "b", "annotations": [{"timestamp": 1530138186882, "value": "cs"}]}\n')
+            fp.write('{"traceId": "t1", "id": "c", "timestamp": 1530138186881500}\n')
+
+        with SpanFileIndex(file_path, BUCKET_DURATION) as index:
+            self.assertEqual(index.time_range, (1530138186881500, 1530138186882500))
+            self.assertEqual([span['id'] for span in index.spans(1530138186881, 1530138186883)], ['c', 'b', 'a'])
+            self.assertEqual([span['id'] for span in index.spans(1530138186882, 1530138186883)], ['b', 'a'])
+
+    def test_spans(self):
+        """ Test spans function, on JSONL and JSON files. """
+        for file_path in (self.__jsonl_file, self.__json_file):
+            with SpanFileIndex(file_path, BUCKET_DURATION) as index:
+                self.assertEqual(len(index), 100)
+                first, last = index.time_range
+
+                start_timestamp = first // 1000 + 500
+                end_timestamp = start_timestamp + 2 * BUCKET_DURATION + 1234
+                spans = [span_timestamp(span) for span in index.spans(start_timestamp, end_timestamp)]
+                self.assertEqual(spans, [span_timestamp(span) for span in self.__expected(start_timestamp,
+                                                                                            end_timestamp)])
+                self.assertEqual(index.count(0, last // 1000 + 1), 100)
+                self.assertEqual(index.count(0, first // 1000), 0)
+                self.assertEqual(index.count(last // 1000 + 1, last // 1000 + 10 ** 6), 0)
+
+    def test_windows(self):
+        """ Test windows function. """
+        with SpanFileIndex(self.__jsonl_file, BUCKET_DURATION) as index:
+            first, last = index.time_range
+            windows = [(timestamp, timestamp + 30000) for timestamp in range(first // 1000, last // 1000 + 1, 30000)]
+
+            for start_timestamp, end_timestamp, spans in index.windows(windows):
+                self.assertEqual(spans, self.__expected(start_timestamp, end_timestamp))
+            self.assertEqual(sum(len(spans) for _, _, spans in index.windows(windows)), 100)
+
+    def test_invalidation(self):
+        """ Test the index is saved next to the file, reused and rebuilt when the file changes. """
+        SpanFileIndex(self.__jsonl_file, BUCKET_DURATION).close()
+        meta_path = self.__jsonl_file + '.index.json'
+        self.assertTrue(os.path.isfile(meta_path))
+        meta_time = os.stat(meta_path).st_mtime_ns
+
+        with SpanFileIndex(self.__jsonl_file, BUCKET_DURATION) as index:
+            self.assertEqual(len(index), 100)
+        self.assertEqual(os.stat(meta_path).st_mtime_ns, meta_time)
+
+        with open(self.__jsonl_file) as fp:
+            lines = fp.readlines()
+        with open(self.__jsonl_file, 'w') as fp:
+            fp.writelines(lines[:10])
+
+        with SpanFileIndex(self.__jsonl_file, BUCKET_DURATION) as index:
+            self.assertEqual(len(index), 10)
@@ -0,0 +1,93 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from graphy.models import span as my_span
+from graphy.utils import files as my_files
+from graphy.utils import json as my_json
+from graphy.utils.span_store import SpanStore
+
+PARTITION_DURATION = 60 * 1000
+
+
+class TestSpanStore(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__jsonl_file = os.path.join(my_files.DATA_PROJECT_DIRECTORY, '28_06_simplified_100_spans.jsonl')
+        self.__store = SpanStore.convert([self.__jsonl_file], os.path.join(self.__tmp_dir, 'store'),
+                                         PARTITION_DURATION)
+        self.__spans = [v2_span for span in my_json.iter_spans(self.__jsonl_file) for v2_span in my_span.to_v2(span)]
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        shutil.rmtree(self.__tmp_dir)
+
+    def test_convert(self):
+        """ Test convert function. """
+        self.assertEqual(len(self.__store), len(self.__spans))
+        self.assertEqual(sorted(self.__store.services), ['api_com', 'nova-api-cascading'])
+
+        store = SpanStore(self.__store.directory)
+        self.assertEqual(len(store), len(self.__spans))
+        self.assertEqual(store.time_range, (min(span['timestamp'] for span in self.__spans),
+                                            max(span['timestamp'] for span in self.__spans)))
+
+    def test_convert_chunks(self):
+        """ Test convert function gives the same store when the spans are converted in small chunks. """
+        store = SpanStore.convert([self.__jsonl_file], os.path.join(self.__tmp_dir, 'chunked_store'),
+                                  PARTITION_DURATION, chunk_size=7)
+        columns = self.__store.read()
+        chunked_columns = store.read()
+
+        self.assertEqual(store.time_range, self.__store.time_range)
+        self.assertEqual(store.services, self.__store.services)
+        for column_name, column in columns.items():
+            self.assertEqual(chunked_columns[column_name].tolist(), column.tolist(), column_name)
+        self.assertFalse(os.path.exists(os.path.join(store.directory, 'chunks')))
+
+    def test_read(self):
+        """ Test read function, with all the columns. """
+        columns = self.__store.read()
+
+        self.assertTrue(np.all(np.diff(columns['timestamp']) >= 0))
+        rows = sorted(zip(columns['timestamp'].tolist(), self.__store.decode('id', columns['id']),
+                          self.__store.decode('kind', columns['kind']), columns['duration'].tolist(),
+                          self.__store.decode('service', columns['service']), columns['status_code'].tolist()))
+        expected_rows = sorted((span['timestamp'], span['id'], span.get('kind'), span.get('duration', 0),
+                                my_span.get_service_name(span), int(my_span.get_status_code(span) or 0))
+                               for span in self.__spans)
+        self.assertEqual(rows, expected_rows)
+
+    def test_read_time_range(self):
+        """ Test read function, with a time range and a column projection. """
+        first, last = self.__store.time_range
+        start_timestamp = (first + (last - first) // 3) // 1000
+        end_timestamp = (first + 2 * (last - first) // 3) // 1000
+
+        columns = self.__store.read(['timestamp', 'trace_id'], start_timestamp, end_timestamp)
+
+        self.assertEqual(set(columns), {'timestamp', 'trace_id'})
+        expected = sorted(span['timestamp'] for span in self.__spans
+                          if start_timestamp * 1000 <= span['timestamp'] < end_timestamp * 1000)
+        self.assertEqual(columns['timestamp'].tolist(), expected)
+        self.assertEqual(len(self.__store.read(['duration'], 0, first // 1000)['duration']), 0)
+
+    def test_read_service(self):
+        """ Test read function, with a service filter. """
+        columns = self.__store.read(['duration'], service_name='nova-api-cascading')
+
+        self.assertEqual(list(columns), ['duration'])
+        self.assertEqual(len(columns['duration']),
+                         sum(1 for span in self.__spans if my_span.get_service_name(span) == 'nova-api-cascading'))
+        self.assertEqual(len(self.__store.read(service_name='unknown')['id']), 0)
+        with self.assertRaises(KeyError):
+            self.__store.read(['unknown'])
@@ -0,0 +1,105 @@
+"""
+    Author: André Bento
+    Date last modified: 18-10-2026
+"""
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from graphy.models import span as my_span
+from graphy.utils import files as my_files
+from graphy.utils.trace_files import TraceFileSource
+
+END_TS = 1530140000000
+LOOKBACK = 24 * 60 * 60 * 1000
+
+
+class TestTraceFiles(TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__jsonl_file = shutil.copy(
+            os.path.join(my_files.DATA_PROJECT_DIRECTORY, '28_06_simplified_100_spans.jsonl'), self.__tmp_dir)
+        self.__source = TraceFileSource([self.__jsonl_file], os.path.join(self.__tmp_dir, 'index'))
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.__source.close()
+        shutil.rmtree(self.__tmp_dir)
+
+    def test_get_services(self):
+        """ Test get_services and get_spans functions. """
+        self.assertEqual(self.__source.get_services(), ['api_com', 'nova-api-cascading'])
+        self.assertEqual(self.__source.get_spans('api_com'), ['get'])
+        self.assertEqual(self.__source.get_spans('unknown'), [])
+
+    def test_get_traces(self):
+        """ Test get_traces function. """
+        spans = list(my_span.to_v2(json.loads(line)) for line in open(self.__jsonl_file))
+        trace_ids = {span_data[0]['traceId'] for span_data in spans}
+
+        traces = self.__source.get_traces(end_ts=END_TS, lookback=LOOKBACK)
+        self.assertEqual({trace[0]['traceId'] for trace in traces}, trace_ids)
+        self.assertEqual(sum(len(trace) for trace in traces), sum(len(span_data) for span_data in spans))
+
+        starts = [min(span_data['timestamp'] for span_data in trace) for trace in traces]
+        self.assertEqual(starts, sorted(starts, reverse=True))
+
+        self.assertEqual(len(self.__source.get_traces(end_ts=END_TS, lookback=LOOKBACK, limit=5)), 5)
+        self.assertEqual(self.__source.get_traces(end_ts=starts[-1] // 1000 - 1, lookback=LOOKBACK), [])
+
+        window_end = starts[1] // 1000 + 1
+        window_traces = self.__source.get_traces(end_ts=window_end, lookback=window_end - starts[2] // 1000)
+        self.assertEqual(len(window_traces), 2)
+
+        nova_traces = self.__source.get_traces(end_ts=END_TS, lookback=LOOKBACK, service_name='nova-api-cascading')
+        self.assertEqual(len(nova_traces), 6)
+        for trace in nova_traces:
+            self.assertIn('nova-api-cascading', {my_span.get_service_name(span_data) for span_data in trace})
+
+        self.assertEqual(len(self.__source.get_traces(end_ts=END_TS, lookback=LOOKBACK, min_duration=10 ** 9)), 0)
+
+        max_duration = min(max(span_data.get('duration', 0) for span_data in trace) for trace in traces)
+        short_traces = self.__source.get_traces(end_ts=END_TS, lookback=LOOKBACK, max_duration=max_duration)
+        self.assertLess(len(short_traces), len(traces))
+        for trace in short_traces:
+            self.assertTrue(any(span_data.get('duration', 0) <= max_duration for span_data in trace))
+        self.assertEqual(self.__source.get_traces(end_ts=END_TS, lookback=LOOKBACK, max_duration=-1), [])
+        self.assertEqual(len(self.__source.get_traces(end_ts=END_TS, lookback=LOOKBACK,
+                                                      annotation_query='http.status_code=404')),
+                         len(self.__source.get_traces(end_ts=END_TS, lookback=LOOKBACK,
+                                                      annotation_query='http.status_code')) - 6)
+
+    def test_get_trace(self):
+        """ Test get_trace function. """
+        trace = self.__source.get_trace('7d3b4802e3ff02f0b945eb5f5042895a')
+        self.assertEqual({span_data['id'] for span_data in trace}, {'b6eb19ca778db114', '37b8c4a5591eb26a'})
+        self.assertEqual(self.__source.get_trace('unknown'), [])
+
+    def test_get_dependencies(self):
+        """ Test get_dependencies function. """
+        self.assertEqual(self.__source.get_dependencies(END_TS, LOOKBACK),
+                         [{'parent': 'api_com', 'child': 'nova-api-cascading', 'callCount': 6},
+                          {'parent': 'nova-api-cascading', 'child': 'nova-api-cascading', 'callCount': 16}])
+        self.assertEqual(self.__source.get_dependencies(1530000000000, LOOKBACK), [])
+
+    def test_index(self):
+        """ Test the index is reused while the trace files do not change and rebuilt when they do. """
+        manifest_path = os.path.join(self.__source.directory, 'manifest.json')
+        manifest_time = os.stat(manifest_path).st_mtime_ns
+
+        with TraceFileSource([self.__jsonl_file], self.__source.directory) as source:
+            self.assertEqual(len(source), 40)
+        self.assertEqual(os.stat(manifest_path).st_mtime_ns, manifest_time)
+
+        with open(self.__jsonl_file) as fp:
+            lines = fp.readlines()
+        with open(self.__jsonl_file, 'w') as fp:
+            fp.writelines(lines[:2])
+
+        with TraceFileSource([self.__jsonl_file], self.__source.directory) as source:
+            self.assertEqual(len(source), 1)
+            self.assertEqual(source.get_services(), ['api_com'])
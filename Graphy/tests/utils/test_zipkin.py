@@ -1,20 +1,120 @@
 """
     Author: André Bento
-    Date last modified: 06-03-2019
+    Date last modified: 18-10-2026
 """
-
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest import TestCase
+from urllib.parse import parse_qs, urlparse
 
 from graphy.utils import zipkin
 
+ERROR_END_TS = 1546300800000 + 10 * 60000
+
+
+class ZipkinHandler(BaseHTTPRequestHandler):
+    """
+    Answers the dependencies and traces of a window with its endTs, the first windows being the slowest, and an error
+    for ERROR_END_TS. Accepts the posted spans after rejecting the first rejected_posts posts.
+    """
+    rejected_posts = 0
+    posts = 0
+    posted_spans = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        end_ts = int(parse_qs(url.query)['endTs'][0])
+        if end_ts == ERROR_END_TS:
+            self.send_json(500, [])
+            return
+
+        time.sleep(max(1546300800000 + 5 * 60000 - end_ts, 0) / 60000 / 100)
+        if url.path.endswith('/dependencies'):
+            self.send_json(200, [{'parent': 'api', 'child': str(end_ts), 'callCount': 1}])
+        else:
+            self.send_json(200, [[{'traceId': str(end_ts), 'id': 'a'}]])
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        with ZipkinHandler.lock:
+            ZipkinHandler.posts += 1
+            accepted = ZipkinHandler.posts > ZipkinHandler.rejected_posts
+            if accepted:
+                ZipkinHandler.posted_spans += len(json.loads(body.decode('utf-8')))
+        self.send_json(202 if accepted else 500)
+
+    def send_json(self, status_code: int, content=None):
+        body = json.dumps(content).encode('utf-8') if content is not None else b''
+        self.send_response(status_code)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubZipkinClient(zipkin.ZipkinClient):
+    """ Keeps whether the client was closed. """
+    closed = False
+
+    def close(self):
+        self.closed = True
+        super().close()
+
 
 class TestZipkin(TestCase):
 
+    def setUp(self) -> None:
+        super().setUp()
+        self.__tmp_dir = tempfile.mkdtemp()
+        self.__post_retry_backoff = zipkin.post_retry_backoff
+        zipkin.post_retry_backoff = 0.01
+
+        ZipkinHandler.rejected_posts = 0
+        ZipkinHandler.posts = 0
+        ZipkinHandler.posted_spans = 0
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), ZipkinHandler)
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        self.__address = 'http://127.0.0.1:{}'.format(self.__server.server_port)
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.__server.shutdown()
+        self.__server.server_close()
+        zipkin.post_retry_backoff = self.__post_retry_backoff
+        shutil.rmtree(self.__tmp_dir)
+
+    def spans_file(self, spans_len: int) -> str:
+        spans_file = os.path.join(self.__tmp_dir, 'spans.json')
+        with open(spans_file, 'w') as file:
+            json.dump([{'traceId': 't{}'.format(number // 3), 'id': str(number)} for number in range(spans_len)], file)
+        return spans_file
+
     def test_ZipkinTraceLimit(self):
         """ Test ZipkinTraceLimit exception. """
         with self.assertRaises(zipkin.ZipkinTraceLimit):
             raise zipkin.ZipkinTraceLimit(1000)
 
+    def test_ZipkinConnectionError(self):
+        """ Test ZipkinConnectionError exception. """
+        with zipkin.ZipkinClient(address='http://127.0.0.1:1', timeout=1) as client:
+            with self.assertRaises(zipkin.ZipkinConnectionError):
+                client.get_services()
+
+            with self.assertRaises(zipkin.ZipkinError):
+                client.get_dependencies(end_ts=1546300800000)
+
     def test_get_services(self):
         """ Test get_services function. """
         # TODO: Write tests.
@@ -26,9 +126,56 @@ class TestZipkin(TestCase):
         pass
 
     def test_post_spans(self):
-        """ Test post_spans function. """
-        # TODO: Write tests.
-        pass
+        """ Test post_spans function, with a file of many batches and more batches than requests in flight. """
+        with zipkin.ZipkinClient(address=self.__address, timeout=5, pool_size=2) as client:
+            self.assertTrue(client.post_spans(self.spans_file(25), batch_size=4, workers=4, retries=0))
+
+        self.assertEqual(ZipkinHandler.posts, 7)
+        self.assertEqual(ZipkinHandler.posted_spans, 25)
+
+    def test_post_spans_retries(self):
+        """ Test post_spans function, the batches rejected by the server are retried until they are accepted. """
+        ZipkinHandler.rejected_posts = 3
+
+        with zipkin.ZipkinClient(address=self.__address, timeout=5) as client:
+            self.assertTrue(client.post_spans(self.spans_file(10), batch_size=10, retries=3))
+
+        self.assertEqual(ZipkinHandler.posts, 4)
+        self.assertEqual(ZipkinHandler.posted_spans, 10)
+
+    def test_post_spans_rejected(self):
+        """ Test post_spans function, without retries a rejected batch fails the upload. """
+        ZipkinHandler.rejected_posts = 1
+
+        with zipkin.ZipkinClient(address=self.__address, timeout=5) as client:
+            self.assertFalse(client.post_spans(self.spans_file(10), batch_size=10, retries=0))
+
+        self.assertEqual(ZipkinHandler.posts, 1)
+        self.assertEqual(ZipkinHandler.posted_spans, 0)
+
+    def test_async_client_in_windows(self):
+        """ Test AsyncZipkinClient get_dependencies_in_windows and get_traces_in_windows functions. """
+        windows = [(1546300800000 + number * 60000, 1546300800000 + (number + 1) * 60000) for number in range(3)]
+        client = StubZipkinClient(address=self.__address, timeout=5)
+        async_client = zipkin.AsyncZipkinClient(client, max_concurrency=3)
+        try:
+            dependencies = asyncio.run(async_client.get_dependencies_in_windows(windows))
+            self.assertEqual([window_dependencies[0]['child'] for window_dependencies in dependencies],
+                             [str(end) for _, end in windows])
+
+            traces = asyncio.run(async_client.get_traces_in_windows(windows, limit=10))
+            self.assertEqual([window_traces[0][0]['traceId'] for window_traces in traces],
+                             [str(end) for _, end in windows])
+
+            with self.assertRaises(zipkin.ZipkinResponseError):
+                asyncio.run(async_client.get_dependencies_in_windows(windows + [(windows[-1][1], ERROR_END_TS)]))
+            with self.assertRaises(zipkin.ZipkinResponseError):
+                asyncio.run(async_client.get_traces_in_windows([(windows[-1][1], ERROR_END_TS)] + windows))
+        finally:
+            async_client.close()
+
+        self.assertFalse(client.closed)
+        client.close()
 
     def test_get_traces(self):
         """ Test get_traces function. """